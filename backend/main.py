@@ -3,29 +3,38 @@ import os
 import io
 import uuid
 import logging
-import traceback
 import re
+import asyncio
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from urllib.parse import quote_plus, urlparse
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Header
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from langchain_ollama import OllamaLLM, OllamaEmbeddings
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from langchain_postgres import PGVector
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # Services
 from services.generation_service import GenerationService
 from services.git_service import GitService
+from services.publish_jobs import PublishQueue
+from services.client_registry import get_registry, WARMUP_ON_STARTUP
+from services.rule_evaluator import QUALITY_GATE
+from services.structured_output import TolerantJsonOutputParser, model_schema, structured
+from services.token_budget import plan_call
+from services.tracing import TracingMiddleware, recent_traces, render_metrics, span
+from services.metering import GROUP_FIELDS, meter
+from services.profiling import ProfilingMiddleware, profile_store, profiling_authorized
+from services.structured_logging import RequestIdMiddleware, configure_logging, log_payload
+from services.loop_monitor import LOOP_MONITOR_ENABLED, loop_monitor
 
 # Models
 from models import (
@@ -42,12 +51,32 @@ from version_control import DocumentManager, RuleDiffer, VersionMetadata, DiffRe
 
 
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Shared clients (pooled Ollama session + pgvector engine)
+registry = get_registry()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm models in the background so startup never blocks on Ollama/Postgres
+    if WARMUP_ON_STARTUP:
+        app.state.warmup_task = asyncio.create_task(asyncio.to_thread(registry.warm_up))
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    yield
+    await loop_monitor.stop()
+    await publish_queue.close()
+    git_service.close()
+    registry.close()
+
 # Trigger reload to force .env reload
-app = FastAPI(title="OpenL AI App Backend")
+app = FastAPI(title="OpenL AI App Backend", lifespan=lifespan)
 
 # Initialize Services
-gen_service = GenerationService()
+gen_service = GenerationService(registry)
 git_service = GitService()
+publish_queue = PublishQueue(git_service)
 
 # Reload trigger 3
 app.add_middleware(
@@ -56,22 +85,90 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id", "X-Profile-Url", "X-Request-ID"],
 )
+# Inside the tracing middleware, so the request ID is recorded on the trace's root span
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 # Models
-# Initialize LLM
-ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-llm_model = os.getenv("LLM_MODEL", "gpt-oss:20b")
-
-llm = OllamaLLM(
-    base_url=ollama_base_url,
-    model=llm_model,
-)
+# Initialize LLM (one routed client per prompt type, see ROUTE_MODELS)
+extraction_llm = registry.llm("extraction")
+kraken_llm = registry.llm("kraken")
 
 @app.get("/")
 def read_root():
     return {"message": "OpenL AI App Backend is running"}
 
+@app.get("/health")
+def health():
+    """Liveness probe: local pool stats only, never touches the network."""
+    return {
+        "status": "ok",
+        "warmup": registry.warmup_status["state"],
+        "pools": registry.pool_stats(),
+        "vocabulary_store": gen_service.vocabulary_store.usage(),
+        "event_loop": loop_monitor.snapshot(),
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition: request/span latency histograms, LLM prompt sizes, cache hits, event-loop lag."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/traces")
+def traces(limit: int = 20):
+    """Most recent finished traces (also appended to TRACE_FILE when set)."""
+    return recent_traces(limit)
+
+@app.get("/llm-usage")
+def llm_usage(group_by: str = "endpoint,phase"):
+    """
+    Ollama token/timing totals grouped by any of endpoint, phase, template, model
+    (comma separated), plus the latest calls that filled num_ctx or hit num_predict.
+    """
+    fields = [f.strip() for f in group_by.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in GROUP_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by fields {unknown}; use {list(GROUP_FIELDS)}")
+    return {"since": meter.since, "groups": meter.summary(fields), "flagged": meter.calls(limit=20, flagged=True)}
+
+@app.get("/llm-usage/calls")
+def llm_usage_calls(limit: int = 100, flagged: bool = False, phase: Optional[str] = None, endpoint: Optional[str] = None):
+    """Most recent individual calls (newest first)."""
+    return meter.calls(limit=limit, flagged=flagged, phase=phase, endpoint=endpoint)
+
+@app.delete("/llm-usage")
+def reset_llm_usage():
+    meter.reset()
+    return {"message": "LLM usage statistics reset"}
+
+@app.get("/profiles")
+def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Saved request profiles, newest first (request one with `X-Profile: sample|cprofile`)."""
+    if not profiling_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Profiling is disabled or X-Profile-Token is invalid")
+    return profile_store.list()
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, download: bool = False, x_profile_token: Optional[str] = Header(None)):
+    """Profile metadata and hot spots; `download=true` returns the speedscope JSON / pstats file."""
+    if not profiling_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Profiling is disabled or X-Profile-Token is invalid")
+    meta = profile_store.get(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if download:
+        return FileResponse(profile_store.data_path(profile_id), filename=meta["file"])
+    return meta
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: checks Ollama and Postgres and reports warm-up state."""
+    report = registry.readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 # Initialize DocumentManager
 doc_manager = DocumentManager()
 
@@ -217,7 +314,7 @@ async def get_document_content(filename: str, version: int):
 @app.post("/extract-rules", response_model=ExtractionResponse)
 async def extract_rules(request: ExtractionRequest):
     # Prompt for rule extraction
-    parser = JsonOutputParser(pydantic_object=ExtractionResponse)
+    parser = TolerantJsonOutputParser(pydantic_object=ExtractionResponse)
     prompt = PromptTemplate(
         template="""Analyze the following insurance policy text and extract:
         1. **Business Rules**: Logic statements. 
@@ -250,10 +347,12 @@ async def extract_rules(request: ExtractionRequest):
         partial_variables={"format_instructions": parser.get_format_instructions()},
     )
     
-    chain = prompt | llm | parser
+    # Oversized documents are cut at the tail instead of Ollama dropping the instructions at the front
+    plan = plan_call("extraction", prompt.template + parser.get_format_instructions(), {"text": request.text}, priorities={"text": 1})
+    chain = prompt | plan.bind(structured(extraction_llm, model_schema(ExtractionResponse))) | parser
     
     try:
-        result = chain.invoke({"text": request.text})
+        result = chain.invoke(plan.inputs)
         # Ensure all lists are present
         if 'rules' not in result: result['rules'] = []
         if 'datatypes' not in result: result['datatypes'] = []
@@ -263,7 +362,7 @@ async def extract_rules(request: ExtractionRequest):
 
 @app.post("/extract-candidates", response_model=List[CandidateRule])
 async def extract_candidates(request: ExtractionRequest):
-    parser = JsonOutputParser(pydantic_object=CandidateList)
+    parser = TolerantJsonOutputParser(pydantic_object=CandidateList)
     prompt = PromptTemplate(
         template="""Act as an Insurance Claims Adjuster. Analyze the policy text and extract all business rules relevant to eligibility, coverage, exclusions, and limitations.
 
@@ -284,9 +383,10 @@ async def extract_candidates(request: ExtractionRequest):
         input_variables=["text"],
         partial_variables={"format_instructions": parser.get_format_instructions()},
     )
-    chain = prompt | llm | parser
+    plan = plan_call("candidates", prompt.template + parser.get_format_instructions(), {"text": request.text}, priorities={"text": 1})
+    chain = prompt | plan.bind(structured(extraction_llm, model_schema(CandidateList))) | parser
     try:
-        result = chain.invoke({"text": request.text})
+        result = chain.invoke(plan.inputs)
         # Result should be {'rules': [...]}
         rules = result.get('rules', [])
         
@@ -304,7 +404,7 @@ async def enrich_rules(request: EnrichmentRequest):
         # Delegate to GenerationService (The Architect)
         return await gen_service.enrich_rules(request.rules, request.text, request.filename)
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Enrichment request failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/generate-kraken-rules", response_model=KrakenRuleResponse)
@@ -317,23 +417,22 @@ async def generate_kraken_rules(request: KrakenRuleRequest):
         # Format the Excel data into a string
         excel_data_str = "\n".join([f"{item['summary']}\n{item['source_text']}" for item in request.excel_data])
         
-        # Combine the prompt template with the Excel data
-        full_prompt = f"{prompt_template}\n\nPlease generate the following Kraken rule based on the Kraken rule above:\n\n{excel_data_str}"
+        # The instructions are required; the sheet content is trimmed when the two do not fit the context window
+        template = "{instructions}\n\nPlease generate the following Kraken rule based on the Kraken rule above:\n\n{sheets}"
+        inputs = {"instructions": prompt_template, "sheets": excel_data_str}
         
-        # Print full_prompt to log
-        print("\n=== Full Prompt for Kraken Rules Generation ===")
-        print(full_prompt)
-        print("=== End of Full Prompt ===\n")
+        logger.info(f"[KRAKEN] Generating from {len(request.excel_data)} sheet items, prompt {len(prompt_template) + len(excel_data_str)} chars")
+        log_payload(logger, "[KRAKEN] Sheets", excel_data_str)
         
         # Call Ollama API directly without parsing (we want raw text response)
+        plan = plan_call("kraken", template, inputs, priorities={"sheets": 1})
         chain = PromptTemplate(
-            template="{prompt}",
-            input_variables=["prompt"]
-        ) | llm
+            template=template,
+            input_variables=["instructions", "sheets"]
+        ) | plan.bind(kraken_llm)
         
-        result = chain.invoke({"prompt": full_prompt})
-        print("The result is:\n")
-        print(result)
+        result = chain.invoke(plan.inputs)
+        log_payload(logger, "[KRAKEN] Result", result)
         
         # Return the generated rules as raw text
         return KrakenRuleResponse(generated_rules=result)
@@ -372,7 +471,7 @@ async def delete_document(filename: str):
 
 
 @app.post("/generate-excel")
-async def generate_excel(request: GenerationRequest, background_tasks: BackgroundTasks):
+async def generate_excel(request: GenerationRequest, background_tasks: BackgroundTasks, stream: bool = False):
     selected_rules = [r for r in request.rules if r.selected]
     if not selected_rules:
         return {"message": "No rules selected"}
@@ -381,10 +480,7 @@ async def generate_excel(request: GenerationRequest, background_tasks: Backgroun
         # 1. Generate Structure using 3-Layer Pipeline
         structure = await gen_service.generate_excel_structure(request)
         
-        # 2. Create Workbook
-        wb = gen_service.create_workbook(structure)
-        
-        # 3. Handle File Saving / Git
+        # 2. Handle File Saving / Git
         # Determine clean filename
         clean_name = "OpenL_Rules.xlsx"
         if request.original_filename:
@@ -392,36 +488,70 @@ async def generate_excel(request: GenerationRequest, background_tasks: Backgroun
             base_name = re.sub(r'[-_]\d{4}[-_]\d{2}[-_]\d{2}.*', '', base_name)
             base_name = re.sub(r'[-_]\d{10,}.*', '', base_name)
             clean_name = f"{base_name}.xlsx"
+
+        quality = structure.get("quality")
+        quality_summary = None
+        if quality:
+            quality_summary = {k: quality[k] for k in ("cases", "passed", "elapsed_ms")}
+            quality_summary["failed"] = len(quality["failed"])
+
+        # 3. Stream the workbook straight to the client (no Git, nothing kept on disk)
+        if stream and not request.create_pr:
+            return StreamingResponse(
+                gen_service.stream_workbook(structure),
+                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                headers={
+                    "Content-Disposition": f'attachment; filename="{clean_name}"',
+                    "X-Quality-Failed": str(quality_summary["failed"] if quality_summary else 0),
+                },
+            )
             
-        # Save locally first
+        # Save locally first (write-only workbook, rows flushed as they are written)
         os.makedirs("generated", exist_ok=True)
         save_path = os.path.join("generated", clean_name)
-        wb.save(save_path)
+        await asyncio.to_thread(gen_service.save_workbook, structure, save_path)
         
+        if request.create_pr and QUALITY_GATE == "block" and quality and quality["failed"]:
+            # Failing test cases never reach Git; the workbook stays downloadable for inspection
+            return JSONResponse(status_code=422, content={
+                "status": "blocked",
+                "detail": f"{len(quality['failed'])} generated test cases fail against the generated rules; not pushed to Git.",
+                "download_url": f"/download/{clean_name}",
+                "quality": quality,
+            })
+
         if request.create_pr:
-            # Synchronous Git Operation (so we can return the MR URL)
-            git_result = await git_service.create_pr_sync(save_path, clean_name, delete_after=False) # Don't delete yet if download is needed? Actually download is from 'generated/', sync uses temp path content?
-            # Wait, create_pr_sync copies from save_path to repo_path. 
-            # We should keep save_path in 'generated/' so user can download it.
-            
+            # Git runs as a background job; the MR details are polled from /publish-jobs/{job_id}.
+            # The job stages its own copy, so save_path stays in 'generated/' for the download.
+            job = publish_queue.submit(save_path, clean_name)
             return {
-                "status": "success",
-                "message": f"File generated and pushed to Git.\n\nFile: {clean_name}",
+                "status": "queued",
+                "message": f"File generated; publishing to Git.\n\nFile: {clean_name}",
                 "download_url": f"/download/{clean_name}",
-                "mr_url": git_result.get("mr_url", ""),
-                "source_branch": git_result.get("source_branch", ""),
-                "target_branch": git_result.get("target_branch", "")
+                "job_id": job.id,
+                "status_url": f"/publish-jobs/{job.id}",
+                "source_branch": git_service.branch,
+                "target_branch": git_service.target_branch,
+                "quality": quality_summary
             }
         else:
             return {
                 "status": "success", 
-                "download_url": f"/download/{clean_name}"
+                "download_url": f"/download/{clean_name}",
+                "quality": quality_summary
             }
 
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Excel generation request failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/publish-jobs/{job_id}")
+async def get_publish_job(job_id: str):
+    job = publish_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Publish job not found")
+    return job.to_dict()
+
 @app.get("/download/{filename}")
 async def download_file(filename: str, background_tasks: BackgroundTasks):
     file_path = os.path.join("generated", filename)
@@ -430,30 +560,10 @@ async def download_file(filename: str, background_tasks: BackgroundTasks):
         return FileResponse(file_path, filename=filename)
     raise HTTPException(status_code=404, detail="File not found")
         
-# Connection string for pgvector
-DB_USER = os.getenv("PG_USER", "user")
-DB_PASSWORD = os.getenv("PG_PASSWORD", "password")
-DB_HOST = os.getenv("PG_HOST", "localhost")
-DB_PORT = os.getenv("PG_PORT", "5432")
-DB_NAME = os.getenv("PG_DB", "openl_rag")
-
-CONNECTION_STRING = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-embedding_model = os.getenv("EMBEDDING_MODEL", "mxbai-embed-large:latest")
-
-embeddings = OllamaEmbeddings(
-    base_url=ollama_base_url,
-    model=embedding_model,
-    # headers={"Authorization": f"Bearer {ollama_api_key}"} if ollama_api_key else None
-)
+embeddings = registry.embeddings()
 
 def get_vector_store():
-    return PGVector(
-        embeddings=embeddings,
-        collection_name="openl_guide",
-        connection=CONNECTION_STRING,
-        use_jsonb=True,
-    )
+    return registry.vector_store()
 
 @app.post("/ingest-guide")
 async def ingest_guide(file: UploadFile = File(...)):
@@ -469,7 +579,8 @@ async def ingest_guide(file: UploadFile = File(...)):
         splits = text_splitter.split_documents(docs)
         
         vector_store = get_vector_store()
-        vector_store.add_documents(splits)
+        with span("pgvector.add", chunks=len(splits)):
+            vector_store.add_documents(splits)
         
         return {"message": "Ingestion complete", "chunks": len(splits)}
     except Exception as e:
@@ -89,6 +89,24 @@ DATATYPE_GENERATION_PROMPT_TEMPLATE = """You are an OpenL Tablets Developer. Gen
 Output valid JSON describing the Datatype tables (e.g. `{{ "tables": [ {{ "header": "...", "rows": [...] }} ] }}`).
 """
 
+# 2b. Datatype Defaults Prompt (optional Phase A enrichment)
+DATATYPE_DEFAULTS_PROMPT_TEMPLATE = """You are an OpenL Tablets Developer. Suggest **default values** for the fields of the following Datatypes.
+
+**Datatypes**:
+{datatypes_input}
+
+**Policy Rules (for reference)**:
+{rules_summary}
+
+**Instructions**:
+- Only suggest a default when the rules or common business sense clearly imply one (e.g. `status` = `"Active"`, `count` = `0`).
+- Leave fields out when no sensible default exists. Never invent defaults for dates or identifiers.
+- Values must be valid OpenL literals for the field type (`true`/`false`, numbers, plain strings).
+- Use the exact Datatype and field names given above.
+
+Output valid JSON only: `{{ "defaults": {{ "<DatatypeName>": {{ "<fieldName>": "<value>" }} }} }}`.
+"""
+
 # 3. Spreadsheet Generation Prompt (Phase B)
 SPREADSHEET_GENERATION_PROMPT_TEMPLATE = """You are an OpenL Tablets Developer. Generate **Spreadsheet** tables for the following Intermediate Variables.
 
@@ -378,3 +396,37 @@ TEST_GENERATION_PROMPT_TEMPLATE = """You are an OpenL Tablets Quality Assurance
 
 **Output**: valid JSON describing the Test tables (Same structure as others: `{{ "tables": [ ... ] }}`).
 """
+
+# 7. Test Case Naming Prompt (optional Phase D enrichment)
+TEST_NARRATIVE_PROMPT_TEMPLATE = """You are an OpenL Tablets Quality Assurance Engineer. Give each generated test case a short narrative name.
+
+**Test Cases** (one line per case: `<TestTable> <CaseId>: <inputs> => <expected>`):
+{cases}
+
+**Instructions**:
+- Describe the scenario in business terms in at most 8 words (e.g. "Adult member with active status is eligible").
+- Do NOT change inputs or expectations; only name the cases.
+- Use the exact Test table names and case ids given above.
+
+Output valid JSON only: `{{ "names": {{ "<TestTable>": {{ "<CaseId>": "<name>" }} }} }}`.
+"""
+
+# 8. Table Repair Prompt (targeted retry of a single invalid table)
+TABLE_REPAIR_PROMPT_TEMPLATE = """You are an OpenL Tablets Developer. The following generated table failed validation. Fix ONLY the listed problems.
+
+**Table**:
+{table}
+
+**Validation Errors**:
+{errors}
+
+**Available Data**:
+- Vocabulary: {datatypes_summary}
+
+**Instructions**:
+- Keep the table name, its intent and all rule rows; change only what the errors require.
+- Rows must be JSON lists of strings and all rows must have the same number of cells.
+- Only reference Datatypes and fields listed in the Vocabulary.
+
+Output valid JSON only: the corrected table as `{{ "header": "...", "rows": [...] }}`.
+"""
@@ -0,0 +1,124 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.tracing import record_cache
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", "artifact_cache")
+# Entries kept in memory (least recently used dropped first)
+ARTIFACT_CACHE_MEMORY_ITEMS = int(os.getenv("ARTIFACT_CACHE_MEMORY_ITEMS", "2000"))
+# Files kept on disk per kind; the least recently used are pruned every PRUNE_EVERY writes
+ARTIFACT_CACHE_MAX_FILES = int(os.getenv("ARTIFACT_CACHE_MAX_FILES", "10000"))
+PRUNE_EVERY = 100
+
+
+def prompt_version(template: str) -> str:
+    """Short fingerprint of a prompt template; editing the prompt invalidates its artifacts."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def artifact_key(*parts: Any) -> str:
+    """Stable hash of the inputs that determine a generated table."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed store of generated OpenL tables.
+    Layout: <cache_dir>/<kind>/<key>.json, where kind is "datatype", "decision" or "test".
+    Hits are kept in a bounded in-memory LRU as JSON text, so every `get` returns a fresh copy
+    callers may mutate. Writes are atomic (temp file + replace); the directory is capped at
+    `max_files` per kind, pruning by modification time (refreshed on every disk hit).
+    """
+
+    def __init__(self, cache_dir: str = ARTIFACT_CACHE_DIR, memory_items: int = ARTIFACT_CACHE_MEMORY_ITEMS,
+                 max_files: int = ARTIFACT_CACHE_MAX_FILES):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.max_files = max_files
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._writes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.cache_dir, kind, f"{key}.json")
+
+    def _remember(self, mem_key: str, text: str):
+        with self._lock:
+            self._memory[mem_key] = text
+            self._memory.move_to_end(mem_key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, kind: str, key: str) -> Optional[List[dict]]:
+        mem_key = f"{kind}/{key}"
+        with self._lock:
+            text = self._memory.get(mem_key)
+            if text is not None:
+                self._memory.move_to_end(mem_key)
+        if text is None:
+            path = self._path(kind, key)
+            if not os.path.exists(path):
+                record_cache(f"artifact_{kind}", False)
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                tables = json.loads(text)
+                os.utime(path)
+            except Exception as e:
+                logger.warning(f"[ARTIFACT] Read Error {path}: {e}")
+                return None
+            self._remember(mem_key, text)
+            record_cache(f"artifact_{kind}", True)
+            return tables
+        record_cache(f"artifact_{kind}", True)
+        return json.loads(text)
+
+    def put(self, kind: str, key: str, tables: List[dict]):
+        path = self._path(kind, key)
+        text = json.dumps(tables)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"[ARTIFACT] Write Error {path}: {e}")
+            return
+        self._remember(f"{kind}/{key}", text)
+        with self._lock:
+            self._writes[kind] = self._writes.get(kind, 0) + 1
+            due = self._writes[kind] >= PRUNE_EVERY
+            if due:
+                self._writes[kind] = 0
+        if due:
+            self.prune(kind)
+
+    def prune(self, kind: str) -> int:
+        """Delete the least recently used files of `kind` beyond `max_files`; returns how many."""
+        directory = os.path.join(self.cache_dir, kind)
+        try:
+            paths = [os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(".json")]
+        except FileNotFoundError:
+            return 0
+        excess = len(paths) - self.max_files
+        if excess <= 0:
+            return 0
+        removed = 0
+        for path in sorted(paths, key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)[:excess]:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        logger.info(f"[ARTIFACT] Pruned {removed} {kind} entries (max {self.max_files})")
+        return removed
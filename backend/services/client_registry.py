@@ -0,0 +1,260 @@
+import os
+import time
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+from ollama import Client, AsyncClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from langchain_postgres import PGVector
+
+from services.llm_router import LLMRouter, OllamaBackend, RoutedOllamaLLM, RoutedOllamaEmbeddings
+from services.token_budget import OLLAMA_MIN_CTX
+
+logger = logging.getLogger(__name__)
+
+# LLM Configuration
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+# Comma-separated list of Ollama hosts; falls back to the single OLLAMA_BASE_URL
+OLLAMA_BASE_URLS = [u.strip() for u in os.getenv("OLLAMA_BASE_URLS", "").split(",") if u.strip()] or [OLLAMA_BASE_URL]
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-oss:20b")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "mxbai-embed-large:latest")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "-1")  # -1 pins the model in memory
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "600"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+OLLAMA_MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "10"))
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("ROUTER_FAILURE_THRESHOLD", "3"))
+ROUTER_COOLDOWN_SECONDS = float(os.getenv("ROUTER_COOLDOWN_SECONDS", "30"))
+
+# Prompt type -> model. Unset routes use LLM_MODEL.
+ROUTE_MODELS = {
+    "default": LLM_MODEL,
+    "extraction": os.getenv("LLM_MODEL_EXTRACTION", ""),
+    "generation": os.getenv("LLM_MODEL_GENERATION", ""),
+    "kraken": os.getenv("LLM_MODEL_KRAKEN", ""),
+    "tests": os.getenv("LLM_MODEL_TESTS", ""),
+}
+
+# Database Config
+DB_USER = os.getenv("PG_USER", "user")
+DB_PASSWORD = os.getenv("PG_PASSWORD", "password")
+DB_HOST = os.getenv("PG_HOST", "localhost")
+DB_PORT = os.getenv("PG_PORT", "5432")
+DB_NAME = os.getenv("PG_DB", "openl_rag")
+CONNECTION_STRING = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+COLLECTION_NAME = "openl_guide"
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def _parse_keep_alive(value: str) -> Union[int, str]:
+    """Ollama accepts either seconds (int) or a duration string like '30m'."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+class ClientRegistry:
+    """
+    Process-wide owner of the expensive clients:
+    - one pooled HTTP session per Ollama host, shared by every LLM / embedding wrapper
+      and load-balanced through an LLMRouter
+    - one SQLAlchemy engine (tuned pool) shared by the pgvector store
+    Everything is created lazily so importing the app never touches the network.
+    """
+
+    def __init__(self, base_urls: Optional[List[str]] = None):
+        self.keep_alive = _parse_keep_alive(OLLAMA_KEEP_ALIVE)
+        pool_kwargs = dict(
+            timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+                keepalive_expiry=300,
+            ),
+        )
+        self.router = LLMRouter(
+            [
+                OllamaBackend(url, Client(host=url, **pool_kwargs), AsyncClient(host=url, **pool_kwargs))
+                for url in (base_urls or OLLAMA_BASE_URLS)
+            ],
+            route_models=ROUTE_MODELS,
+            failure_threshold=ROUTER_FAILURE_THRESHOLD,
+            cooldown=ROUTER_COOLDOWN_SECONDS,
+        )
+        self._lock = threading.Lock()
+        self._llms: Dict[str, RoutedOllamaLLM] = {}
+        self._embeddings: Optional[RoutedOllamaEmbeddings] = None
+        self._engine: Optional[Engine] = None
+        self._vector_store: Optional[PGVector] = None
+        # Without warm-up on startup nothing will ever move the state past "pending"
+        self.warmup_status: Dict[str, Any] = {"state": "pending" if WARMUP_ON_STARTUP else "skipped", "components": {}}
+
+    # --- Clients -------------------------------------------------------------
+
+    def llm(self, route: str = "default") -> RoutedOllamaLLM:
+        """LLM for a prompt type (extraction, generation, kraken, tests); the model follows ROUTE_MODELS."""
+        with self._lock:
+            if route not in self._llms:
+                self._llms[route] = RoutedOllamaLLM(
+                    base_url=self.router.backends[0].url,
+                    model=self.router.model_for(route, LLM_MODEL),
+                    keep_alive=self.keep_alive,
+                    router=self.router,
+                    route=route,
+                )
+            return self._llms[route]
+
+    def embeddings(self) -> RoutedOllamaEmbeddings:
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = RoutedOllamaEmbeddings(
+                    base_url=self.router.backends[0].url,
+                    model=EMBEDDING_MODEL,
+                    keep_alive=self.keep_alive,
+                    router=self.router,
+                )
+            return self._embeddings
+
+    @property
+    def engine(self) -> Engine:
+        with self._lock:
+            if self._engine is None:
+                self._engine = create_engine(
+                    CONNECTION_STRING,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=True,
+                )
+            return self._engine
+
+    def vector_store(self) -> PGVector:
+        if self._vector_store is None:
+            embeddings = self.embeddings()
+            engine = self.engine
+            with self._lock:
+                if self._vector_store is None:
+                    self._vector_store = PGVector(
+                        embeddings=embeddings,
+                        collection_name=COLLECTION_NAME,
+                        connection=engine,
+                        use_jsonb=True,
+                    )
+        return self._vector_store
+
+    # --- Lifecycle -----------------------------------------------------------
+
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        Load the models into Ollama memory (pinned with keep_alive), open the first
+        DB connections and initialise the vector store. Each step is recorded
+        separately so a down dependency doesn't hide the others.
+        """
+        self.warmup_status["state"] = "running"
+        steps = {}
+        models = sorted({m for m in ROUTE_MODELS.values() if m})
+        for backend in self.router.backends:
+            for model in models:
+                steps[f"llm:{model}@{backend.url}"] = (
+                    lambda c=backend.client, m=model: c.generate(model=m, prompt="", keep_alive=self.keep_alive, options={"num_ctx": OLLAMA_MIN_CTX})
+                )
+            steps[f"embeddings@{backend.url}"] = (
+                lambda c=backend.client: c.embed(model=EMBEDDING_MODEL, input="warm-up", keep_alive=self.keep_alive)
+            )
+        steps["vector_store"] = self.vector_store
+        all_ok = True
+        for name, step in steps.items():
+            start = time.perf_counter()
+            try:
+                step()
+                self.warmup_status["components"][name] = {"ok": True, "seconds": round(time.perf_counter() - start, 3)}
+            except Exception as e:
+                all_ok = False
+                self.warmup_status["components"][name] = {"ok": False, "error": str(e)}
+                logger.warning(f"Warm-up step '{name}' failed: {e}")
+        self.warmup_status["state"] = "done" if all_ok else "degraded"
+        return self.warmup_status
+
+    def close(self):
+        for backend in self.router.backends:
+            try:
+                backend.client._client.close()
+            except Exception:
+                pass
+        if self._engine is not None:
+            self._engine.dispose()
+
+    # --- Health --------------------------------------------------------------
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Cheap, local-only view of both pools (no network calls)."""
+        backends = []
+        for backend, routing in zip(self.router.backends, self.router.stats()):
+            http_pool = getattr(getattr(backend.client._client, "_transport", None), "_pool", None)
+            routing["open_connections"] = len(getattr(http_pool, "connections", [])) if http_pool is not None else None
+            backends.append(routing)
+        stats: Dict[str, Any] = {
+            "ollama": {
+                "max_connections_per_host": OLLAMA_MAX_CONNECTIONS,
+                "backends": backends,
+                "routes": {route: llm.model for route, llm in self._llms.items()},
+            },
+            "database": {"initialized": self._engine is not None},
+        }
+        if self._engine is not None:
+            pool = self._engine.pool
+            stats["database"].update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "status": pool.status(),
+            })
+        return stats
+
+    def readiness(self) -> Dict[str, Any]:
+        """Active checks against Ollama and Postgres; used by the /ready probe."""
+        checks: Dict[str, Any] = {}
+        hosts = {}
+        for backend in self.router.backends:
+            try:
+                loaded = [m.model for m in backend.client.ps().models]
+                hosts[backend.url] = {"ok": True, "loaded_models": loaded, "llm_loaded": LLM_MODEL in loaded}
+            except Exception as e:
+                hosts[backend.url] = {"ok": False, "error": str(e)}
+        # One reachable host is enough to serve traffic
+        checks["ollama"] = {"ok": any(h["ok"] for h in hosts.values()), "hosts": hosts}
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            checks["database"] = {"ok": True}
+        except Exception as e:
+            checks["database"] = {"ok": False, "error": str(e)}
+
+        ready = all(c["ok"] for c in checks.values()) and self.warmup_status["state"] in ("done", "degraded", "skipped")
+        return {"ready": ready, "warmup": self.warmup_status, "checks": checks, "pools": self.pool_stats()}
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ClientRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+        return _registry
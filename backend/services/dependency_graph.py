@@ -0,0 +1,164 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models import Datatype, IntermediateVariable, Rule
+from services.prompt_encoding import encode_datatypes
+from services.vocabulary import with_current_date
+
+# Rule -> datatype/field/variable references, so each Phase C call only carries the part of
+# the vocabulary its rules use and prompt size no longer grows with the project.
+
+_QUOTED = re.compile(r'"[^"]*"|\'[^\']*\'')
+_PATH = re.compile(r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*')
+
+
+@dataclass
+class Variable:
+    name: str
+    type: Optional[str]
+    logic: str
+
+    @property
+    def line(self) -> str:
+        return f"- {self.name} ({self.type}): {self.logic}" if self.type else f"- {self.name}: {self.logic}"
+
+
+@dataclass
+class References:
+    fields: Dict[str, Set[str]] = field(default_factory=dict)  # datatype -> referenced fields
+    mentioned: Set[str] = field(default_factory=set)  # datatypes named without a field
+    variables: Set[str] = field(default_factory=set)
+
+    def add_field(self, datatype: str, name: str):
+        self.fields.setdefault(datatype, set()).add(name)
+
+    def update(self, other: "References"):
+        for datatype, names in other.fields.items():
+            self.fields.setdefault(datatype, set()).update(names)
+        self.mentioned |= other.mentioned
+
+    def whole(self) -> Set[str]:
+        """Datatypes needed with all their fields: named (or related) but no field referenced."""
+        return self.mentioned - set(self.fields)
+
+
+@dataclass
+class Scope:
+    """The datatypes (pruned to the referenced fields) and variables a set of rules depends on."""
+    datatypes: List[Datatype]
+    variables: List[Variable]
+
+    @property
+    def datatypes_input(self) -> str:
+        return encode_datatypes(self.datatypes)
+
+    @property
+    def variables_text(self) -> str:
+        return "\n".join(v.line for v in self.variables)
+
+
+class DependencyGraph:
+    """
+    Built from rule conditions/results, `Rule.related_datatypes` and intermediate-variable
+    logic. Paths such as `Member.hireDate` / `m.hireDate`, bare field names, datatype names
+    and variable names are resolved; variables pull in whatever their own logic references.
+    """
+
+    def __init__(self, datatypes: List[Datatype], variables: List[Variable], rules: Iterable[Rule] = ()):
+        self.datatypes = with_current_date(list(datatypes), list(rules))
+        self.variables = variables
+        self._datatypes = {d.name.lower(): d for d in self.datatypes}
+        self._fields: Dict[str, List[Tuple[str, str]]] = {}
+        for d in self.datatypes:
+            for f in d.fields:
+                self._fields.setdefault(f.name.lower(), []).append((d.name, f.name))
+        self._variables = {v.name.lower(): v for v in variables}
+        self._variable_refs = {v.name: self._references(v.logic) for v in variables}
+
+    @classmethod
+    def from_request(cls, datatypes: List[Datatype], intermediate_variables: List[IntermediateVariable], rules: List[Rule]) -> "DependencyGraph":
+        if intermediate_variables:
+            variables = [Variable(v.name, v.type, v.logic or "") for v in intermediate_variables]
+        else:
+            # Legacy fallback: the other rules' conditions stand in for intermediate variables
+            variables = [Variable(str(r.name), None, str(r.condition)) for r in rules if r.name]
+        return cls(datatypes, variables, rules)
+
+    def _resolve_field(self, refs: References, name: str) -> bool:
+        matches = self._fields.get(name.lower(), [])
+        for datatype, field_name in matches:
+            refs.add_field(datatype, field_name)
+        return bool(matches)
+
+    def _references(self, text: str) -> References:
+        refs = References()
+        for path in _PATH.findall(_QUOTED.sub(" ", text or "")):
+            head, *rest = path.split(".")
+            datatype = self._datatypes.get(head.lower())
+            if datatype is not None:
+                if rest and self._resolve_field_of(refs, datatype, rest[0]):
+                    continue
+                refs.mentioned.add(datatype.name)
+            elif head.lower() in self._variables:
+                refs.variables.add(self._variables[head.lower()].name)
+            elif not self._resolve_field(refs, head):
+                # `m.age`: an alias whose type we can't see; resolve the field part instead
+                for part in rest[:1]:
+                    self._resolve_field(refs, part)
+        return refs
+
+    def _resolve_field_of(self, refs: References, datatype: Datatype, name: str) -> bool:
+        for f in datatype.fields:
+            if f.name.lower() == name.lower():
+                refs.add_field(datatype.name, f.name)
+                return True
+        return False
+
+    def references(self, rule: Rule) -> References:
+        """Direct references of one rule plus the transitive closure over variables."""
+        refs = self._references(f"{rule.condition or ''} {rule.result or ''}")
+        for name in rule.related_datatypes:
+            datatype = self._datatypes.get(name.lower())
+            if datatype is not None:
+                refs.mentioned.add(datatype.name)
+        # A rule never depends on itself through the legacy rule-as-variable fallback
+        refs.variables.discard(str(rule.name))
+        pending = list(refs.variables)
+        while pending:
+            inner = self._variable_refs.get(pending.pop(), References())
+            refs.update(inner)
+            for name in inner.variables - refs.variables:
+                refs.variables.add(name)
+                pending.append(name)
+        return refs
+
+    def scope(self, rules: Iterable[Rule]) -> Scope:
+        fields: Dict[str, Set[str]] = {}
+        whole: Set[str] = set()
+        variables: Set[str] = set()
+        for rule in rules:
+            refs = self.references(rule)
+            if not refs.fields and not refs.mentioned and not refs.variables:
+                # Nothing resolved (free-text condition): fall back to the whole project
+                return Scope(list(self.datatypes), list(self.variables))
+            for datatype, names in refs.fields.items():
+                fields.setdefault(datatype, set()).update(names)
+            whole |= refs.whole()
+            variables |= refs.variables
+
+        datatypes = []
+        for d in self.datatypes:
+            if d.name in whole:
+                datatypes.append(d)
+            elif d.name in fields:
+                datatypes.append(d.model_copy(update={"fields": [f for f in d.fields if f.name in fields[d.name]]}))
+        return Scope(datatypes, [v for v in self.variables if v.name in variables])
+
+    def describe(self, scope: Scope) -> str:
+        fields = sum(len(d.fields) for d in scope.datatypes)
+        total_fields = sum(len(d.fields) for d in self.datatypes)
+        return (
+            f"{len(scope.datatypes)}/{len(self.datatypes)} datatypes, {fields}/{total_fields} fields, "
+            f"{len(scope.variables)}/{len(self.variables)} variables"
+        )
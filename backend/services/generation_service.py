@@ -1,201 +1,264 @@
 import os
 import json
 import re
-from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from langchain_ollama import OllamaLLM, OllamaEmbeddings
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_postgres import PGVector
 from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 from openpyxl.cell.cell import TYPE_STRING
 
 from models import Rule, Datatype, ExtractionResponse, GenerationRequest, IntermediateVariable, HelperRuleDefinition
 from prompts import (
     ENRICHMENT_PROMPT_TEMPLATE, 
     DATATYPE_GENERATION_PROMPT_TEMPLATE,
+    DATATYPE_DEFAULTS_PROMPT_TEMPLATE,
     SPREADSHEET_GENERATION_PROMPT_TEMPLATE,
     DECISION_TABLE_GENERATION_PROMPT_TEMPLATE,
     TEST_GENERATION_PROMPT_TEMPLATE,
+    TEST_NARRATIVE_PROMPT_TEMPLATE,
+    TABLE_REPAIR_PROMPT_TEMPLATE,
     ORCHESTRATOR_PROMPT_TEMPLATE
 )
+from services.client_registry import ClientRegistry, get_registry
+from services.workbook_writer import iter_tables, write_workbook, stream_workbook
+from services.artifact_cache import ArtifactCache, artifact_key, prompt_version
+from services.vocabulary_store import VocabularyStore, merge_vocabulary
+from services.vocabulary import build_vocabulary_tables, openl_datatypes
+from services.rule_tests import RuleTestSynthesizer
+from services.table_validator import TableValidator
+from services.rule_evaluator import QUALITY_GATE, evaluate_structure
+from services.structured_output import (
+    TABLE_SCHEMA, TABLES_SCHEMA, TolerantJsonOutputParser, model_schema, nested_string_map_schema, parse_json, structured
+)
+from services.token_budget import plan_call
+from services.dependency_graph import DependencyGraph, Scope
+from services.prompt_encoding import compact_json, encode_conditions, encode_datatypes, encode_rules, report_savings
+from services.tracing import record_cache, span
+from services.structured_logging import log_payload
+
+logger = logging.getLogger(__name__)
+
+# Enrichment: "batched" enriches candidate rules in parallel groups, each with only the source
+# snippets of its rules; "single" sends every rule plus the whole document in one call
+ENRICH_MODE = os.getenv("ENRICH_MODE", "batched")
+ENRICH_BATCH_SIZE = int(os.getenv("ENRICH_BATCH_SIZE", "8"))
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "4"))
+ENRICH_MAX_RETRIES = int(os.getenv("ENRICH_MAX_RETRIES", "1"))
+ENRICH_SNIPPET_CONTEXT_CHARS = int(os.getenv("ENRICH_SNIPPET_CONTEXT_CHARS", "300"))
+
+# Phase A: "native" emits Datatype tables straight from the request models (no LLM),
+# "enrich" adds LLM-suggested default values on top, "llm" is the legacy generation prompt
+VOCAB_MODE = os.getenv("VOCAB_MODE", "native")
+
+# Phase D: "hybrid" derives Test tables from the decision table rows locally and sends the
+# tables the synthesizer cannot parse (e.g. dateDif conditions) to the LLM, "synth" skips
+# those tables, "llm" is the legacy test prompt
+TEST_GENERATION_MODE = os.getenv("TEST_GENERATION_MODE", "hybrid")
+TEST_NARRATIVE_NAMES = os.getenv("TEST_NARRATIVE_NAMES", "false").lower() == "true"
 
-# Configuration
-OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-LLM_MODEL = os.getenv("LLM_MODEL", "gpt-oss:20b")
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "mxbai-embed-large:latest")
+# Phase C fan-out: "fanout" generates decision tables per small rule group in parallel,
+# "single" sends every rule in one prompt (legacy behaviour)
+PHASE_C_MODE = os.getenv("PHASE_C_MODE", "fanout")
+PHASE_C_GROUP_SIZE = int(os.getenv("PHASE_C_GROUP_SIZE", "2"))
+PHASE_C_CONCURRENCY = int(os.getenv("PHASE_C_CONCURRENCY", "4"))
+PHASE_C_MAX_RETRIES = int(os.getenv("PHASE_C_MAX_RETRIES", "2"))
 
-# Database Config
-DB_USER = os.getenv("PG_USER", "user")
-DB_PASSWORD = os.getenv("PG_PASSWORD", "password")
-DB_HOST = os.getenv("PG_HOST", "localhost")
-DB_PORT = os.getenv("PG_PORT", "5432")
-DB_NAME = os.getenv("PG_DB", "openl_rag")
-CONNECTION_STRING = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Generated decision tables are validated locally; only the invalid ones are re-prompted
+TABLE_REPAIR_MAX_ATTEMPTS = int(os.getenv("TABLE_REPAIR_MAX_ATTEMPTS", "1"))
+
+# Incremental regeneration: generated tables are cached per rule / datatype
+ARTIFACT_CACHE_ENABLED = os.getenv("ARTIFACT_CACHE", "true").lower() == "true"
+PROMPT_VERSION_A = prompt_version(DATATYPE_GENERATION_PROMPT_TEMPLATE)
+PROMPT_VERSION_DEFAULTS = prompt_version(DATATYPE_DEFAULTS_PROMPT_TEMPLATE)
+PROMPT_VERSION_C = prompt_version(DECISION_TABLE_GENERATION_PROMPT_TEMPLATE)
+PROMPT_VERSION_D = prompt_version(TEST_GENERATION_PROMPT_TEMPLATE)
 
 class GenerationService:
-    def __init__(self):
-        self.llm = OllamaLLM(base_url=OLLAMA_BASE_URL, model=LLM_MODEL)
-        self.embeddings = OllamaEmbeddings(base_url=OLLAMA_BASE_URL, model=EMBEDDING_MODEL)
-        self.vector_store = PGVector(
-            embeddings=self.embeddings,
-            collection_name="openl_guide",
-            connection=CONNECTION_STRING,
-            use_jsonb=True,
-        )
+    def __init__(self, registry: Optional[ClientRegistry] = None):
+        # Clients are shared process-wide; the vector store is resolved lazily
+        self.registry = registry or get_registry()
+        self.llm = self.registry.llm("generation")
+        self.extraction_llm = self.registry.llm("extraction")
+        self.tests_llm = self.registry.llm("tests")
+        self.embeddings = self.registry.embeddings()
+        self.artifact_cache = ArtifactCache()
+        self.vocabulary_store = VocabularyStore()
+
+    @property
+    def vector_store(self):
+        return self.registry.vector_store()
 
     def _get_rag_context(self, query: str) -> str:
         """Retrieve relevant context from the vector store."""
         try:
-            retriever = self.vector_store.as_retriever(
-                search_type="mmr",
-                search_kwargs={"k": 5, "fetch_k": 10}
-            )
-            docs = retriever.invoke(query)
+            # The query embedding is its own child span; the rest is the pgvector MMR search
+            with span("pgvector.search", query_chars=len(query), k=5, fetch_k=10) as search:
+                retriever = self.vector_store.as_retriever(
+                    search_type="mmr",
+                    search_kwargs={"k": 5, "fetch_k": 10}
+                )
+                docs = retriever.invoke(query)
+                if search is not None:
+                    search.set(docs=len(docs), context_chars=sum(len(doc.page_content) for doc in docs))
             return "\n\n".join([doc.page_content for doc in docs])
         except Exception as e:
-            print(f"RAG Retrieval failed: {e}")
+            logger.warning(f"RAG Retrieval failed: {e}")
             return ""
 
     async def enrich_rules(self, rules: List[Any], text: str, filename: Optional[str] = None) -> ExtractionResponse:
         """
         Architect Phase: Analyze rules and define the 3-layer structure.
-        Uses a local cache (enrich_cache/) if logic has been generated for this file before.
+        The document's vocabulary from earlier enrichments (VocabularyStore) is passed along
+        so datatypes and fields keep their names, and the result is merged back into it.
+        Large candidate sets are enriched in parallel batches (ENRICH_MODE=batched).
         """
-        # 0. Cache Lookup
-        CACHE_DIR = "enrich_cache"
-        existing_context_str = ""
-        cached_data = None
-        cache_path = None
-        
+        # 0. Existing vocabulary of this document
+        existing_context_str = self.vocabulary_store.existing_context(filename) if filename else ""
         if filename:
-            os.makedirs(CACHE_DIR, exist_ok=True)
-            # Sanitize filename (basic)
-            safe_name = re.sub(r'[^a-zA-Z0-9_\-\.]', '_', filename)
-            cache_path = os.path.join(CACHE_DIR, f"{safe_name}.json")
-            
-            if os.path.exists(cache_path):
-                print(f"[CACHE] Hit for {filename}")
-                try:
-                    with open(cache_path, "r", encoding="utf-8") as f:
-                        cached_data = json.load(f)
-                    
-                    # Format for Prompt
-                    existing_datatypes = cached_data.get("datatypes", [])
-                    existing_vars = cached_data.get("intermediate_variables", [])
-                    
-                    dt_str = "\n".join([f"- Datatype {d['name']}: {[f['name'] for f in d['fields']]}" for d in existing_datatypes])
-                    var_str = "\n".join([f"- Variable {v['name']} ({v['logic']})" for v in existing_vars])
-                    
-                    existing_context_str = f"**EXISTING DATATYPES**:\n{dt_str}\n\n**EXISTING VARIABLES**:\n{var_str}"
-                except Exception as e:
-                    print(f"[CACHE] Read Error: {e}")
+            record_cache("vocabulary", bool(existing_context_str))
+        if existing_context_str:
+            logger.info(f"[CACHE] Hit for {filename}")
 
         # 1. Retrieve RAG Context for OpenL Syntax (Functions, Dates, etc.)
         rag_context = self._get_rag_context("OpenL Functions DateUtils BEX Syntax")
-        
-        parser = JsonOutputParser(pydantic_object=ExtractionResponse)
-        # Pass existing_context to prompt
-        prompt = PromptTemplate(
-            template=ENRICHMENT_PROMPT_TEMPLATE,
-            input_variables=["rules", "text", "context", "existing_context"],
-            partial_variables={"format_instructions": parser.get_format_instructions()},
-        )
-        
-        chain = prompt | self.llm | parser
-        
-        # Convert rules to dict if they are objects
-        rules_dict = [r.dict() if hasattr(r, 'dict') else r for r in rules]
-        
+
         try:
-            # Pass existing_context argument
-            result = chain.invoke({
-                "rules": rules_dict, 
-                "text": text, 
-                "context": rag_context,
-                "existing_context": existing_context_str
-            })
-            
-            # Post-Processing: Fix common Syntax Hallucinations
-            # 1. Fix Dates.diff -> dateDif
-            if 'intermediate_variables' in result:
-                for v in result['intermediate_variables']:
-                    if v.get('logic'):
-                        old_logic = v['logic']
-                        # Replace Dates.diff(a, b, 'D') with dateDif(a, b, 'D')
-                        v['logic'] = v['logic'].replace("Dates.diff", "dateDif")
-                        if old_logic != v['logic']:
-                            print(f"[DEBUG] Regex Replaced: {old_logic} -> {v['logic']}")
-                            
-            # 2. Cache Update (Save Result)
-            # 2. Cache Update (Merge & Save)
-            if filename and cache_path:
+            if ENRICH_MODE == "batched" and len(rules) > ENRICH_BATCH_SIZE:
+                result = await self._enrich_batched(rules, text, rag_context, existing_context_str)
+            else:
+                result = await asyncio.to_thread(self._invoke_enrichment, rules, text, rag_context, existing_context_str)
+
+            # 2. Merge into the document's vocabulary
+            if filename:
                 try:
-                    # Helper to merge Datatypes
-                    def _merge_datatypes(old_list, new_list):
-                        dt_map = {d['name']: d for d in old_list}
-                        for new_dt in new_list:
-                            name = new_dt['name']
-                            if name in dt_map:
-                                # Merge fields: Add new fields if they don't exist
-                                existing_fields = {f['name'] for f in dt_map[name]['fields']}
-                                for new_f in new_dt['fields']:
-                                    if new_f['name'] not in existing_fields:
-                                        dt_map[name]['fields'].append(new_f)
-                            else:
-                                dt_map[name] = new_dt
-                        return list(dt_map.values())
-
-                    # Helper to merge Variables (Overwrite by name)
-                    def _merge_variables(old_list, new_list):
-                        v_map = {v['name']: v for v in old_list}
-                        for new_v in new_list:
-                            v_map[new_v['name']] = new_v
-                        return list(v_map.values())
-
-                    final_datatypes = result.get("datatypes", [])
-                    final_vars = result.get("intermediate_variables", [])
-                    
-                    if cached_data:
-                        final_datatypes = _merge_datatypes(cached_data.get("datatypes", []), final_datatypes)
-                        final_vars = _merge_variables(cached_data.get("intermediate_variables", []), final_vars)
-
-                    cache_payload = {
-                        "datatypes": final_datatypes,
-                        "intermediate_variables": final_vars
-                    }
-                    
-                    with open(cache_path, "w", encoding="utf-8") as f:
-                        json.dump(cache_payload, f, indent=2)
-                    print(f"[CACHE] Updated and Saved to {cache_path}")
+                    self.vocabulary_store.merge(filename, result.get("datatypes", []), result.get("intermediate_variables", []))
                 except Exception as e:
-                    print(f"[CACHE] Write Error: {e}")
-                        
+                    logger.warning(f"[CACHE] Write Error: {e}")
+
             return ExtractionResponse(**result)
         except Exception as e:
-            print(f"Enrichment failed: {e}")
+            logger.error(f"Enrichment failed: {e}")
             raise e
 
+    def _invoke_enrichment(self, rules: List[Any], text: str, rag_context: str, existing_context_str: str) -> Dict[str, Any]:
+        """Single enrichment LLM call for the given rules."""
+        parser = TolerantJsonOutputParser(pydantic_object=ExtractionResponse)
+        # Pass existing_context to prompt
+        prompt = PromptTemplate(
+            template=ENRICHMENT_PROMPT_TEMPLATE,
+            input_variables=["rules", "text", "context", "existing_context"],
+            partial_variables={"format_instructions": parser.get_format_instructions()},
+        )
+
+        rules_text = encode_rules(rules)
+        report_savings("enrichment", {"rules": (lambda: str([r.model_dump() if hasattr(r, 'model_dump') else r for r in rules]), rules_text)})
+
+        # Rules are required; the source text goes first when over budget, then RAG context
+        plan = plan_call(
+            "enrichment",
+            ENRICHMENT_PROMPT_TEMPLATE + parser.get_format_instructions(),
+            {"rules": rules_text, "text": text, "context": rag_context, "existing_context": existing_context_str},
+            priorities={"text": 1, "context": 2, "existing_context": 3},
+        )
+        chain = prompt | plan.bind(structured(self.extraction_llm, model_schema(ExtractionResponse))) | parser
+
+        # Pass existing_context argument
+        result = chain.invoke(plan.inputs)
+
+        # Post-Processing: Fix common Syntax Hallucinations
+        # 1. Fix Dates.diff -> dateDif
+        if 'intermediate_variables' in result:
+            for v in result['intermediate_variables']:
+                if v.get('logic'):
+                    old_logic = v['logic']
+                    # Replace Dates.diff(a, b, 'D') with dateDif(a, b, 'D')
+                    v['logic'] = v['logic'].replace("Dates.diff", "dateDif")
+                    if old_logic != v['logic']:
+                        logger.debug(f"[ENRICH] Rewrote Dates.diff: {old_logic} -> {v['logic']}")
+        return result
+
+    @staticmethod
+    def _source_snippets(rules: List[Any], text: str) -> str:
+        """
+        The parts of the document a batch of rules was extracted from: each rule's
+        `source_text`, widened by ENRICH_SNIPPET_CONTEXT_CHARS on both sides when found in `text`.
+        Falls back to the whole text when no rule carries a source snippet.
+        """
+        flat = re.sub(r'\s+', ' ', text or "")
+        snippets: List[str] = []
+        for rule in rules:
+            source = re.sub(r'\s+', ' ', getattr(rule, "source_text", None) or "").strip()
+            if not source:
+                continue
+            pos = flat.find(source)
+            if pos >= 0:
+                start = max(0, pos - ENRICH_SNIPPET_CONTEXT_CHARS)
+                end = min(len(flat), pos + len(source) + ENRICH_SNIPPET_CONTEXT_CHARS)
+                source = flat[start:end].strip()
+            if not any(source in s for s in snippets):
+                snippets.append(source)
+        if not snippets:
+            return text
+        return "\n\n".join(f"[{i}] {s}" for i, s in enumerate(snippets, 1))
+
+    async def _enrich_batched(self, rules: List[Any], text: str, rag_context: str, existing_context_str: str) -> Dict[str, Any]:
+        """
+        Candidate rules are enriched in batches of ENRICH_BATCH_SIZE in parallel, each with only
+        its rules' source snippets. A batch whose output is unusable is retried on its own; the
+        batches' datatypes/variables are merged in rule order (earlier batches win type conflicts).
+        """
+        size = max(1, ENRICH_BATCH_SIZE)
+        batches = [rules[i:i + size] for i in range(0, len(rules), size)]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batches)
+        semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+
+        async def run_batch(index: int):
+            batch = batches[index]
+            snippets = self._source_snippets(batch, text)
+            for attempt in range(ENRICH_MAX_RETRIES + 1):
+                async with semaphore:
+                    try:
+                        result = await asyncio.to_thread(self._invoke_enrichment, batch, snippets, rag_context, existing_context_str)
+                    except Exception as e:
+                        logger.warning(f"[ENRICH] Batch {index + 1} attempt {attempt + 1} failed: {e}")
+                        continue
+                if isinstance(result, dict) and isinstance(result.get("rules"), list) and result["rules"]:
+                    results[index] = result
+                    return
+                logger.warning(f"[ENRICH] Batch {index + 1} attempt {attempt + 1} returned no rules; retrying")
+
+        await asyncio.gather(*(run_batch(i) for i in range(len(batches))))
+        failed = [i + 1 for i, r in enumerate(results) if r is None]
+        if len(failed) == len(batches):
+            raise ValueError("every enrichment batch failed")
+        if failed:
+            logger.warning(f"[ENRICH] Batches {failed} failed; their candidate rules are returned unenriched")
+
+        merged_rules: List[Any] = []
+        for batch, result in zip(batches, results):
+            if result is None:
+                merged_rules += [r.model_dump() if hasattr(r, "model_dump") else r for r in batch]
+            else:
+                merged_rules += result["rules"]
+        datatypes, variables, conflicts = merge_vocabulary([r for r in results if r])
+        for conflict in conflicts:
+            logger.warning(f"[ENRICH] Type conflict between batches: {conflict}")
+        helper_rules = [h for r in results if r for h in r.get("helper_rules", [])]
+        logger.info(f"[ENRICH] {len(rules)} rules in {len(batches)} batches -> {len(datatypes)} datatypes, {len(variables)} variables")
+        return {"rules": merged_rules, "datatypes": datatypes, "intermediate_variables": variables, "helper_rules": helper_rules}
+
     def _parse_llm_json(self, raw_response: str) -> Any:
         # Helper to clean and parse JSON
-        parsed_json = None
         try:
-            json_match = re.search(r'\{.*\}|\[.*\]', raw_response, re.DOTALL)
-            if json_match:
-                raw_response = json_match.group(0)
-            parsed_json = json.loads(raw_response)
-        except Exception:
-            # Simple heuristic repair for trailing commas or markdown
-            try:
-                raw_response = raw_response.replace("```json", "").replace("```", "").strip()
-                parsed_json = json.loads(raw_response)
-            except:
-                print(f"Failed to parse JSON: {raw_response[:200]}...")
-                return {"tables": []}
+            parsed_json = parse_json(raw_response)
+        except ValueError:
+            logger.warning(f"Failed to parse JSON: {raw_response[:200]}...")
+            return {"tables": []}
         
         # Normalize: If it's a list, assume it's a list of tables
         if isinstance(parsed_json, list):
@@ -220,23 +283,412 @@ class GenerationService:
             
         return {"tables": []}
 
+    def _invoke_decision_tables(self, rules: List[Rule], datatypes_input: str, variables_text: str, context: str) -> Dict[str, Any]:
+        """Single Phase C LLM call for the given rules."""
+        rules_text_c = encode_conditions(rules)
+        report_savings("decision", {"rules": (lambda: "\n".join(f"- ID: {r.id} | Name: {r.name}: {r.condition}" for r in rules), rules_text_c)})
+        
+        prompt_c = PromptTemplate(
+            template=DECISION_TABLE_GENERATION_PROMPT_TEMPLATE,
+            input_variables=["rules", "datatypes_summary", "variables_summary", "context"]
+        )
+        plan = plan_call(
+            "decision",
+            DECISION_TABLE_GENERATION_PROMPT_TEMPLATE,
+            {"rules": rules_text_c, "datatypes_summary": datatypes_input, "variables_summary": variables_text, "context": context},
+            priorities={"context": 1},
+        )
+        chain_c = prompt_c | plan.bind(structured(self.llm, TABLES_SCHEMA))
+        res_c_raw = chain_c.invoke(plan.inputs)
+        
+        # FIX: Enforce dateDif syntax
+        res_c_raw = res_c_raw.replace("Dates.diff", "dateDif")
+        return self._parse_llm_json(res_c_raw)
+
+    @staticmethod
+    def _check_group_tables(structure: Any, expected: int) -> Optional[str]:
+        """Returns an error description if a group's output is unusable, else None."""
+        tables = structure.get("tables") if isinstance(structure, dict) else None
+        if not isinstance(tables, list) or not tables:
+            return "no tables parsed"
+        for t in tables:
+            if not isinstance(t, dict) or not isinstance(t.get("rows") or t.get("Rows"), list):
+                return "table without rows"
+        if len(tables) < expected:
+            return f"expected {expected} tables, got {len(tables)}"
+        return None
+
+    async def _generate_decision_tables(self, decision_rules: List[Rule], graph: DependencyGraph, context: str) -> List[Tuple[List[Rule], List[dict]]]:
+        """
+        Phase C. In fan-out mode the rules are split into groups of PHASE_C_GROUP_SIZE that
+        are generated in parallel; otherwise they form a single group. Each group's JSON is
+        checked on its own and only the failed groups are re-prompted. Every call only carries
+        the datatypes, fields and variables its rules reference. Returns (group rules, tables)
+        pairs in rule order.
+        """
+        if PHASE_C_MODE != "fanout" or len(decision_rules) <= PHASE_C_GROUP_SIZE:
+            groups = [decision_rules]
+        else:
+            size = max(1, PHASE_C_GROUP_SIZE)
+            groups = [decision_rules[i:i + size] for i in range(0, len(decision_rules), size)]
+        results: List[Optional[List[dict]]] = [None] * len(groups)
+        semaphore = asyncio.Semaphore(PHASE_C_CONCURRENCY)
+
+        async def run_group(index: int):
+            group = groups[index]
+            scope = graph.scope(group)
+            logger.debug(f"[SCOPE] Group {index + 1}/{len(groups)}: {graph.describe(scope)}")
+            # Most tables of the failed attempts; only used if no attempt passes the check
+            fallback: List[dict] = []
+            for attempt in range(PHASE_C_MAX_RETRIES + 1):
+                async with semaphore:
+                    try:
+                        structure = await asyncio.to_thread(self._invoke_decision_tables, group, scope.datatypes_input, scope.variables_text, context)
+                    except Exception as e:
+                        logger.warning(f"[PHASE C] Group {index + 1} attempt {attempt + 1} failed: {e}")
+                        continue
+                error = self._check_group_tables(structure, len(group))
+                tables = [t for t in structure.get("tables", []) if isinstance(t, dict)] if isinstance(structure, dict) else []
+                if error is None:
+                    results[index] = tables
+                    return
+                if len(tables) > len(fallback):
+                    fallback = tables
+                logger.warning(f"[PHASE C] Group {index + 1} ({', '.join(str(r.name) for r in group)}) invalid: {error}; retrying")
+            results[index] = fallback
+
+        await asyncio.gather(*(run_group(i) for i in range(len(groups))))
+        return [(group, results[i] or []) for i, group in enumerate(groups)]
+
+    def _invoke_table_repair(self, table: dict, errors: List[str], datatypes_input: str) -> Optional[dict]:
+        """Re-prompt a single table with its validation errors attached."""
+        prompt = PromptTemplate(
+            template=TABLE_REPAIR_PROMPT_TEMPLATE,
+            input_variables=["table", "errors", "datatypes_summary"]
+        )
+        plan = plan_call("repair", TABLE_REPAIR_PROMPT_TEMPLATE, {
+            "table": compact_json(table),
+            "errors": "\n".join(f"- {e}" for e in errors),
+            "datatypes_summary": datatypes_input,
+        })
+        chain = prompt | plan.bind(structured(self.llm, TABLE_SCHEMA))
+        raw = chain.invoke(plan.inputs)
+        repaired = self._parse_llm_json(raw.replace("Dates.diff", "dateDif"))
+        tables = repaired.get("tables", []) if isinstance(repaired, dict) else []
+        return tables[0] if tables and isinstance(tables[0], dict) else None
+
+    async def _repair_tables(self, tables: List[dict], validator: TableValidator, datatypes_input: str, report: Dict[str, Any]) -> List[dict]:
+        """Validate generated tables and re-prompt only the invalid ones, in parallel."""
+        invalid = validator.invalid(tables)
+        if not invalid:
+            return tables
+        fixed = list(tables)
+        semaphore = asyncio.Semaphore(PHASE_C_CONCURRENCY)
+
+        async def repair(index: int, errors: List[str]):
+            best, best_errors = tables[index], errors
+            for attempt in range(TABLE_REPAIR_MAX_ATTEMPTS):
+                async with semaphore:
+                    try:
+                        candidate = await asyncio.to_thread(self._invoke_table_repair, best, best_errors, datatypes_input)
+                    except Exception as e:
+                        logger.warning(f"[VALIDATE] Repair of {self._table_name(best)} attempt {attempt + 1} failed: {e}")
+                        continue
+                if candidate is None:
+                    continue
+                candidate_errors = validator.validate(candidate)
+                if len(candidate_errors) < len(best_errors):
+                    best, best_errors = candidate, candidate_errors
+                if not best_errors:
+                    break
+            fixed[index] = best
+            if best_errors:
+                report["invalid"].append({"table": self._table_name(best), "errors": best_errors})
+            else:
+                report["repaired"] += 1
+
+        for index, errors in invalid.items():
+            logger.warning(f"[VALIDATE] {self._table_name(tables[index])}: {errors}")
+        await asyncio.gather(*(repair(i, e) for i, e in invalid.items()))
+        return fixed
+
+    @staticmethod
+    def _table_name(table: dict) -> str:
+        """Name of the rule/datatype a table defines, or the rule a Test table targets."""
+        header = table.get("header") or table.get("Header") or ""
+        if isinstance(header, list):
+            header = " ".join(str(h) for h in header)
+        header = str(header).strip()
+        if not header:
+            return str(table.get("name", ""))
+        if header.startswith("Test "):
+            parts = header.split()
+            return parts[1] if len(parts) > 1 else ""
+        match = re.search(r'(\w+)\s*\(', header)
+        if match:
+            return match.group(1)
+        return header.split()[-1]
+
+    def _attribute_tables(self, rules: List[Rule], tables: List[dict]) -> Tuple[Dict[str, List[dict]], List[dict]]:
+        """Map tables generated for a group back to their rules (by name); returns (by rule id, unmatched)."""
+        if len(rules) == 1:
+            return {rules[0].id: list(tables)}, []
+        by_name = {r.name: r.id for r in rules if r.name}
+        owned: Dict[str, List[dict]] = {}
+        unmatched = []
+        for t in tables:
+            rule_id = by_name.get(self._table_name(t))
+            if rule_id:
+                owned.setdefault(rule_id, []).append(t)
+            else:
+                unmatched.append(t)
+        return owned, unmatched
+
+    # --- Artifact keys (incremental regeneration) -----------------------------
+
+    @staticmethod
+    def _datatype_key(datatype: Datatype) -> str:
+        return artifact_key("datatype", datatype.name, [(f.name, f.type) for f in datatype.fields], PROMPT_VERSION_A)
+
+    @staticmethod
+    def _decision_key(rule: Rule, scope: Scope) -> str:
+        # Only the datatypes, fields and variables this rule references influence its table
+        rule_inputs = rule.dict(include={"id", "name", "summary", "condition", "result", "rule_type", "related_datatypes"})
+        return artifact_key(
+            "decision",
+            rule_inputs,
+            [(d.name, [(f.name, f.type) for f in d.fields]) for d in scope.datatypes],
+            [v.line for v in scope.variables],
+            PROMPT_VERSION_C,
+        )
+
+    @staticmethod
+    def _test_key(rule_tables: List[dict], datatypes_input: str) -> str:
+        return artifact_key("test", rule_tables, datatypes_input, PROMPT_VERSION_D)
+
+    def _generate_vocabulary(self, datatypes: List[Datatype], rules: List[Rule], cache_stats: Dict[str, int]) -> List[dict]:
+        """Phase A. The Vocabulary is a structural transform of the request; the LLM is only used when asked to."""
+        if VOCAB_MODE == "llm":
+            return self._generate_vocabulary_llm(datatypes, cache_stats)
+        defaults = self._suggest_defaults(datatypes, rules, cache_stats) if VOCAB_MODE == "enrich" else None
+        return build_vocabulary_tables(datatypes, rules, defaults)
+
+    def _suggest_defaults(self, datatypes: List[Datatype], rules: List[Rule], cache_stats: Dict[str, int]) -> Dict[str, Dict[str, str]]:
+        """Optional Phase A enrichment: LLM-suggested field defaults, cached per datatype set."""
+        key = artifact_key(
+            "defaults",
+            [(d.name, [(f.name, f.type) for f in d.fields]) for d in datatypes],
+            [(r.id, r.summary) for r in rules],
+            PROMPT_VERSION_DEFAULTS,
+        )
+        if ARTIFACT_CACHE_ENABLED:
+            hit = self.artifact_cache.get("datatype", key)
+            if hit is not None:
+                cache_stats["datatypes_reused"] = len(datatypes)
+                return hit[0]
+
+        prompt = PromptTemplate(
+            template=DATATYPE_DEFAULTS_PROMPT_TEMPLATE,
+            input_variables=["datatypes_input", "rules_summary"]
+        )
+        plan = plan_call("defaults", DATATYPE_DEFAULTS_PROMPT_TEMPLATE, {
+            "datatypes_input": encode_datatypes(datatypes),
+            "rules_summary": "\n".join([f"- {r.summary}" for r in rules]),
+        }, priorities={"rules_summary": 1})
+        chain = prompt | plan.bind(structured(self.llm, nested_string_map_schema("defaults")))
+        try:
+            raw = chain.invoke(plan.inputs)
+            parsed = self._parse_llm_json(raw) or {}
+        except Exception as e:
+            logger.warning(f"[VOCAB] Defaults enrichment failed, emitting tables without defaults: {e}")
+            return {}
+        defaults = {
+            name: {str(k): str(v) for k, v in fields.items()}
+            for name, fields in (parsed.get("defaults") or {}).items()
+            if isinstance(fields, dict)
+        }
+        if ARTIFACT_CACHE_ENABLED:
+            self.artifact_cache.put("datatype", key, [defaults])
+        return defaults
+
+    def _generate_vocabulary_llm(self, datatypes: List[Datatype], cache_stats: Dict[str, int]) -> List[dict]:
+        """Legacy Phase A. Datatype tables are cached per definition; only new/changed datatypes are generated."""
+        keys = {d.name: self._datatype_key(d) for d in datatypes}
+        result_key = artifact_key("datatype", "RuleResult", PROMPT_VERSION_A)
+        cached: Dict[str, List[dict]] = {}
+        if ARTIFACT_CACHE_ENABLED:
+            for d in datatypes:
+                hit = self.artifact_cache.get("datatype", keys[d.name])
+                if hit is not None:
+                    cached[d.name] = hit
+            rule_result = self.artifact_cache.get("datatype", result_key)
+        else:
+            rule_result = None
+        cache_stats["datatypes_reused"] = len(cached)
+
+        missing = [d for d in datatypes if d.name not in cached]
+        extra_tables: List[dict] = []
+        if missing or rule_result is None:
+            vocab_context = self._get_rag_context("OpenL Datatype Table syntax and best practices")
+            datatypes_input = encode_datatypes(missing)
+            prompt_a = PromptTemplate(
+                template=DATATYPE_GENERATION_PROMPT_TEMPLATE,
+                input_variables=["datatypes_input", "context"]
+            )
+            plan = plan_call(
+                "vocabulary",
+                DATATYPE_GENERATION_PROMPT_TEMPLATE,
+                {"datatypes_input": datatypes_input, "context": vocab_context},
+                priorities={"context": 1},
+            )
+            chain_a = prompt_a | plan.bind(structured(self.llm, TABLES_SCHEMA))
+            res_a_raw = chain_a.invoke(plan.inputs)
+            vocab_structure = self._parse_llm_json(res_a_raw)
+            wanted = {d.name for d in missing}
+            for table in (vocab_structure.get("tables", []) if vocab_structure else []):
+                if not isinstance(table, dict):
+                    continue
+                name = self._table_name(table)
+                if name in wanted:
+                    cached[name] = [table]
+                    if ARTIFACT_CACHE_ENABLED:
+                        self.artifact_cache.put("datatype", keys[name], [table])
+                elif name == "RuleResult":
+                    rule_result = [table]
+                    if ARTIFACT_CACHE_ENABLED:
+                        self.artifact_cache.put("datatype", result_key, [table])
+                else:
+                    extra_tables.append(table)
+
+        ordered = [t for d in datatypes for t in cached.get(d.name, [])]
+        return ordered + (rule_result or []) + extra_tables
+
+    def _generate_tests(self, decision_rules: List[Rule], tables_by_rule: Dict[str, List[dict]], unattributed: List[dict], datatypes: List[Datatype], datatypes_input: str, cache_stats: Dict[str, int]) -> List[dict]:
+        """Phase D. Test tables are synthesized from the decision table rows; the LLM is optional."""
+        if TEST_GENERATION_MODE == "llm":
+            return self._generate_tests_llm(decision_rules, tables_by_rule, unattributed, datatypes_input, cache_stats)
+
+        rules_tables = [t for r in decision_rules for t in tables_by_rule.get(r.id, [])] + unattributed
+        tests, unsupported = RuleTestSynthesizer(datatypes).synthesize(rules_tables)
+        logger.info(f"[TESTS] Synthesized {len(tests)} test tables, {len(unsupported)} decision tables not derivable")
+        if unsupported and TEST_GENERATION_MODE == "hybrid":
+            pending = {r.id: [t for t in tables_by_rule.get(r.id, []) if t in unsupported] for r in decision_rules}
+            tests += self._generate_tests_llm(
+                [r for r in decision_rules if pending[r.id]],
+                {rule_id: tables for rule_id, tables in pending.items() if tables},
+                [t for t in unattributed if t in unsupported],
+                datatypes_input,
+                cache_stats,
+            )
+        if TEST_NARRATIVE_NAMES and tests:
+            self._name_test_cases(tests)
+        return tests
+
+    def _name_test_cases(self, tests: List[dict]):
+        """Optional: replace the synthesized `_description_` values with LLM-written scenario names."""
+        lines = []
+        for test in tests:
+            rows = test.get("rows", [])
+            if not rows or rows[0][0] != "_id_":
+                continue
+            name = self._table_name(test)
+            for i, case_id in enumerate(rows[0][2:]):
+                # LLM-written tests (hybrid mode) may have ragged rows
+                cells = [(str(r[0]), r[2 + i]) for r in rows if r and len(r) > 2 + i]
+                inputs = ", ".join(f"{field}={value}" for field, value in cells[2:] if not field.startswith("_res_") and value != "")
+                expected = ", ".join(f"{field}={value}" for field, value in cells if field.startswith("_res_"))
+                lines.append(f"{name} {case_id}: {inputs} => {expected}")
+        prompt = PromptTemplate(template=TEST_NARRATIVE_PROMPT_TEMPLATE, input_variables=["cases"])
+        # Cases cut off by the budget simply keep their synthesized description
+        plan = plan_call("names", TEST_NARRATIVE_PROMPT_TEMPLATE, {"cases": "\n".join(lines)}, priorities={"cases": 1})
+        chain = prompt | plan.bind(structured(self.tests_llm, nested_string_map_schema("names")))
+        try:
+            parsed = self._parse_llm_json(chain.invoke(plan.inputs)) or {}
+        except Exception as e:
+            logger.warning(f"[TESTS] Narrative naming failed, keeping synthesized descriptions: {e}")
+            return
+        names = parsed.get("names") or {}
+        for test in tests:
+            by_case = names.get(self._table_name(test))
+            if not isinstance(by_case, dict):
+                continue
+            rows = test["rows"]
+            for row in rows:
+                if row and row[0] == "_description_":
+                    for i, case_id in enumerate(rows[0][2:]):
+                        if by_case.get(case_id) and len(row) > 2 + i:
+                            row[2 + i] = str(by_case[case_id])
+
+    def _generate_tests_llm(self, decision_rules: List[Rule], tables_by_rule: Dict[str, List[dict]], unattributed: List[dict], datatypes_input: str, cache_stats: Dict[str, int]) -> List[dict]:
+        """Legacy Phase D. Tests are cached per rule, keyed by that rule's decision tables."""
+        tests_by_rule: Dict[str, List[dict]] = {}
+        test_keys = {r.id: self._test_key(tables_by_rule.get(r.id, []), datatypes_input) for r in decision_rules}
+        if ARTIFACT_CACHE_ENABLED:
+            for r in decision_rules:
+                hit = self.artifact_cache.get("test", test_keys[r.id])
+                if hit is not None and r.id in tables_by_rule:
+                    tests_by_rule[r.id] = hit
+        cache_stats["test_rules_reused"] = len(tests_by_rule)
+
+        pending = [r for r in decision_rules if r.id not in tests_by_rule and tables_by_rule.get(r.id)]
+        pending_tables = [t for r in pending for t in tables_by_rule[r.id]] + unattributed
+        extra_tests: List[dict] = []
+        if pending_tables:
+            test_context = self._get_rag_context("OpenL Test Table Syntax validation _res_ _error_")
+            prompt_d = PromptTemplate(
+                template=TEST_GENERATION_PROMPT_TEMPLATE,
+                input_variables=["rules_structure", "datatypes_summary", "context"]
+            )
+            # Serialize rules structure for context
+            rules_structure_str = compact_json({"tables": pending_tables})
+            report_savings("tests", {"rules_structure": (lambda: json.dumps({"tables": pending_tables}, indent=2), rules_structure_str)})
+
+            plan = plan_call(
+                "tests",
+                TEST_GENERATION_PROMPT_TEMPLATE,
+                {"rules_structure": rules_structure_str, "datatypes_summary": datatypes_input, "context": test_context},
+                priorities={"context": 1},
+            )
+            chain_d = prompt_d | plan.bind(structured(self.tests_llm, TABLES_SCHEMA))
+            res_d_raw = chain_d.invoke(plan.inputs)
+            test_structure = self._parse_llm_json(res_d_raw)
+            generated = test_structure.get("tables", []) if test_structure else []
+
+            # Tests name their target rule table: "Test <RuleName> <RuleName>Test"
+            owner_by_table = {self._table_name(t): r.id for r in pending for t in tables_by_rule[r.id]}
+            fresh: Dict[str, List[dict]] = {}
+            for t in generated:
+                if not isinstance(t, dict):
+                    continue
+                owner = owner_by_table.get(self._table_name(t))
+                if owner:
+                    fresh.setdefault(owner, []).append(t)
+                else:
+                    extra_tests.append(t)
+            for rule_id, tables in fresh.items():
+                tests_by_rule[rule_id] = tables
+                if ARTIFACT_CACHE_ENABLED:
+                    self.artifact_cache.put("test", test_keys[rule_id], tables)
+
+        return [t for r in decision_rules for t in tests_by_rule.get(r.id, [])] + extra_tests
+
     async def generate_excel_structure(self, request: GenerationRequest) -> Dict[str, Any]:
         """
         Execute the 3-Phase Generation Pipeline
         """
+        cache_stats = {"datatypes_reused": 0, "decision_rules_reused": 0, "test_rules_reused": 0}
+        validation: Dict[str, Any] = {"repaired": 0, "invalid": []}
+
         # 1. Phase A: Vocabulary (Datatypes)
         # ----------------------------------
-        vocab_context = self._get_rag_context("OpenL Datatype Table syntax and best practices")
-        datatypes_input = "\n".join([f"- {d.name}: {[f'{f.name} ({f.type})' for f in d.fields]}" for d in request.datatypes if d.selected])
-        print(f"[DEBUG] Datatypes Input to LLM: {datatypes_input}")
-        
-        prompt_a = PromptTemplate(
-            template=DATATYPE_GENERATION_PROMPT_TEMPLATE,
-            input_variables=["datatypes_input", "context"]
-        )
-        chain_a = prompt_a | self.llm
-        res_a_raw = chain_a.invoke({"datatypes_input": datatypes_input, "context": vocab_context})
-        vocab_structure = self._parse_llm_json(res_a_raw)
+        selected_datatypes = [d for d in request.datatypes if d.selected]
+        # Every later phase sees the datatypes exactly as the Vocabulary sheet defines them
+        datatypes = openl_datatypes(selected_datatypes, [r for r in request.rules if r.selected])
+        datatypes_input = encode_datatypes(datatypes)
+        report_savings("vocabulary", {"datatypes": (lambda: "\n".join(f"- {d.name}: {[f'{f.name} ({f.type})' for f in d.fields]}" for d in datatypes), datatypes_input)})
+        log_payload(logger, "[VOCAB] Datatypes input to LLM", datatypes_input)
+        with span("pipeline.vocabulary", phase="vocabulary", datatypes=len(selected_datatypes)):
+            vocab_tables = self._generate_vocabulary(selected_datatypes, [r for r in request.rules if r.selected], cache_stats)
         
         # 2. Phase B: Spreadsheets (Calculations)
         # ---------------------------------------
@@ -253,9 +705,10 @@ class GenerationService:
         # [DISABLED] Phase B: Spreadsheets (Calculations)
         # calc_context = self._get_rag_context("OpenL Spreadsheet Table syntax and formulas")
         if request.intermediate_variables:
-             variables_text = "\n".join([f"- {v.name} ({v.type}): {v.logic or ''}" for v in request.intermediate_variables])
+             variables = [f"- {v.name} ({v.type}): {v.logic or ''}" for v in request.intermediate_variables]
         else:
-             variables_text = "\n".join([f"- {r.name}: {r.condition}" for r in request.rules if r.selected])
+             variables = [f"- {r.name}: {r.condition}" for r in request.rules if r.selected]
+        variables_text = "\n".join(variables)
         # prompt_b = PromptTemplate(template=SPREADSHEET_GENERATION_PROMPT_TEMPLATE, input_variables=["variables", "context"])
         # chain_b = prompt_b | self.llm
         # res_b_raw = chain_b.invoke({"variables": variables_text, "context": calc_context}) 
@@ -265,8 +718,6 @@ class GenerationService:
 
         # 3. Phase C: Decision Tables (Rules)
         # -----------------------------------
-        decision_context = self._get_rag_context("OpenL Decision Table, SmartRules, and Rule Table syntax")
-        
         # Filter rules: If rule_type is Spreadsheet/Intermediate, exclude from Phase C?
         # Ideally, Phase C handles "DecisionTable" and "SmartRules".
         # If type is unspecified, include it.
@@ -278,46 +729,45 @@ class GenerationService:
              # Fallback: Use all rules if no distinction
              decision_rules = [r for r in request.rules if r.selected]
 
+        # Reuse tables of rules whose inputs are unchanged; only the rest go to the LLM
+        graph = DependencyGraph.from_request(datatypes, request.intermediate_variables, [r for r in request.rules if r.selected])
+        decision_keys = {r.id: self._decision_key(r, graph.scope([r])) for r in decision_rules}
+        tables_by_rule: Dict[str, List[dict]] = {}
+        if ARTIFACT_CACHE_ENABLED:
+            for r in decision_rules:
+                cached = self.artifact_cache.get("decision", decision_keys[r.id])
+                if cached is not None:
+                    tables_by_rule[r.id] = cached
+        cache_stats["decision_rules_reused"] = len(tables_by_rule)
+        changed_rules = [r for r in decision_rules if r.id not in tables_by_rule]
 
-        
-        rules_text_c = "\n".join([f"- ID: {r.id if hasattr(r, 'id') else 'Rule'} | Name: {r.name}: {r.condition}" for r in decision_rules])
-        
-        prompt_c = PromptTemplate(
-            template=DECISION_TABLE_GENERATION_PROMPT_TEMPLATE,
-            input_variables=["rules", "datatypes_summary", "variables_summary", "context"]
-        )
-        chain_c = prompt_c | self.llm
-        res_c_raw = chain_c.invoke({
-            "rules": rules_text_c, 
-            "datatypes_summary": datatypes_input, 
-            "variables_summary": variables_text, 
-            "context": decision_context
-        })
-        print(f"[DEBUG] Variables Summary passed to LLM:\n{variables_text}")
-        
-        # FIX: Enforce dateDif syntax
-        res_c_raw = res_c_raw.replace("Dates.diff", "dateDif")
-        rules_structure = self._parse_llm_json(res_c_raw)
+        unattributed_rules_tables: List[dict] = []
+        if changed_rules:
+            with span("pipeline.decision_tables", phase="decision", rules=len(changed_rules), reused=len(tables_by_rule)):
+                decision_context = self._get_rag_context("OpenL Decision Table, SmartRules, and Rule Table syntax")
+                groups = await self._generate_decision_tables(changed_rules, graph, decision_context)
+                validator = TableValidator(graph.datatypes)
+                with span("pipeline.repair", phase="repair"):
+                    repaired = await asyncio.gather(*(
+                        self._repair_tables(t, validator, graph.scope(group).datatypes_input, validation) for group, t in groups
+                    ))
+                for (group, _), group_tables in zip(groups, repaired):
+                    owned, unmatched = self._attribute_tables(group, group_tables)
+                    unattributed_rules_tables.extend(unmatched)
+                    for rule_id, tables in owned.items():
+                        tables_by_rule[rule_id] = tables
+                        # Tables that are still invalid are regenerated next time rather than reused
+                        if ARTIFACT_CACHE_ENABLED and tables and not any(validator.validate(t) for t in tables):
+                            self.artifact_cache.put("decision", decision_keys[rule_id], tables)
+
+        rules_tables = [t for r in decision_rules for t in tables_by_rule.get(r.id, [])] + unattributed_rules_tables
+        rules_structure = {"tables": rules_tables}
 
         # 4. Phase D: Test Generation
         # ---------------------------
-        test_context = self._get_rag_context("OpenL Test Table Syntax validation _res_ _error_")
-        prompt_d = PromptTemplate(
-            template=TEST_GENERATION_PROMPT_TEMPLATE,
-            input_variables=["rules_structure", "datatypes_summary", "context"]
-        )
-        chain_d = prompt_d | self.llm
-        
-        # Serialize rules structure for context
-        rules_structure_str = json.dumps(rules_structure, indent=2)
-        
-        res_d_raw = chain_d.invoke({
-            "rules_structure": rules_structure_str,
-            "datatypes_summary": datatypes_input,
-            "context": test_context
-        })
-        test_structure = self._parse_llm_json(res_d_raw)
-        tests = test_structure.get("tables", []) if test_structure else []
+        with span("pipeline.tests", phase="tests"):
+            tests = self._generate_tests(decision_rules, tables_by_rule, unattributed_rules_tables, datatypes, datatypes_input, cache_stats)
+        logger.info(f"[ARTIFACT] Reuse stats: {cache_stats}")
 
         # 5. Orchestration / Assembly
         # ---------------------------
@@ -352,7 +802,7 @@ class GenerationService:
             "sheets": [
                 {
                     "name": "Vocabulary",
-                    "tables": vocab_structure.get("tables", []) if vocab_structure else []
+                    "tables": vocab_tables
                 },
                 {
                     "name": "Rules",
@@ -362,12 +812,30 @@ class GenerationService:
                     "name": "Tests",
                     "tables": tests
                 }
-            ]
+            ],
+            "artifact_cache": cache_stats,
+            "validation": validation
         }
+
+        # 6. Quality gate: run the Tests sheet against the Rules sheet in-process
+        # -----------------------------------------------------------------------
+        if QUALITY_GATE != "off":
+            try:
+                with span("pipeline.quality", phase="quality"):
+                    quality = evaluate_structure(final_structure, datatypes)
+            except Exception as e:
+                # The gate only reports; a bug in it must not cost the user the workbook
+                logger.warning(f"[QUALITY] Quality gate failed, skipping report: {e}")
+                quality = None
+            if quality is not None:
+                logger.info(f"[QUALITY] {quality['passed']}/{quality['cases']} test cases pass, "
+                      f"{len(quality['failed'])} failing, {len(quality['unsupported'])} tables not evaluated ({quality['elapsed_ms']} ms)")
+                final_structure["quality"] = quality
         
         return final_structure
 
     def create_workbook(self, structure: Dict[str, Any]) -> Workbook:
+        """In-memory workbook (WORKBOOK_WRITER=standard); see save_workbook for the streaming path."""
         wb = Workbook()
         # Remove default sheet
         if "Sheet" in wb.sheetnames:
@@ -378,47 +846,8 @@ class GenerationService:
             ws = wb.create_sheet(sheet_data["name"])
             current_row = 1
             
-            for table in sheet_data.get("tables", []):
-                # Ensure table is a dictionary
-                if not isinstance(table, dict): continue
-                
-                header_raw = table.get("header") or table.get("Header")
-                
-                # Construct header if missing
-                if header_raw:
-                    if isinstance(header_raw, list):
-                        header = " ".join(str(h) for h in header_raw)
-                    else:
-                        header = str(header_raw)
-                elif "type" in table and isinstance(table["type"], str) and ("Rules " in table["type"] or "Spreadsheet " in table["type"]):
-                    header = table["type"]
-                elif "Spreadsheet" in table:
-                     header = f"Spreadsheet {table['Spreadsheet']}" if not table['Spreadsheet'].startswith("Spreadsheet") else table['Spreadsheet']
-                else:
-                    name = table.get("name") or table.get("Name", "")
-                    ret_type = table.get("returnType", table.get("type", "Object"))
-                    params = table.get("params") or table.get("Params", "")
-                    
-                    rows = table.get("rows") or table.get("Rows", [])
-                    if rows and len(rows) > 0:
-                         first_row = rows[0]
-                         if isinstance(first_row, list) and len(first_row) > 0 and "Step" in str(first_row[0]):
-                             table_type = "Spreadsheet"
-                         else:
-                             table_type = "Rules"
-                    else:
-                        table_type = "Rules"
-                        
-                    header = f"{table_type} {ret_type} {name}({params})"
-                
-                rows = table.get("rows") or table.get("Rows", [])
-                
-
-                
-                if not header and not rows: continue
-                
+            for header, rows, width in iter_tables(sheet_data):
                 # Write Header
-                width = max([len(r) for r in rows]) if rows else 1
                 ws.cell(row=current_row, column=1, value=header)
                 if width > 1:
                     ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=width)
@@ -442,3 +871,12 @@ class GenerationService:
                 current_row += 2
                 
         return wb
+
+    def save_workbook(self, structure: Dict[str, Any], path: str):
+        """Write the .xlsx to disk with the configured writer backend."""
+        with span("workbook.write", tables=sum(len(s.get("tables", [])) for s in structure.get("sheets", []))):
+            write_workbook(structure, path, standard_builder=self.create_workbook)
+
+    def stream_workbook(self, structure: Dict[str, Any]) -> Iterator[bytes]:
+        """Yield the .xlsx bytes for a streaming HTTP response."""
+        return stream_workbook(structure, standard_builder=self.create_workbook)
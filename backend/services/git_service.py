@@ -1,11 +1,14 @@
 import os
+import asyncio
 import subprocess
 import shutil
 import logging
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from fastapi import HTTPException
-import requests
-from urllib.parse import quote_plus
+
+from services.gitlab_client import GitLabClient, project_path
+from services.tracing import span
+from services.worktrees import GIT_WORKTREES, WORKTREE_ROOT, WorktreeManager
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +21,20 @@ class GitService:
         self.api_url = os.getenv("GIT_API_URL", "https://gitlab.com/api/v4")
         self.token = os.getenv("GIT_TOKEN", "")
         self.project_id = os.getenv("GIT_PROJECT_ID", "")
+        self.use_worktrees = GIT_WORKTREES
+        self.worktree_root = WORKTREE_ROOT
+        # Legacy mode: publishes share REPO_DIR's working tree; only one may touch it at a time
+        self._repo_lock = asyncio.Lock()
+        self._worktrees: Optional[WorktreeManager] = None
+        self._gitlab: Optional[GitLabClient] = None
+        self._project_paths = {}
+
+    @property
+    def worktrees(self) -> WorktreeManager:
+        rel_dir = os.path.relpath(self.target_dir, self.repo_dir)
+        if self._worktrees is None or self._worktrees.repo_dir != self.repo_dir or self._worktrees.sparse_dir != rel_dir.replace(os.sep, "/"):
+            self._worktrees = WorktreeManager(self.repo_dir, rel_dir, self._arun_git, root=self.worktree_root)
+        return self._worktrees
 
     def _run_git(self, args: List[str], cwdir: str = None) -> str:
         cwd = cwdir or self.repo_dir
@@ -35,47 +52,136 @@ class GitService:
             logger.error(f"Git command failed: {' '.join(args)}. Error: {error_msg}")
             raise Exception(f"Git Error: {error_msg}")
 
+    async def _arun_git(self, args: List[str], cwdir: str = None) -> str:
+        """`_run_git` on an asyncio subprocess, so a slow pull/push never blocks the event loop."""
+        cwd = cwdir or self.repo_dir
+        with span(f"git.{args[0]}"):
+            proc = await asyncio.create_subprocess_exec(
+                "git", *args, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            error_msg = stderr.decode(errors="replace").strip() or stdout.decode(errors="replace").strip() or f"exit code {proc.returncode}"
+            logger.error(f"Git command failed: {' '.join(args)}. Error: {error_msg}")
+            raise Exception(f"Git Error: {error_msg}")
+        return stdout.decode(errors="replace").strip()
+
     async def create_pr_sync(self, file_path: str, clean_name: str, delete_after: bool = True) -> dict:
+        """Publish a single workbook (see `publish_files`)."""
+        return await self.publish_files([(file_path, clean_name)], delete_after=delete_after)
+
+    async def publish_files(self, files: List[Tuple[str, str]], delete_after: bool = True) -> dict:
         """
-        Synchronous task to handle the full Git workflow:
+        Full Git workflow, run by the publish queue (services/publish_jobs.py):
         Checkout -> Pull -> Add -> Commit -> Push -> Create MR
+        `files` are (file_path, clean_name) pairs; they go out in one commit, one push and one
+        MR create/update, so the queue can coalesce a burst of workbooks.
+        With GIT_WORKTREES each job works in its own sparse worktree (services/worktrees.py),
+        so jobs run in parallel; otherwise they take turns in REPO_DIR.
         Returns details about the created MR.
         """
+        # A workbook regenerated twice in one batch: the latest copy wins
+        files = list({clean_name: (file_path, clean_name) for file_path, clean_name in files}.values())
         result = {
             "status": "error",
             "message": "",
             "mr_url": "",
             "source_branch": self.branch,
-            "target_branch": self.target_branch
+            "target_branch": self.target_branch,
+            "files": [clean_name for _, clean_name in files]
         }
         
+        if self.use_worktrees:
+            return await self._publish_in_worktree(files, delete_after, result)
+        async with self._repo_lock:
+            return await self._publish(files, delete_after, result)
+
+    @staticmethod
+    def _commit_message(names: List[str]) -> str:
+        if len(names) == 1:
+            return f"Update OpenL rules: {names[0]}"
+        return f"Update OpenL rules: {len(names)} workbooks\n\n" + "\n".join(f"- {name}" for name in names)
+
+    async def _publish_in_worktree(self, files: List[Tuple[str, str]], delete_after: bool, result: dict) -> dict:
+        names = result["files"]
+        try:
+            logger.info(f"Starting Git sync task for {', '.join(names)} in a worktree")
+            async with self.worktrees.checkout(self.branch) as worktree:
+                rel_dir = self.worktrees.sparse_dir
+                target_dir = os.path.join(worktree.path, rel_dir)
+                os.makedirs(target_dir, exist_ok=True)
+                for file_path, clean_name in files:
+                    shutil.copy(file_path, os.path.join(target_dir, clean_name))
+
+                await self._arun_git(["add", "--"] + [f"{rel_dir}/{name}" for name in names], worktree.path)
+                try:
+                    await self._arun_git(["commit", "-m", self._commit_message(names)], worktree.path)
+                except Exception as e:
+                    if "nothing to commit" in str(e).lower():
+                        logger.info("Nothing to commit.")
+                        result["message"] = "No changes to commit."
+                        result["status"] = "skipped"
+                        return result
+                    raise e
+
+                await self.worktrees.push(worktree)
+
+            mr_url = await asyncio.to_thread(self._create_merge_request, names)
+            logger.info(f"Git operations completed. MR URL: {mr_url}")
+
+            if delete_after:
+                self._delete_sources(files)
+
+            result.update({
+                "status": "success",
+                "message": f"Successfully pushed {len(names)} file(s) to {self.branch} and created MR.",
+                "mr_url": mr_url
+            })
+            return result
+
+        except Exception as e:
+            logger.error(f"Git Task Failed: {e}")
+            result["message"] = str(e)
+            return result
+
+    @staticmethod
+    def _delete_sources(files: List[Tuple[str, str]]):
+        # Cleanup temp files (not the repo files, but the source temp files)
+        for file_path, _ in files:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    async def _publish(self, files: List[Tuple[str, str]], delete_after: bool, result: dict) -> dict:
+        names = result["files"]
         try:
-            logger.info(f"Starting Git sync task for {clean_name}")
+            logger.info(f"Starting Git sync task for {', '.join(names)}")
             
             # Ensure target directory exists
             if not os.path.exists(self.target_dir):
                 os.makedirs(self.target_dir, exist_ok=True)
                 
-            # Copy file to repo target dir
-            repo_file_path = os.path.join(self.target_dir, clean_name)
-            shutil.copy(file_path, repo_file_path)
+            # Copy files to repo target dir
+            rel_paths = []
+            for file_path, clean_name in files:
+                repo_file_path = os.path.join(self.target_dir, clean_name)
+                shutil.copy(file_path, repo_file_path)
+                rel_paths.append(os.path.relpath(repo_file_path, self.repo_dir))
             
             # 1. Checkout Branch
-            self._run_git(["checkout", self.branch])
+            await self._arun_git(["checkout", self.branch])
             
             # 2. Pull latest
             try:
-                self._run_git(["pull", "origin", self.branch])
+                await self._arun_git(["pull", "origin", self.branch])
             except Exception:
                 logger.warning("Git pull failed, continuing (might be new branch)")
 
-            # 3. Add file
-            rel_path = os.path.relpath(repo_file_path, self.repo_dir)
-            self._run_git(["add", rel_path])
+            # 3. Add files
+            await self._arun_git(["add", "--"] + rel_paths)
             
             # 4. Commit
             try:
-                self._run_git(["commit", "-m", f"Update OpenL rules: {clean_name}"])
+                await self._arun_git(["commit", "-m", self._commit_message(names)])
             except Exception as e:
                 # If nothing to commit (clean working tree), that's fine
                 if "nothing to commit" in str(e).lower():
@@ -89,20 +195,19 @@ class GitService:
                     raise e
  
             # 5. Push
-            self._run_git(["push", "origin", self.branch])
+            await self._arun_git(["push", "origin", self.branch])
             
             # 6. Create MR
-            mr_url = self._create_merge_request(clean_name)
+            mr_url = await asyncio.to_thread(self._create_merge_request, names)
             
             logger.info(f"Git operations completed. MR URL: {mr_url}")
 
-            # Cleanup temp file if requested (not the repo file, but the source temp file)
-            if delete_after and os.path.exists(file_path):
-                 os.remove(file_path)
+            if delete_after:
+                self._delete_sources(files)
             
             result.update({
                 "status": "success",
-                "message": f"Successfully pushed to {self.branch} and created MR.",
+                "message": f"Successfully pushed {len(names)} file(s) to {self.branch} and created MR.",
                 "mr_url": mr_url
             })
             return result
@@ -112,53 +217,53 @@ class GitService:
             result["message"] = str(e)
             return result
             
-    def _create_merge_request(self, filename: str) -> str:
+    @staticmethod
+    def _mr_description(filenames: List[str], existing: str = "") -> str:
+        """The MR description lists every published file once, keeping files from earlier pushes."""
+        listed = [line[len("- "):] for line in existing.splitlines() if line.startswith("- ")]
+        listed += [name for name in filenames if name not in listed]
+        return "Automated update from OpenL Assistant.\n\nFiles:\n" + "\n".join(f"- {name}" for name in listed)
+
+    @property
+    def gitlab(self) -> GitLabClient:
+        if self._gitlab is None or self._gitlab.api_url != self.api_url.rstrip("/") or self._gitlab.token != self.token:
+            self._gitlab = GitLabClient(self.api_url, self.token)
+        return self._gitlab
+
+    def close(self):
+        if self._gitlab is not None:
+            self._gitlab.close()
+
+    def _project_id(self):
+        if self.project_id:
+            return self.project_id
+        # The origin URL only changes with REPO_DIR; GitLabClient caches path -> ID
+        if self.repo_dir not in self._project_paths:
+            self._project_paths[self.repo_dir] = project_path(self._run_git(["remote", "get-url", "origin"]))
+        return self.gitlab.project_id(self._project_paths[self.repo_dir])
+
+    def _create_merge_request(self, filenames: List[str]) -> str:
         if not self.token:
             return "No Git Token configured."
 
-        headers = {"PRIVATE-TOKEN": self.token}
-        project_id = self.project_id
-        
         # Resolve Project ID if missing
-        if not project_id:
-            try:
-                remote_url = self._run_git(["remote", "get-url", "origin"])
-                path = ""
-                if "git@" in remote_url:
-                    path = remote_url.split(":")[-1].replace(".git", "")
-                else:
-                    from urllib.parse import urlparse
-                    parsed = urlparse(remote_url)
-                    path = parsed.path.replace(".git", "").lstrip("/")
-                    if path.startswith("gitlab/"): path = path[7:]
-                
-                encoded_path = quote_plus(path)
-                resp = requests.get(f"{self.api_url}/projects/{encoded_path}", headers=headers)
-                if resp.status_code == 200:
-                    project_id = resp.json().get("id")
-            except Exception as e:
-                logger.error(f"Failed to resolve project ID: {e}")
+        try:
+            project_id = self._project_id()
+        except Exception as e:
+            logger.error(f"Failed to resolve project ID: {e}")
+            project_id = None
         
         if not project_id:
             return "Could not determine Project ID."
 
-        payload = {
-            "source_branch": self.branch,
-            "target_branch": self.target_branch,
-            "title": f"Update OpenL Rules: {filename}",
-            "description": f"Automated update from OpenL Assistant.\n\nFile: {filename}",
-            "remove_source_branch": False
-        }
-        
+        title = f"Update OpenL Rules: {filenames[0]}" if len(filenames) == 1 else f"Update OpenL Rules: {len(filenames)} workbooks"
         try:
-            resp = requests.post(f"{self.api_url}/projects/{project_id}/merge_requests", headers=headers, json=payload)
-            if resp.status_code in [200, 201]:
-                return resp.json().get("web_url", "")
-            elif resp.status_code == 409:
-                 # Already exists
-                 resp = requests.get(f"{self.api_url}/projects/{project_id}/merge_requests?state=opened&source_branch={self.branch}", headers=headers)
-                 if resp.status_code == 200 and resp.json():
-                     return resp.json()[0].get("web_url", "")
+            # Add this batch's files to the (possibly already open) MR's file list
+            mr = self.gitlab.upsert_merge_request(
+                project_id, self.branch, self.target_branch, title,
+                lambda existing: self._mr_description(filenames, existing)
+            )
+            return mr.get("web_url", "")
         except Exception as e:
             logger.error(f"Failed to create MR: {e}")
             
@@ -0,0 +1,188 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import quote_plus, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# GitLab REST calls made after a publish. One pooled keep-alive session per client; idempotent
+# calls are retried with exponential backoff on connection errors, 429 and 5xx.
+GITLAB_CONNECT_TIMEOUT = float(os.getenv("GITLAB_CONNECT_TIMEOUT", "5"))
+GITLAB_READ_TIMEOUT = float(os.getenv("GITLAB_READ_TIMEOUT", "30"))
+GITLAB_MAX_RETRIES = int(os.getenv("GITLAB_MAX_RETRIES", "3"))
+GITLAB_BACKOFF_SECONDS = float(os.getenv("GITLAB_BACKOFF_SECONDS", "0.5"))
+# How long a known open MR is trusted without asking GitLab again
+GITLAB_MR_CACHE_TTL = float(os.getenv("GITLAB_MR_CACHE_TTL", "300"))
+
+
+class GitLabError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def project_path(remote_url: str) -> str:
+    """`group/project` from an ssh (`git@host:group/project.git`) or http(s) remote URL."""
+    if "git@" in remote_url:
+        return remote_url.split(":")[-1].replace(".git", "")
+    path = urlparse(remote_url).path.replace(".git", "").lstrip("/")
+    if path.startswith("gitlab/"):
+        path = path[7:]
+    return path
+
+
+class GitLabClient:
+    """
+    Thin GitLab API client for merge requests.
+    - Project IDs are resolved once per project path.
+    - The open MR of each source branch is cached, so publishing to a branch that already has
+      an MR costs one PUT (or nothing when its description is unchanged). Unknown branches
+      cost one POST; only a 409 falls back to listing. A cached MR that turns out closed or
+      merged is invalidated and a new MR is created.
+    """
+
+    def __init__(self, api_url: str, token: str, timeout: Tuple[float, float] = (GITLAB_CONNECT_TIMEOUT, GITLAB_READ_TIMEOUT),
+                 retries: int = GITLAB_MAX_RETRIES, backoff: float = GITLAB_BACKOFF_SECONDS, mr_cache_ttl: float = GITLAB_MR_CACHE_TTL):
+        self.api_url = api_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.mr_cache_ttl = mr_cache_ttl
+        self.session = requests.Session()
+        self.session.headers.update({"PRIVATE-TOKEN": token})
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # POST is not retried on a response: GitLab may have created the MR already
+            allowed_methods=frozenset({"GET", "PUT", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=2, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._projects: Dict[str, Any] = {}
+        self._open_mrs: Dict[Tuple[Any, str], Tuple[dict, float]] = {}
+        self.stats = {"requests": 0, "project_cache_hits": 0, "mr_cache_hits": 0}
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        with self._lock:
+            self.stats["requests"] += 1
+        with span(f"gitlab.{method.lower()}") as call:
+            try:
+                resp = self.session.request(method, f"{self.api_url}{path}", timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                raise GitLabError(f"GitLab {method} {path} failed: {e}")
+            if call is not None:
+                call.set(status_code=resp.status_code)
+            return resp
+
+    @staticmethod
+    def _json(resp: requests.Response, what: str) -> Any:
+        if resp.status_code not in (200, 201):
+            raise GitLabError(f"{what}: HTTP {resp.status_code} {resp.text[:200]}", resp.status_code)
+        return resp.json()
+
+    # --- Projects ----------------------------------------------------------------
+
+    def project_id(self, path: str) -> Any:
+        with self._lock:
+            if path in self._projects:
+                self.stats["project_cache_hits"] += 1
+                return self._projects[path]
+        project = self._json(self._request("GET", f"/projects/{quote_plus(path)}"), f"Resolving project {path}")
+        with self._lock:
+            self._projects[path] = project["id"]
+        return project["id"]
+
+    # --- Merge requests ----------------------------------------------------------
+
+    def _cached_mr(self, key: Tuple[Any, str]) -> Optional[dict]:
+        with self._lock:
+            entry = self._open_mrs.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.mr_cache_ttl:
+                return None
+            self.stats["mr_cache_hits"] += 1
+        return entry[0]
+
+    def _remember(self, key: Tuple[Any, str], mr: Optional[dict]):
+        with self._lock:
+            if mr is None or mr.get("state", "opened") != "opened":
+                self._open_mrs.pop(key, None)
+            else:
+                self._open_mrs[key] = (mr, time.monotonic())
+
+    def invalidate(self, project_id: Any = None, source_branch: Optional[str] = None):
+        """Forget cached MRs: all of them, one project's, or one source branch's."""
+        with self._lock:
+            for key in list(self._open_mrs):
+                if (project_id is None or key[0] == project_id) and (source_branch is None or key[1] == source_branch):
+                    del self._open_mrs[key]
+
+    def find_open_merge_request(self, project_id: Any, source_branch: str) -> Optional[dict]:
+        resp = self._request("GET", f"/projects/{project_id}/merge_requests", params={"state": "opened", "source_branch": source_branch})
+        mrs = self._json(resp, "Listing merge requests")
+        mr = mrs[0] if mrs else None
+        self._remember((project_id, source_branch), mr)
+        return mr
+
+    def _update(self, project_id: Any, mr: dict, description: str) -> Optional[dict]:
+        """PUT the new description; None when the MR is gone or no longer open."""
+        resp = self._request("PUT", f"/projects/{project_id}/merge_requests/{mr['iid']}", json={"description": description})
+        if resp.status_code == 404:
+            return None
+        updated = self._json(resp, "Updating merge request")
+        return updated if updated.get("state", "opened") == "opened" else None
+
+    def upsert_merge_request(self, project_id: Any, source_branch: str, target_branch: str, title: str,
+                             describe: Callable[[str], str]) -> dict:
+        """
+        Create the MR for `source_branch`, or update the open one. `describe(existing)` builds
+        the description from the current one ("" for a new MR).
+        """
+        key = (project_id, source_branch)
+        mr = self._cached_mr(key)
+        if mr is not None:
+            description = describe(mr.get("description") or "")
+            if description == (mr.get("description") or ""):
+                return mr
+            updated = self._update(project_id, mr, description)
+            if updated is not None:
+                self._remember(key, updated)
+                return updated
+            # Merged or closed since we cached it
+            self._remember(key, None)
+
+        payload = {
+            "source_branch": source_branch,
+            "target_branch": target_branch,
+            "title": title,
+            "description": describe(""),
+            "remove_source_branch": False
+        }
+        resp = self._request("POST", f"/projects/{project_id}/merge_requests", json=payload)
+        if resp.status_code == 409:
+            # Already exists (opened outside this process)
+            mr = self.find_open_merge_request(project_id, source_branch)
+            if mr is None:
+                raise GitLabError("Merge request conflict but no open merge request found", 409)
+            description = describe(mr.get("description") or "")
+            if description != (mr.get("description") or ""):
+                mr = self._update(project_id, mr, description) or mr
+            self._remember(key, mr)
+            return mr
+        mr = self._json(resp, "Creating merge request")
+        self._remember(key, mr)
+        return mr
+
+    def close(self):
+        self.session.close()
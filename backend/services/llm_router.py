@@ -0,0 +1,329 @@
+import time
+import asyncio
+import threading
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+from ollama import Client, AsyncClient, Options, ResponseError
+from langchain_ollama import OllamaLLM, OllamaEmbeddings
+
+from services.metering import meter
+from services.tracing import LLM_COMPLETION_CHARS, LLM_PROMPT_CHARS, Span, span, start_span
+
+logger = logging.getLogger(__name__)
+
+
+class NoBackendAvailable(Exception):
+    pass
+
+
+class OllamaBackend:
+    """One Ollama host: its pooled clients plus load and circuit-breaker state."""
+
+    def __init__(self, url: str, client: Client, async_client: Optional[AsyncClient] = None):
+        self.url = url
+        self.client = client
+        self.async_client = async_client
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.total_requests = 0
+        self.total_failures = 0
+
+    def state(self, now: float, cooldown: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if now - self.opened_at >= cooldown:
+            return "half_open"
+        return "open"
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Connection problems and 5xx are host failures; other 4xx are the caller's fault."""
+    if isinstance(error, ResponseError):
+        return error.status_code >= 500 or error.status_code == 404  # 404: model missing on this host
+    return isinstance(error, (ConnectionError, httpx.TransportError, TimeoutError))
+
+
+def _counts_as_failure(error: Exception) -> bool:
+    if isinstance(error, ResponseError):
+        return error.status_code >= 500
+    return True
+
+
+class LLMRouter:
+    """
+    Spreads calls over several Ollama hosts.
+    - Picks the backend with the fewest outstanding requests.
+    - Opens a circuit after `failure_threshold` consecutive failures; after `cooldown`
+      seconds a single trial request is let through (half-open).
+    - Retries a failed call on another host, at most once per backend.
+    """
+
+    def __init__(
+        self,
+        backends: List[OllamaBackend],
+        route_models: Optional[Dict[str, str]] = None,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.route_models = route_models or {}
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def model_for(self, route: Optional[str], default: str) -> str:
+        return self.route_models.get(route or "default") or default
+
+    # --- Selection -----------------------------------------------------------
+
+    def acquire(self, exclude: Iterable[OllamaBackend] = ()) -> OllamaBackend:
+        exclude = set(id(b) for b in exclude)
+        now = self.clock()
+        with self._lock:
+            candidates = []
+            for b in self.backends:
+                if id(b) in exclude:
+                    continue
+                state = b.state(now, self.cooldown)
+                if state == "open" or (state == "half_open" and b.trial_in_flight):
+                    continue
+                candidates.append(b)
+            if not candidates:
+                raise NoBackendAvailable("All Ollama backends are unavailable (circuit open)")
+            backend = min(candidates, key=lambda b: b.outstanding)
+            if backend.state(now, self.cooldown) == "half_open":
+                backend.trial_in_flight = True
+            backend.outstanding += 1
+            backend.total_requests += 1
+            return backend
+
+    def release(self, backend: OllamaBackend, error: Optional[Exception] = None):
+        with self._lock:
+            backend.outstanding -= 1
+            backend.trial_in_flight = False
+            if error is None:
+                backend.consecutive_failures = 0
+                backend.opened_at = None
+            elif _counts_as_failure(error):
+                backend.total_failures += 1
+                backend.consecutive_failures += 1
+                if backend.opened_at is not None or backend.consecutive_failures >= self.failure_threshold:
+                    # Failed trial or threshold reached: (re)open the circuit
+                    backend.opened_at = self.clock()
+                    logger.warning(f"Circuit opened for Ollama backend {backend.url}")
+
+    # --- Calls ---------------------------------------------------------------
+
+    def call(self, fn: Callable[[OllamaBackend], Any]) -> Any:
+        tried: List[OllamaBackend] = []
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.backends):
+            try:
+                backend = self.acquire(exclude=tried)
+            except NoBackendAvailable:
+                break
+            tried.append(backend)
+            try:
+                result = fn(backend)
+            except Exception as e:
+                self.release(backend, e)
+                if not _is_retryable(e):
+                    raise
+                logger.warning(f"Ollama call failed on {backend.url}, trying another host: {e}")
+                last_error = e
+                continue
+            self.release(backend)
+            return result
+        raise last_error or NoBackendAvailable("All Ollama backends are unavailable (circuit open)")
+
+    def stream(self, fn: Callable[[OllamaBackend], Iterator[Any]]) -> Iterator[Any]:
+        """
+        Streaming variant of `call`. A host is only swapped before the first chunk
+        arrives; a failure mid-stream is raised so no text is duplicated.
+        """
+        tried: List[OllamaBackend] = []
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.backends):
+            try:
+                backend = self.acquire(exclude=tried)
+            except NoBackendAvailable:
+                break
+            tried.append(backend)
+            started = False
+            try:
+                for part in fn(backend):
+                    started = True
+                    yield part
+            except GeneratorExit:
+                self.release(backend)
+                raise
+            except Exception as e:
+                self.release(backend, e)
+                if started or not _is_retryable(e):
+                    raise
+                logger.warning(f"Ollama stream failed on {backend.url}, trying another host: {e}")
+                last_error = e
+                continue
+            self.release(backend)
+            return
+        raise last_error or NoBackendAvailable("All Ollama backends are unavailable (circuit open)")
+
+    async def astream(self, fn: Callable[[OllamaBackend], Any]) -> AsyncIterator[Any]:
+        tried: List[OllamaBackend] = []
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.backends):
+            try:
+                backend = self.acquire(exclude=tried)
+            except NoBackendAvailable:
+                break
+            tried.append(backend)
+            started = False
+            try:
+                async for part in await fn(backend):
+                    started = True
+                    yield part
+            except GeneratorExit:
+                self.release(backend)
+                raise
+            except Exception as e:
+                self.release(backend, e)
+                if started or not _is_retryable(e):
+                    raise
+                last_error = e
+                continue
+            self.release(backend)
+            return
+        raise last_error or NoBackendAvailable("All Ollama backends are unavailable (circuit open)")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = self.clock()
+        with self._lock:
+            return [
+                {
+                    "url": b.url,
+                    "state": b.state(now, self.cooldown),
+                    "outstanding": b.outstanding,
+                    "consecutive_failures": b.consecutive_failures,
+                    "total_requests": b.total_requests,
+                    "total_failures": b.total_failures,
+                }
+                for b in self.backends
+            ]
+
+
+class RoutedOllamaLLM(OllamaLLM):
+    """OllamaLLM that picks a backend per call through an LLMRouter."""
+
+    router: Any = None
+    route: str = "default"
+
+    def _routed_params(self, prompt: str, stop: Optional[List[str]], **kwargs: Any) -> Dict[str, Any]:
+        # Per-call num_ctx / num_predict (token budget) are merged into the model options
+        overrides = {k: kwargs.pop(k) for k in ("num_ctx", "num_predict") if k in kwargs}
+        params = self._generate_params(prompt, stop=stop, **kwargs)
+        if overrides:
+            params["options"] = Options(**{**params["options"].model_dump(exclude_none=True), **overrides})
+        return params
+
+    def _start_call(self, prompt: str, stop: Optional[List[str]], kwargs: Dict[str, Any]):
+        # phase / template labels come from BudgetPlan.bind and are not Ollama parameters
+        labels = {k: kwargs.pop(k, None) for k in ("phase", "template")}
+        labels = {k: v for k, v in labels.items() if v}
+        params = self._routed_params(prompt, stop, **kwargs)
+        options = params.get("options")
+        labels.update(route=self.route, model=params.get("model"))
+        limits = {"num_ctx": getattr(options, "num_ctx", None), "num_predict": getattr(options, "num_predict", None)}
+        call = start_span("llm.generate", prompt_chars=len(prompt), num_ctx=limits["num_ctx"], **labels)
+        if call is not None:
+            # Calls without a budget plan are metered under the enclosing pipeline phase
+            labels.setdefault("phase", call.attrs.get("phase", ""))
+        return params, _Call(call, labels, limits)
+
+    def _create_generate_stream(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> Iterator[Any]:
+        params, call = self._start_call(prompt, stop, kwargs)
+        try:
+            for part in self.router.stream(lambda backend: backend.client.generate(**params)):
+                call.observe(part)
+                yield part
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.end()
+
+    async def _acreate_generate_stream(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        params, call = self._start_call(prompt, stop, kwargs)
+        try:
+            async for part in self.router.astream(lambda backend: backend.async_client.generate(**params)):
+                call.observe(part)
+                yield part
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.end()
+
+
+class _Call:
+    """Book-keeping for one generation: its trace span and Ollama's final usage statistics."""
+
+    def __init__(self, span: Optional[Span], labels: Dict[str, Any], limits: Dict[str, Optional[int]]):
+        self.span = span
+        self.labels = labels
+        self.limits = limits
+        self.completion_chars = 0
+        self.final: Any = None
+        self.error: Optional[BaseException] = None
+
+    def observe(self, part: Any):
+        self.completion_chars += len(part.get("response") or "")
+        if part.get("done"):
+            self.final = part
+
+    def end(self):
+        usage = meter.record(self.final, self.labels, **self.limits) if self.final is not None else None
+        if self.span is None:
+            return
+        if self.error is not None:
+            self.span.fail(self.error)
+        self.span.set(completion_chars=self.completion_chars)
+        if usage is not None:
+            self.span.set(
+                endpoint=usage.endpoint, prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens,
+                prefill_ms=round(usage.prefill_seconds * 1000, 1), decode_ms=round(usage.decode_seconds * 1000, 1),
+                context_limit=usage.context_limit, output_limit=usage.output_limit,
+            )
+        phase = self.span.attrs.get("phase", "")
+        LLM_PROMPT_CHARS.observe(self.span.attrs["prompt_chars"], phase=phase)
+        LLM_COMPLETION_CHARS.observe(self.completion_chars, phase=phase)
+        self.span.end()
+
+
+class RoutedOllamaEmbeddings(OllamaEmbeddings):
+    """OllamaEmbeddings that picks a backend per call through an LLMRouter."""
+
+    router: Any = None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embedding", model=self.model, texts=len(texts), chars=sum(len(t) for t in texts)):
+            return self.router.call(
+                lambda backend: backend.client.embed(
+                    self.model,
+                    texts,
+                    dimensions=self.dimensions,
+                    options=self._default_params,
+                    keep_alive=self.keep_alive,
+                )
+            )["embeddings"]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Embedding calls are short; reuse the sync routing path off the event loop
+        return await asyncio.to_thread(self.embed_documents, texts)
@@ -0,0 +1,81 @@
+import os
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Any, Dict, Optional
+
+from services.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+# A probe task sleeps for LOOP_MONITOR_INTERVAL and measures how late it wakes up. The
+# overshoot is time the event loop spent in code that never yielded: synchronous LLM calls,
+# parsing or file I/O inside `async def` handlers. Exposed on /metrics and /health.
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.05"))
+# Lag above this counts as blocked time; anything below is scheduler noise
+LOOP_BLOCKED_THRESHOLD = float(os.getenv("LOOP_BLOCKED_THRESHOLD", "0.01"))
+# Single stalls at least this long are logged
+LOOP_WARN_SECONDS = float(os.getenv("LOOP_WARN_SECONDS", "1.0"))
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LOOP_LAG = metrics.histogram("openl_event_loop_lag_seconds", "How late the event-loop probe woke up", (), LAG_BUCKETS)
+LOOP_BLOCKED = metrics.counter("openl_event_loop_blocked_seconds_total", "Event-loop lag above LOOP_BLOCKED_THRESHOLD")
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = LOOP_BLOCKED_THRESHOLD,
+                 warn_seconds: float = LOOP_WARN_SECONDS):
+        self.interval = interval
+        self.threshold = threshold
+        self.warn_seconds = warn_seconds
+        self.ticks = 0
+        self.stalls = 0
+        self.blocked_seconds = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start probing the running event loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.observe(loop.time() - due)
+
+    def observe(self, lag: float):
+        lag = max(0.0, lag)
+        self.ticks += 1
+        self.max_lag = max(self.max_lag, lag)
+        LOOP_LAG.observe(lag)
+        if lag > self.threshold:
+            self.stalls += 1
+            self.blocked_seconds += lag
+            LOOP_BLOCKED.inc(lag)
+        if lag >= self.warn_seconds:
+            logger.warning(f"[LOOP] Event loop blocked for {lag:.3f}s")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "ticks": self.ticks,
+            "stalls": self.stalls,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "max_lag_seconds": round(self.max_lag, 3),
+        }
+
+
+loop_monitor = LoopMonitor()
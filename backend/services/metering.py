@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from services.tracing import current_root, metrics
+
+logger = logging.getLogger(__name__)
+
+# Token and timing statistics Ollama reports with the last chunk of every generation
+# (prompt_eval_count / eval_count and their durations), per call and aggregated by
+# endpoint, phase and prompt template. Queried via GET /llm-usage.
+METERING_HISTORY = int(os.getenv("METERING_HISTORY", "1000"))
+# A call whose prompt + completion fills this share of num_ctx is flagged: Ollama silently
+# drops the front of a prompt that does not fit
+METERING_CONTEXT_LIMIT_RATIO = float(os.getenv("METERING_CONTEXT_LIMIT_RATIO", "0.98"))
+
+GROUP_FIELDS = ("endpoint", "phase", "template", "model")
+
+LLM_TOKENS = metrics.counter("openl_llm_tokens_total", "Tokens processed by Ollama", ("phase", "kind"))
+LLM_SECONDS = metrics.counter("openl_llm_seconds_total", "Ollama time by stage (prefill = prompt eval, decode = eval)", ("phase", "stage"))
+LLM_LIMIT_HITS = metrics.counter("openl_llm_limit_hits_total", "Calls that filled the context window or hit num_predict", ("phase", "limit"))
+
+
+def _seconds(nanos: Optional[int]) -> float:
+    return (nanos or 0) / 1e9
+
+
+class LLMCall:
+    __slots__ = (
+        "timestamp", "endpoint", "phase", "template", "model", "route", "num_ctx", "num_predict",
+        "prompt_tokens", "completion_tokens", "prefill_seconds", "decode_seconds", "load_seconds",
+        "total_seconds", "done_reason", "context_limit", "output_limit",
+    )
+
+    def __init__(self, final: Dict[str, Any], labels: Dict[str, Any], num_ctx: Optional[int], num_predict: Optional[int]):
+        self.timestamp = time.time()
+        self.endpoint = labels.get("endpoint", "")
+        self.phase = labels.get("phase", "")
+        self.template = labels.get("template", "")
+        self.model = final.get("model") or labels.get("model", "")
+        self.route = labels.get("route", "")
+        self.num_ctx = num_ctx
+        self.num_predict = num_predict
+        self.prompt_tokens = int(final.get("prompt_eval_count") or 0)
+        self.completion_tokens = int(final.get("eval_count") or 0)
+        self.prefill_seconds = _seconds(final.get("prompt_eval_duration"))
+        self.decode_seconds = _seconds(final.get("eval_duration"))
+        self.load_seconds = _seconds(final.get("load_duration"))
+        self.total_seconds = _seconds(final.get("total_duration"))
+        self.done_reason = final.get("done_reason") or ""
+        self.context_limit = bool(num_ctx) and self.prompt_tokens + self.completion_tokens >= num_ctx * METERING_CONTEXT_LIMIT_RATIO
+        self.output_limit = self.done_reason == "length" or (bool(num_predict) and self.completion_tokens >= num_predict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Totals:
+    __slots__ = ("calls", "prompt_tokens", "completion_tokens", "prefill_seconds", "decode_seconds",
+                 "load_seconds", "total_seconds", "context_limit_hits", "output_limit_hits")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def add(self, call: LLMCall):
+        self.calls += 1
+        self.prompt_tokens += call.prompt_tokens
+        self.completion_tokens += call.completion_tokens
+        self.prefill_seconds += call.prefill_seconds
+        self.decode_seconds += call.decode_seconds
+        self.load_seconds += call.load_seconds
+        self.total_seconds += call.total_seconds
+        self.context_limit_hits += call.context_limit
+        self.output_limit_hits += call.output_limit
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        busy = self.prefill_seconds + self.decode_seconds
+        data.update({
+            # Where the GPU time goes: high prefill share = prompts too large for what they produce
+            "prefill_share": round(self.prefill_seconds / busy, 3) if busy else None,
+            "prefill_tokens_per_second": round(self.prompt_tokens / self.prefill_seconds, 1) if self.prefill_seconds else None,
+            "decode_tokens_per_second": round(self.completion_tokens / self.decode_seconds, 1) if self.decode_seconds else None,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.calls, 1) if self.calls else None,
+        })
+        return data
+
+
+class Meter:
+    """Per-call Ollama usage records (bounded history) plus running totals per group."""
+
+    def __init__(self, history: int = METERING_HISTORY):
+        self._calls: Deque[LLMCall] = deque(maxlen=history)
+        self._totals: Dict[Tuple[str, ...], _Totals] = {}
+        self._lock = threading.Lock()
+        self.since = time.time()
+
+    def record(self, final: Dict[str, Any], labels: Dict[str, Any], num_ctx: Optional[int] = None, num_predict: Optional[int] = None) -> LLMCall:
+        if "endpoint" not in labels:
+            root = current_root()
+            labels = {**labels, "endpoint": root.attrs.get("path", "") if root is not None else ""}
+        call = LLMCall(final, labels, num_ctx, num_predict)
+        key = tuple(getattr(call, name) for name in GROUP_FIELDS)
+        with self._lock:
+            self._calls.append(call)
+            self._totals.setdefault(key, _Totals()).add(call)
+        LLM_TOKENS.inc(call.prompt_tokens, phase=call.phase, kind="prompt")
+        LLM_TOKENS.inc(call.completion_tokens, phase=call.phase, kind="completion")
+        LLM_SECONDS.inc(call.prefill_seconds, phase=call.phase, stage="prefill")
+        LLM_SECONDS.inc(call.decode_seconds, phase=call.phase, stage="decode")
+        if call.context_limit:
+            LLM_LIMIT_HITS.inc(phase=call.phase, limit="context")
+            logger.warning(f"[METER] {call.phase or call.route} call filled its context: {call.prompt_tokens}+{call.completion_tokens} tokens of num_ctx={call.num_ctx}")
+        if call.output_limit:
+            LLM_LIMIT_HITS.inc(phase=call.phase, limit="num_predict")
+        return call
+
+    def summary(self, group_by: Sequence[str] = ("endpoint", "phase")) -> List[Dict[str, Any]]:
+        """Totals regrouped by any subset of endpoint / phase / template / model, busiest first."""
+        fields = [f for f in group_by if f in GROUP_FIELDS]
+        grouped: Dict[Tuple[str, ...], _Totals] = {}
+        with self._lock:
+            items = list(self._totals.items())
+        for key, totals in items:
+            labels = dict(zip(GROUP_FIELDS, key))
+            target = grouped.setdefault(tuple(labels[f] for f in fields), _Totals())
+            for name in _Totals.__slots__:
+                setattr(target, name, getattr(target, name) + getattr(totals, name))
+        rows = [{**dict(zip(fields, key)), **totals.to_dict()} for key, totals in grouped.items()]
+        return sorted(rows, key=lambda r: -(r["prefill_seconds"] + r["decode_seconds"]))
+
+    def calls(self, limit: int = 100, flagged: bool = False, phase: Optional[str] = None, endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            calls = list(self._calls)
+        selected = [
+            c for c in reversed(calls)
+            if (not flagged or c.context_limit or c.output_limit)
+            and (phase is None or c.phase == phase)
+            and (endpoint is None or c.endpoint == endpoint)
+        ]
+        return [c.to_dict() for c in selected[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._totals.clear()
+            self.since = time.time()
+
+
+meter = Meter()
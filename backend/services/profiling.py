@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import hmac
+import uuid
+import pstats
+import asyncio
+import cProfile
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Opt-in per-request profiling: send `X-Profile: sample|cprofile` (or `?profile=...`) and the
+# request runs under a profiler; the result is saved under PROFILE_DIR and its ID returned in
+# the `X-Profile-Id` response header. Requests without the flag pay one header lookup.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Required: callers must send it as X-Profile-Token. Profiled requests run slower and write
+# files, so without a token profiling stays off even when PROFILING_ENABLED is true
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+MODES = {"sample", "cprofile"}
+# Innermost functions of a thread that is parked, not working (event loop select, pool workers)
+_IDLE_FUNCTIONS = {"wait", "select", "poll", "control", "_wait_for_tstate_lock", "accept"}
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of every thread at a fixed interval, so work the request hands to
+    `asyncio.to_thread` and thread pools is captured too. Writes speedscope's sampled format.
+    Concurrent requests running in the same process show up in the samples as well.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        self._samples: Dict[int, List[List[int]]] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _sample(self):
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own or frame.f_code.co_name in _IDLE_FUNCTIONS:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self._samples.setdefault(ident, []).append(stack)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        names = {t.ident: t.name for t in threading.enumerate()}
+        self._thread_names = {ident: names.get(ident, str(ident)) for ident in self._samples}
+
+    def sample_count(self) -> int:
+        return sum(len(stacks) for stacks in self._samples.values())
+
+    def hot_spots(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Functions most often on top of a sampled stack (self time)."""
+        names = {index: key for key, index in self._frames.items()}
+        counts: Dict[int, int] = {}
+        for stacks in self._samples.values():
+            for stack in stacks:
+                counts[stack[-1]] = counts.get(stack[-1], 0) + 1
+        top = sorted(counts.items(), key=lambda item: -item[1])[:limit]
+        return [
+            {"function": names[i][0], "file": names[i][1], "line": names[i][2], "self_seconds": round(n * self.interval, 3)}
+            for i, n in top
+        ]
+
+    def save(self, path: str, name: str):
+        frames = [{"name": key[0], "file": key[1], "line": key[2]} for key, _ in sorted(self._frames.items(), key=lambda item: item[1])]
+        profiles = [
+            {
+                "type": "sampled",
+                "name": self._thread_names.get(ident, str(ident)),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(len(stacks) * self.interval, 6),
+                "samples": stacks,
+                "weights": [self.interval] * len(stacks),
+            }
+            for ident, stacks in self._samples.items()
+        ]
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "openl-ai-app",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f, separators=(",", ":"))
+
+
+class DeterministicProfiler:
+    """cProfile of the event-loop thread for the duration of the request (pstats output).
+    Exact call counts, but threads started with `asyncio.to_thread` are not included, and other
+    coroutines the loop runs meanwhile are."""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+        self.elapsed = time.perf_counter() - self.started
+
+    def sample_count(self) -> int:
+        return 0
+
+    def hot_spots(self, limit: int = 10) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self._profile)
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:limit]  # by own (total) time
+        return [
+            {"function": func[2], "file": func[0], "line": func[1], "calls": nc, "self_seconds": round(tt, 4), "cumulative_seconds": round(ct, 4)}
+            for func, (cc, nc, tt, ct, callers) in rows
+        ]
+
+    def save(self, path: str, name: str):
+        self._profile.dump_stats(path)
+
+
+class ProfileStore:
+    """Saved profiles: <dir>/<id>.speedscope.json or <id>.pstats, plus <id>.json metadata."""
+
+    EXTENSIONS = {"sample": ".speedscope.json", "cprofile": ".pstats"}
+
+    def __init__(self, profile_dir: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.profile_dir = profile_dir
+        self.max_files = max_files
+
+    def save(self, profiler, mode: str, meta: Dict[str, Any], profile_id: Optional[str] = None) -> str:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profile_id = profile_id or uuid.uuid4().hex[:16]
+        data_path = os.path.join(self.profile_dir, profile_id + self.EXTENSIONS[mode])
+        profiler.save(data_path, f"{meta.get('method', '')} {meta.get('path', '')}")
+        meta = {
+            **meta,
+            "id": profile_id,
+            "mode": mode,
+            "created_at": time.time(),
+            "duration_seconds": round(profiler.elapsed, 4),
+            "samples": profiler.sample_count(),
+            "file": os.path.basename(data_path),
+            "hot_spots": profiler.hot_spots(),
+        }
+        with open(os.path.join(self.profile_dir, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        self._trim()
+        return profile_id
+
+    def _metas(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.profile_dir):
+            return []
+        metas = []
+        for name in os.listdir(self.profile_dir):
+            if name.endswith(".json") and not name.endswith(".speedscope.json"):
+                try:
+                    with open(os.path.join(self.profile_dir, name), "r", encoding="utf-8") as f:
+                        metas.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(metas, key=lambda m: -m.get("created_at", 0))
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [{k: v for k, v in meta.items() if k != "hot_spots"} for meta in self._metas()]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not profile_id.isalnum():
+            return None
+        path = os.path.join(self.profile_dir, f"{profile_id}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def data_path(self, profile_id: str) -> Optional[str]:
+        meta = self.get(profile_id)
+        return os.path.join(self.profile_dir, meta["file"]) if meta else None
+
+    def _trim(self):
+        for meta in self._metas()[self.max_files:]:
+            for name in (meta["file"], f"{meta['id']}.json"):
+                try:
+                    os.remove(os.path.join(self.profile_dir, name))
+                except FileNotFoundError:
+                    pass
+
+
+profile_store = ProfileStore()
+
+
+def profiling_authorized(token: Optional[str]) -> bool:
+    """True when profiling is enabled, a PROFILING_TOKEN is configured and `token` matches it."""
+    if not (PROFILING_ENABLED and PROFILING_TOKEN and token):
+        return False
+    return hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+
+
+def _requested_mode(scope) -> Optional[str]:
+    headers = dict(scope.get("headers") or [])
+    value = headers.get(b"x-profile", b"").decode().strip().lower()
+    if not value:
+        for pair in scope.get("query_string", b"").decode().split("&"):
+            key, _, raw = pair.partition("=")
+            if key == "profile":
+                value = raw.strip().lower() or "sample"
+    if not value or value in ("0", "false", "off"):
+        return None
+    if not profiling_authorized(headers.get(b"x-profile-token", b"").decode()):
+        return None
+    return value if value in MODES else "sample"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running flagged requests under a profiler (one at a time per process)."""
+
+    def __init__(self, app, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+        self._busy = threading.Lock()
+        if PROFILING_ENABLED and not PROFILING_TOKEN:
+            logger.error("[PROFILE] PROFILING_ENABLED is set without PROFILING_TOKEN; request profiling stays disabled")
+
+    async def __call__(self, scope, receive, send):
+        mode = _requested_mode(scope) if PROFILING_ENABLED and scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        if not self._busy.acquire(blocking=False):
+            # Another request is being profiled; run this one normally
+            await self.app(scope, receive, self._with_headers(send, [(b"x-profile-status", b"busy")]))
+            return
+        profiler = SamplingProfiler() if mode == "sample" else DeterministicProfiler()
+        # The ID is announced in the response headers; the file is written once the body is sent
+        profile_id = uuid.uuid4().hex[:16]
+        status = {"code": 500}
+        announce = self._with_headers(send, [(b"x-profile-id", profile_id.encode()), (b"x-profile-url", f"/profiles/{profile_id}".encode())])
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await announce(message)
+
+        try:
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_with_profile)
+            finally:
+                profiler.stop()
+            meta = {"method": scope["method"], "path": scope["path"], "status": status["code"]}
+            await asyncio.to_thread(self.store.save, profiler, mode, meta, profile_id)
+            logger.info(f"[PROFILE] {scope['method']} {scope['path']} took {profiler.elapsed:.2f}s, saved as {profile_id}")
+        finally:
+            self._busy.release()
+
+    @staticmethod
+    def _with_headers(send, headers):
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + headers}
+            await send(message)
+        return wrapped
@@ -0,0 +1,94 @@
+import json
+import re
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from services.token_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Compact prompt encodings. Prompt tokens are prefill time on our hardware, so rules and
+# datatypes go into prompts as one terse line each, without defaults, nulls or Python reprs.
+
+# Field values that carry no information for the model
+RULE_DEFAULTS = {"selected": True, "category": "General", "rule_type": "SmartRules"}
+RULE_FIELD_ORDER = ["id", "name", "summary", "condition", "result", "rule_type", "category", "related_datatypes", "source_text"]
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _as_dict(item: Any) -> Dict[str, Any]:
+    if hasattr(item, "model_dump"):
+        return item.model_dump()
+    if hasattr(item, "dict"):
+        return item.dict()
+    return dict(item)
+
+
+def _value(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_value(v) for v in value)
+    # Keep one rule per line: newlines and runs of spaces collapse to a single space
+    return _WHITESPACE.sub(" ", str(value)).strip()
+
+
+def _meaningful(key: str, value: Any, defaults: Dict[str, Any]) -> bool:
+    if value is None or value == "" or value == [] or value == {}:
+        return False
+    return not (key in defaults and defaults[key] == value)
+
+
+def encode_record(record: Any, fields: Optional[List[str]] = None, defaults: Optional[Dict[str, Any]] = None) -> str:
+    """`key: value | key: value` for the non-default fields (only `fields`, in that order, when given)."""
+    data = _as_dict(record)
+    defaults = defaults or {}
+    order = [f for f in fields if f in data] if fields else list(data)
+    return " | ".join(f"{k}: {_value(data[k])}" for k in order if _meaningful(k, data[k], defaults))
+
+
+def encode_rules(rules: Iterable[Any], fields: Optional[List[str]] = None) -> str:
+    """One line per rule. Field names match the JSON schema so the model can echo rules back."""
+    return "\n".join(f"- {encode_record(r, fields or RULE_FIELD_ORDER, RULE_DEFAULTS)}" for r in rules)
+
+
+def encode_conditions(rules: Iterable[Any]) -> str:
+    """Phase C listing: `- <id> <name>: <condition>` (the summary stands in for a missing condition)."""
+    lines = []
+    for r in rules:
+        data = _as_dict(r)
+        label = " ".join(_value(data[k]) for k in ("id", "name") if data.get(k))
+        lines.append(f"- {label}: {_value(data.get('condition') or data.get('summary') or '')}")
+    return "\n".join(lines)
+
+
+def encode_datatypes(datatypes: Iterable[Any], types: bool = True) -> str:
+    """`- Policy(effectiveDate: Date, status: String)`; accepts models or cached dicts."""
+    lines = []
+    for d in datatypes:
+        data = _as_dict(d)
+        fields = [_as_dict(f) for f in data.get("fields", [])]
+        listing = ", ".join(f"{f['name']}: {f['type']}" if types else f["name"] for f in fields)
+        lines.append(f"- {data['name']}({listing})")
+    return "\n".join(lines)
+
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation or padding (table cells are kept as-is, empty ones included)."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def report_savings(phase: str, segments: Dict[str, Tuple[Union[str, Callable[[], str]], str]]) -> Dict[str, int]:
+    """
+    Logs and returns the estimated prompt tokens saved per segment: {name: (verbose, compact)}.
+    Pass `verbose` as a callable to build it only when DEBUG logging is enabled; otherwise
+    nothing is computed and {} is returned.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return {}
+    segments = {name: (verbose() if callable(verbose) else verbose, compact) for name, (verbose, compact) in segments.items()}
+    saved = {name: estimate_tokens(verbose) - estimate_tokens(compact) for name, (verbose, compact) in segments.items()}
+    total = sum(saved.values())
+    before = sum(estimate_tokens(verbose) for verbose, _ in segments.values())
+    detail = ", ".join(f"{name} -{tokens}" for name, tokens in saved.items())
+    logger.debug(f"[PROMPT] {phase}: ~{total} of {before} tokens saved by compact encoding ({detail})")
+    return saved
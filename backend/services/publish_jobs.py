@@ -0,0 +1,170 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import contextvars
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Git publishing runs as a background job: /generate-excel answers as soon as the workbook is
+# written, and the MR details are read from GET /publish-jobs/{id} once the push finished.
+PUBLISH_STAGING_DIR = os.getenv("PUBLISH_STAGING_DIR", "publish_staging")
+# Jobs run in parallel in their own git worktrees (GIT_WORKTREES); 1 restores strict ordering
+PUBLISH_WORKERS = int(os.getenv("PUBLISH_WORKERS", "3"))
+PUBLISH_JOB_HISTORY = int(os.getenv("PUBLISH_JOB_HISTORY", "200"))
+# Jobs queued within this many seconds of each other go out as one commit, push and MR update
+PUBLISH_COALESCE_SECONDS = float(os.getenv("PUBLISH_COALESCE_SECONDS", "5"))
+PUBLISH_BATCH_MAX = int(os.getenv("PUBLISH_BATCH_MAX", "20"))
+
+
+class PublishJob:
+    def __init__(self, filename: str, staged_path: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.staged_path = staged_path
+        self.status = "queued"  # queued -> running -> success | skipped | error
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Dict[str, Any] = {}
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("success", "skipped", "error")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "message": self.result.get("message", ""),
+            "mr_url": self.result.get("mr_url", ""),
+            "source_branch": self.result.get("source_branch", ""),
+            "target_branch": self.result.get("target_branch", ""),
+            # Every workbook that went out in the same commit as this one
+            "batch_files": self.result.get("files", [self.filename]),
+        }
+
+
+class PublishQueue:
+    """
+    In-process queue of Git publish jobs, drained by PUBLISH_WORKERS asyncio workers.
+    The workbook is copied into a per-job staging directory on submit, so the caller's file
+    (which /download deletes after serving it) can go away before the job runs.
+    A worker that picks up a job keeps collecting jobs for `coalesce_seconds` (up to
+    `batch_max`) and publishes them together; every job in the batch shares the result.
+    """
+
+    def __init__(self, git_service, staging_dir: str = PUBLISH_STAGING_DIR, workers: int = PUBLISH_WORKERS, history: int = PUBLISH_JOB_HISTORY,
+                 coalesce_seconds: float = PUBLISH_COALESCE_SECONDS, batch_max: int = PUBLISH_BATCH_MAX):
+        self.git_service = git_service
+        self.staging_dir = staging_dir
+        self.workers = max(1, workers)
+        self.history = history
+        self.coalesce_seconds = coalesce_seconds
+        self.batch_max = max(1, batch_max)
+        self.jobs: "OrderedDict[str, PublishJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._collecting: Optional[asyncio.Lock] = None
+
+    def _ensure_workers(self):
+        # Created lazily: the queue and tasks belong to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._collecting = asyncio.Lock()
+            # Fresh context: workers outlive the request that started them, so their traces must not nest in it
+            self._tasks = [asyncio.create_task(self._worker(), context=contextvars.Context()) for _ in range(self.workers)]
+
+    def submit(self, file_path: str, filename: str) -> PublishJob:
+        job_dir = os.path.join(self.staging_dir, uuid.uuid4().hex)
+        os.makedirs(job_dir, exist_ok=True)
+        staged_path = os.path.join(job_dir, filename)
+        shutil.copy(file_path, staged_path)
+        job = PublishJob(filename, staged_path)
+        self.jobs[job.id] = job
+        self._trim_history()
+        self._ensure_workers()
+        self._queue.put_nowait(job)
+        logger.info(f"Queued publish job {job.id} for {filename}")
+        return job
+
+    def get(self, job_id: str) -> Optional[PublishJob]:
+        return self.jobs.get(job_id)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
+
+    async def _collect(self, batch: List[PublishJob]):
+        """Add jobs arriving within the coalescing window (or already waiting) to `batch`."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_seconds
+        while len(batch) < self.batch_max:
+            timeout = deadline - loop.time()
+            try:
+                if timeout <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                return
+
+    async def _worker(self):
+        while True:
+            # One worker gathers a batch at a time, so idle workers don't split it between them
+            async with self._collecting:
+                batch = [await self._queue.get()]
+                try:
+                    await self._collect(batch)
+                except BaseException:
+                    for _ in batch:
+                        self._queue.task_done()
+                    raise
+            try:
+                await self._run(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _run(self, batch: List[PublishJob]):
+        started_at = time.time()
+        for job in batch:
+            job.status = "running"
+            job.started_at = started_at
+        try:
+            with span("publish.batch", phase="publish", jobs=len(batch)):
+                result = await self.git_service.publish_files([(job.staged_path, job.filename) for job in batch], delete_after=False)
+        except Exception as e:
+            logger.error(f"Publish batch {', '.join(job.id for job in batch)} failed: {e}")
+            result = {"status": "error", "message": str(e)}
+        finished_at = time.time()
+        for job in batch:
+            job.result = dict(result)
+            job.status = result.get("status", "error")
+            job.finished_at = finished_at
+            shutil.rmtree(os.path.dirname(job.staged_path), ignore_errors=True)
+        logger.info(f"Publish batch of {len(batch)} job(s) finished: {result.get('status', 'error')} in {finished_at - started_at:.1f}s")
+
+    async def join(self):
+        """Wait until every queued job has finished (tests, shutdown)."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._collecting = None
@@ -0,0 +1,613 @@
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import Datatype
+from services.vocabulary import camel_case, normalize_type
+from services.workbook_writer import table_header
+
+# In-process execution of the OpenL subset the generator emits (Rules/SmartRules tables with
+# comparisons, ranges, value lists and dateDif). All cases of a rule are evaluated at once:
+# inputs are (1, N) arrays over the N test cases, condition parameters are (R, 1) arrays over
+# the R rule rows, so every condition column yields an (R, N) boolean match matrix.
+
+# "off" skips evaluation, "report" attaches the results, "block" also refuses to publish to Git
+QUALITY_GATE = os.getenv("QUALITY_GATE", "report")
+
+NUMERIC_TYPES = {"Integer", "Double", "Long", "BigDecimal", "BigInteger", "Float", "Short", "int", "double", "long", "float"}
+RANGE_TYPES = {"IntRange": "Double", "DoubleRange": "Double", "DateRange": "Date"}
+
+_TOKEN = re.compile(r'\s*(?:(\d+(?:\.\d+)?)|("[^"]*")|([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)|(==|!=|>=|<=|&&|\|\||[<>!+\-*/(),]))')
+_RULE_RESULT = re.compile(r'new\s+RuleResult\s*\(\s*"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\s*\)')
+_RULES_HEADER = re.compile(r'^\s*(Rules|SmartRules|SimpleRules)\s+\S+\s+(\w+)\s*\((.*)\)\s*$')
+_TEST_HEADER = re.compile(r'^\s*Test\s+(\w+)\s+\w+\s*$')
+_FIELD = re.compile(r'^(_id_|_description_|_error_|_res_(?:\.\w+)*|[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)$')
+_WORD_OPS = {"and": "&&", "or": "||", "not": "!"}
+
+
+class Unsupported(Exception):
+    """The table uses syntax outside the evaluated subset."""
+
+
+# --- Expressions ---------------------------------------------------------------
+
+def _tokenize(text: str) -> List[Tuple[str, Any]]:
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise Unsupported(f"cannot tokenize `{text[pos:]}`")
+        number, string, name, op = match.groups()
+        pos = match.end()
+        if number is not None:
+            tokens.append(("lit", float(number)))
+        elif string is not None:
+            tokens.append(("lit", string[1:-1]))
+        elif name is not None:
+            lowered = name.lower()
+            if lowered in ("true", "false"):
+                tokens.append(("lit", lowered == "true"))
+            elif lowered == "null":
+                tokens.append(("lit", None))
+            elif lowered in _WORD_OPS:
+                tokens.append(("op", _WORD_OPS[lowered]))
+            else:
+                tokens.append(("name", name))
+        else:
+            tokens.append(("op", op))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent: || < && < ! < comparison < + - < * / < unary minus < primary."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise Unsupported(f"unexpected `{self.tokens[self.pos][1]}`")
+        return node
+
+    def _peek(self, *ops):
+        return self.pos < len(self.tokens) and self.tokens[self.pos][0] == "op" and self.tokens[self.pos][1] in ops
+
+    def _take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _binary(self, ops, operand):
+        node = operand()
+        while self._peek(*ops):
+            op = self._take()[1]
+            node = ("bin", op, node, operand())
+        return node
+
+    def _or(self):
+        return self._binary(("||",), self._and)
+
+    def _and(self):
+        return self._binary(("&&",), self._not)
+
+    def _not(self):
+        if self._peek("!"):
+            self._take()
+            return ("not", self._not())
+        return self._cmp()
+
+    def _cmp(self):
+        return self._binary(("==", "!=", ">=", "<=", ">", "<"), self._add)
+
+    def _add(self):
+        return self._binary(("+", "-"), self._mul)
+
+    def _mul(self):
+        return self._binary(("*", "/"), self._unary)
+
+    def _unary(self):
+        if self._peek("-"):
+            self._take()
+            return ("bin", "-", ("lit", 0.0), self._unary())
+        return self._primary()
+
+    def _primary(self):
+        if self.pos >= len(self.tokens):
+            raise Unsupported("unexpected end of expression")
+        kind, value = self._take()
+        if kind == "lit":
+            return ("lit", value)
+        if kind == "name":
+            if self._peek("("):
+                self._take()
+                args = []
+                if not self._peek(")"):
+                    args.append(self._or())
+                    while self._peek(","):
+                        self._take()
+                        args.append(self._or())
+                if not self._peek(")"):
+                    raise Unsupported(f"unclosed call to {value}")
+                self._take()
+                return ("call", value, args)
+            return ("name", value)
+        if value == "(":
+            node = self._or()
+            if not self._peek(")"):
+                raise Unsupported("unbalanced parentheses")
+            self._take()
+            return node
+        raise Unsupported(f"unexpected `{value}`")
+
+
+def _names(node) -> set:
+    if node[0] == "name":
+        return {node[1]}
+    if node[0] == "bin":
+        return _names(node[2]) | _names(node[3])
+    if node[0] == "not":
+        return _names(node[1])
+    if node[0] == "call":
+        return set().union(*[_names(a) for a in node[2]]) if node[2] else set()
+    return set()
+
+
+def _is_date(x) -> bool:
+    return isinstance(x, np.ndarray) and x.dtype.kind == "M" or isinstance(x, np.datetime64)
+
+
+def _as_date(x):
+    if _is_date(x):
+        return x
+    if isinstance(x, str):
+        return np.datetime64(x, "D")
+    raise Unsupported("date arithmetic on a non-date value")
+
+
+def _days_between(later, earlier) -> np.ndarray:
+    delta = (_as_date(later) - _as_date(earlier)).astype("timedelta64[D]")
+    return np.where(np.isnat(delta), np.nan, delta.astype("int64")).astype(float)
+
+
+def _months_between(later, earlier) -> np.ndarray:
+    later, earlier = _as_date(later), _as_date(earlier)
+    months = (later.astype("datetime64[M]") - earlier.astype("datetime64[M]")).astype("int64").astype(float)
+    later_day = (later - later.astype("datetime64[M]")).astype("timedelta64[D]").astype("int64")
+    earlier_day = (earlier - earlier.astype("datetime64[M]")).astype("timedelta64[D]").astype("int64")
+    months = months - (later_day < earlier_day)
+    return np.where(np.isnat(later) | np.isnat(earlier), np.nan, months)
+
+
+def _add_days(date, days, sign: int):
+    days = np.asarray(days, dtype=float) * sign
+    delta = np.where(np.isnan(days), np.timedelta64("NaT", "D"), np.nan_to_num(days).astype("int64").astype("timedelta64[D]"))
+    return _as_date(date) + delta
+
+
+def _truthy(x) -> np.ndarray:
+    x = np.asarray(x)
+    if x.dtype == bool:
+        return x
+    if x.dtype.kind == "f":
+        return x == 1.0
+    return np.frompyfunc(lambda v: v is True, 1, 1)(x).astype(bool)
+
+
+def _compare(op: str, a, b) -> np.ndarray:
+    if _is_date(a) and isinstance(b, str):
+        b = np.datetime64(b, "D")
+    elif _is_date(b) and isinstance(a, str):
+        a = np.datetime64(a, "D")
+    a_obj = isinstance(a, np.ndarray) and a.dtype == object or isinstance(a, str) or a is None
+    b_obj = isinstance(b, np.ndarray) and b.dtype == object or isinstance(b, str) or b is None
+    if a_obj or b_obj:
+        a, b = np.asarray(a, dtype=object), np.asarray(b, dtype=object)
+        if op in ("==", "!="):
+            # Factorize to integer codes so equality runs as a numpy kernel, not per element in Python
+            codes: Dict[Any, int] = {}
+            a_codes, b_codes = (
+                np.fromiter((codes.setdefault(v, len(codes)) for v in x.ravel()), dtype=np.int64, count=x.size).reshape(x.shape)
+                for x in (a, b)
+            )
+            return a_codes == b_codes if op == "==" else a_codes != b_codes
+
+        def safe(x, y):
+            try:
+                return bool({"==": x == y, "!=": x != y, ">=": x >= y, "<=": x <= y, ">": x > y, "<": x < y}[op])
+            except TypeError:
+                return op == "!="
+        return np.frompyfunc(safe, 2, 1)(a, b).astype(bool)
+    if isinstance(a, bool):
+        a = float(a)
+    if isinstance(b, bool):
+        b = float(b)
+    with np.errstate(invalid="ignore"):
+        return {"==": np.equal, "!=": np.not_equal, ">=": np.greater_equal, "<=": np.less_equal, ">": np.greater, "<": np.less}[op](a, b)
+
+
+def _evaluate(node, env: Dict[str, Any]):
+    kind = node[0]
+    if kind == "lit":
+        return node[1]
+    if kind == "name":
+        if node[1] not in env:
+            raise Unsupported(f"unknown name `{node[1]}`")
+        return env[node[1]]
+    if kind == "not":
+        return ~_truthy(_evaluate(node[1], env))
+    if kind == "call":
+        name, args = node[1], [_evaluate(a, env) for a in node[2]]
+        if name == "dateDif" and len(args) == 3 and isinstance(args[2], str):
+            unit = args[2].upper()
+            if unit == "D":
+                return _days_between(args[1], args[0])
+            if unit == "W":
+                return np.floor(_days_between(args[1], args[0]) / 7)
+            if unit == "M":
+                return _months_between(args[1], args[0])
+            if unit == "Y":
+                return np.floor(_months_between(args[1], args[0]) / 12)
+        raise Unsupported(f"function `{name}` is not supported")
+    op, left, right = node[1], _evaluate(node[2], env), _evaluate(node[3], env)
+    if op == "&&":
+        return _truthy(left) & _truthy(right)
+    if op == "||":
+        return _truthy(left) | _truthy(right)
+    if op in ("==", "!=", ">=", "<=", ">", "<"):
+        return _compare(op, left, right)
+    if _is_date(left) and op in ("+", "-"):
+        if _is_date(right) or isinstance(right, str) and op == "-":
+            return _days_between(left, right)
+        return _add_days(left, right, 1 if op == "+" else -1)
+    if _is_date(right) and op == "+":
+        return _add_days(right, left, 1)
+    try:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}[op](
+                np.asarray(left, dtype=float), np.asarray(right, dtype=float))
+    except (TypeError, ValueError):
+        raise Unsupported(f"`{op}` on non-numeric values")
+
+
+# --- Values ----------------------------------------------------------------------
+
+def _clean(text: Any) -> str:
+    raw = "" if text is None else str(text).strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        raw = raw[1:-1]
+    return raw
+
+
+def _typed_array(cells: List[Any], type_name: Optional[str]) -> np.ndarray:
+    """Cell texts -> 1-D array: float for numbers/booleans (NaN = null), datetime64[D] for dates, object otherwise."""
+    values = [_clean(c) for c in cells]
+    if type_name is None:
+        nonblank = [v for v in values if v]
+        if nonblank and all(re.match(r'^-?\d+(\.\d+)?$', v) for v in nonblank):
+            type_name = "Double"
+        elif nonblank and all(re.match(r'^\d{4}-\d{2}-\d{2}$', v) for v in nonblank):
+            type_name = "Date"
+        elif nonblank and all(v.lower() in ("true", "false") for v in nonblank):
+            type_name = "Boolean"
+    if type_name in NUMERIC_TYPES:
+        out = []
+        for v in values:
+            try:
+                out.append(float(v) if v else np.nan)
+            except ValueError:
+                out.append(np.nan)
+        return np.array(out, dtype=float)
+    if type_name == "Date":
+        out = []
+        for v in values:
+            try:
+                out.append(np.datetime64(_to_iso(v), "D") if v else np.datetime64("NaT", "D"))
+            except ValueError:
+                out.append(np.datetime64("NaT", "D"))
+        return np.array(out, dtype="datetime64[D]")
+    if type_name in ("Boolean", "boolean"):
+        return np.array([{"true": 1.0, "false": 0.0}.get(v.lower(), np.nan) for v in values], dtype=float)
+    return np.array([v if v else None for v in values], dtype=object)
+
+
+def _to_iso(text: str) -> str:
+    match = re.match(r'^(\d{1,2})/(\d{1,2})/(\d{4})$', text)
+    return f"{match.group(3)}-{int(match.group(1)):02d}-{int(match.group(2)):02d}" if match else text
+
+
+def _parse_range(text: str, value_type: str) -> Optional[Tuple[Any, Any, bool, bool]]:
+    """OpenL range cells: `18-65`, `18..65`, `[18; 65)`, `>= 18`, `< 5`, `18+`."""
+    raw = _clean(text).replace(" ", "")
+    convert = (lambda v: np.datetime64(_to_iso(v), "D")) if value_type == "Date" else float
+    try:
+        match = re.match(r'^([\[(])(.+?);(.+?)([\])])$', raw)
+        if match:
+            return convert(match.group(2)), convert(match.group(3)), match.group(1) == "[", match.group(4) == "]"
+        match = re.match(r'^(>=|<=|>|<)(.+)$', raw)
+        if match:
+            op, bound = match.group(1), convert(match.group(2))
+            return (bound, None, op == ">=", True) if op.startswith(">") else (None, bound, True, op == "<=")
+        if raw.endswith("+"):
+            return convert(raw[:-1]), None, True, True
+        match = re.match(r'^(-?[\d.]+)(?:-|\.\.)(-?[\d.]+)$', raw) if value_type != "Date" else re.match(r'^(\S+?)\.\.(\S+)$', raw)
+        if match:
+            return convert(match.group(1)), convert(match.group(2)), True, True
+        value = convert(raw)
+        return value, value, True, True
+    except ValueError:
+        return None
+
+
+def _in_ranges(values, ranges: List[Optional[Tuple[Any, Any, bool, bool]]]) -> np.ndarray:
+    """(R, N) containment of the (1, N) `values` in one range per rule row (None = any)."""
+    values = np.asarray(values)
+    rows = []
+    for r in ranges:
+        if r is None:
+            rows.append(np.ones(values.shape[-1], dtype=bool))
+            continue
+        lo, hi, lo_inc, hi_inc = r
+        ok = np.ones(values.shape[-1], dtype=bool)
+        if lo is not None:
+            ok &= _compare(">=" if lo_inc else ">", values.reshape(-1), lo)
+        if hi is not None:
+            ok &= _compare("<=" if hi_inc else "<", values.reshape(-1), hi)
+        rows.append(ok)
+    return np.vstack(rows)
+
+
+def _result_of(cell: Any) -> Optional[Tuple[str, ...]]:
+    text = "" if cell is None else str(cell).strip()
+    match = _RULE_RESULT.search(text)
+    if match:
+        return match.groups()
+    if text and not text.startswith("="):
+        return (_clean(text),)
+    return None
+
+
+# --- Tables ---------------------------------------------------------------------------
+
+class CompiledTable:
+    """A Rules/SmartRules table compiled to vectorized condition columns."""
+
+    def __init__(self, table: dict, field_types: Dict[str, Dict[str, str]]):
+        header = table_header(table)
+        match = _RULES_HEADER.match(header)
+        if not match:
+            raise Unsupported(f"not a Rules table: {header}")
+        self.kind, self.name = match.group(1), match.group(2)
+        self.field_types = field_types
+        self.signature: Dict[str, str] = {}
+        for param in [p.strip() for p in match.group(3).split(",") if p.strip()]:
+            parts = param.split()
+            if len(parts) == 2:
+                self.signature[parts[1]] = normalize_type(parts[0])
+        self.rows = [list(r) if isinstance(r, (list, tuple)) else [r] for r in (table.get("rows") or table.get("Rows") or [])]
+        if self.kind == "SmartRules":
+            self._compile_smart()
+        else:
+            self._compile_rules()
+
+    def path_type(self, path: str) -> Optional[str]:
+        parts = path.split(".")
+        current = self.signature.get(parts[0])
+        for part in parts[1:]:
+            if current is None:
+                return None
+            current = self.field_types.get(current.rstrip("[]"), {}).get(part)
+        return current
+
+    @staticmethod
+    def _cell(row: list, i: int) -> str:
+        return str(row[i]).strip() if i < len(row) and row[i] is not None else ""
+
+    def _compile_rules(self):
+        if len(self.rows) < 5:
+            raise Unsupported("no rule rows")
+        codes = [str(c).strip().upper() for c in self.rows[0]]
+        body = self.rows[4:]
+        self.conditions = []
+        ret_col = None
+        for i, code in enumerate(codes):
+            if re.match(r'^C\d+$', code):
+                declaration = self._cell(self.rows[2], i).split()
+                if len(declaration) != 2:
+                    raise Unsupported(f"{code} has no parameter declaration")
+                ast = _Parser(self._cell(self.rows[1], i)).parse()
+                self.conditions.append((ast, declaration[0], declaration[1], [self._cell(r, i) for r in body]))
+            elif re.match(r'^RET\d*$', code) and ret_col is None:
+                ret_col = i
+        if ret_col is None:
+            raise Unsupported("no RET column")
+        self.results = [_result_of(self._cell(r, ret_col)) for r in body]
+
+    def _compile_smart(self):
+        """SmartRules: row 1 holds column titles matched to input fields; the last column is the result."""
+        if len(self.rows) < 2:
+            raise Unsupported("no rule rows")
+        fields = {}
+        for root, type_name in self.signature.items():
+            fields[root.lower()] = root
+            for field in self.field_types.get(type_name, {}):
+                fields.setdefault(field.lower(), f"{root}.{field}")
+        titles = [self._cell(self.rows[0], i) for i in range(len(self.rows[0]))]
+        body = self.rows[1:]
+        self.conditions = []
+        for i, title in enumerate(titles[:-1]):
+            path = fields.get(camel_case(title).lower())
+            if path is None:
+                raise Unsupported(f"column `{title}` does not match an input field")
+            value_type = self.path_type(path) or ""
+            declared = {"Date": "DateRange"}.get(value_type, "DoubleRange" if value_type in NUMERIC_TYPES else f"{value_type or 'String'}[]")
+            self.conditions.append((("name", path), declared, "__smart__", [self._cell(r, i) for r in body]))
+        self.results = [_result_of(self._cell(r, len(titles) - 1)) for r in body]
+
+    def match_matrix(self, env: Dict[str, Any], n_cases: int) -> np.ndarray:
+        """(R, N) boolean matrix: does rule row r fire for test case n (ignoring earlier rows)."""
+        n_rules = len(self.results)
+        matched = np.ones((n_rules, n_cases), dtype=bool)
+        for ast, param_type, param_name, cells in self.conditions:
+            blank = np.array([c == "" for c in cells]).reshape(-1, 1)
+            if blank.all():
+                continue
+            base_type = normalize_type(param_type) if param_type not in RANGE_TYPES else param_type
+            if param_name in _names(ast):
+                if param_type in RANGE_TYPES or base_type.endswith("[]"):
+                    raise Unsupported(f"range/array parameter `{param_name}` used inside an expression")
+                scoped = dict(env)
+                scoped[param_name] = _typed_array(cells, base_type).reshape(-1, 1)
+                result = _truthy(_evaluate(ast, scoped))
+            else:
+                value = _evaluate(ast, env)
+                if param_type in RANGE_TYPES:
+                    value_type = RANGE_TYPES[param_type]
+                    result = _in_ranges(value, [None if c == "" else _parse_range(c, value_type) for c in cells])
+                elif base_type.endswith("[]"):
+                    element_type = base_type[:-2]
+                    if element_type in NUMERIC_TYPES or element_type == "Date":
+                        result = _in_ranges(value, [None if c == "" else _parse_range(c, "Date" if element_type == "Date" else "Double") for c in cells])
+                    else:
+                        rows = []
+                        for c in cells:
+                            options = np.array([_clean(o) for o in c.split(",")], dtype=object)
+                            rows.append(np.isin(np.asarray(value, dtype=object).reshape(-1), options))
+                        result = np.vstack(rows)
+                elif base_type in ("Boolean", "boolean"):
+                    result = _truthy(value) == (_typed_array(cells, "Boolean").reshape(-1, 1) == 1.0)
+                else:
+                    result = _compare("==", value, _typed_array(cells, base_type).reshape(-1, 1))
+            matched &= np.broadcast_to(result, (n_rules, n_cases)) | blank
+        return matched
+
+    def fire(self, env: Dict[str, Any], n_cases: int) -> np.ndarray:
+        """Index of the first matching rule row per case, -1 when nothing fires."""
+        matched = self.match_matrix(env, n_cases)
+        return np.where(matched.any(axis=0), matched.argmax(axis=0), -1)
+
+
+def _test_cases(test: dict) -> Optional[Dict[str, List[str]]]:
+    """Field -> per-case values, for vertical (`[field, description, case...]`) and horizontal test tables."""
+    rows = [list(r) if isinstance(r, (list, tuple)) else [r] for r in (test.get("rows") or test.get("Rows") or [])]
+    if not rows:
+        return None
+    fields = [str(r[0]).strip() if r else "" for r in rows]
+    if fields[0] == "_id_" and all(_FIELD.match(f) for f in fields if f):
+        # Vertical: column 2 is the description, cases start at column 3
+        width = max(len(r) for r in rows)
+        return {f: [str(r[i]) if i < len(r) and r[i] is not None else "" for i in range(2, width)] for f, r in zip(fields, rows) if f}
+    header = [str(c).strip() for c in rows[0]]
+    if all(_FIELD.match(h) for h in header if h):
+        body = rows[1:]
+        if body and str(body[0][0]).strip().lower() in ("id", "test id", "#", "case"):
+            body = body[1:]
+        return {h: [str(r[i]) if i < len(r) and r[i] is not None else "" for r in body] for i, h in enumerate(header) if h}
+    return None
+
+
+class RuleEvaluator:
+    """Runs the generated Tests sheet against the generated Rules sheet (datatypes from `openl_datatypes`)."""
+
+    def __init__(self, datatypes: List[Datatype]):
+        self.field_types = {
+            d.name: {f.name: f.type for f in d.fields}
+            for d in datatypes
+        }
+        self.field_types.setdefault("RuleResult", {"ruleId": "String", "status": "String", "message": "String"})
+
+    def _environment(self, compiled: CompiledTable, cases: Dict[str, List[str]], n_cases: int) -> Dict[str, Any]:
+        env: Dict[str, Any] = {}
+        for field, values in cases.items():
+            if field.startswith("_"):
+                continue
+            env[field] = _typed_array(values, compiled.path_type(field)).reshape(1, -1)
+        # Fields the rule reads but the test leaves out are null
+        for ast, *_rest in compiled.conditions:
+            for name in _names(ast):
+                if name not in env and name.split(".")[0] in compiled.signature:
+                    env[name] = _typed_array([""] * n_cases, compiled.path_type(name)).reshape(1, -1)
+        return env
+
+    def evaluate(self, rules_tables: List[dict], test_tables: List[dict]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        compiled: Dict[str, CompiledTable] = {}
+        unsupported: List[Dict[str, str]] = []
+        for table in rules_tables:
+            if not isinstance(table, dict):
+                continue
+            try:
+                c = CompiledTable(table, self.field_types)
+                compiled[c.name] = c
+            except Unsupported as e:
+                unsupported.append({"table": table_header(table), "reason": str(e)})
+            except Exception as e:
+                # Anything the evaluator does not model (e.g. "TBD" compared to a Date) skips the table
+                unsupported.append({"table": table_header(table), "reason": f"{type(e).__name__}: {e}"})
+
+        # Batch every case that targets the same rule, across test tables
+        batches: Dict[str, List[Tuple[str, Dict[str, List[str]]]]] = {}
+        for test in test_tables:
+            if not isinstance(test, dict):
+                continue
+            match = _TEST_HEADER.match(table_header(test))
+            cases = _test_cases(test)
+            if not match or cases is None:
+                unsupported.append({"table": table_header(test), "reason": "unrecognised test table layout"})
+                continue
+            batches.setdefault(match.group(1), []).append((table_header(test), cases))
+
+        report: Dict[str, Any] = {"rules": len(compiled), "cases": 0, "passed": 0, "failed": [], "unsupported": unsupported}
+        for rule_name, tests in batches.items():
+            target = compiled.get(rule_name)
+            if target is None:
+                if not any(u["table"].split("(")[0].split()[-1] == rule_name for u in unsupported):
+                    unsupported.append({"table": rule_name, "reason": "test targets a rule that is not in the Rules sheet"})
+                continue
+            fields = sorted({f for _h, cases in tests for f in cases})
+            merged = {f: [v for _h, cases in tests for v in cases.get(f, [""] * len(next(iter(cases.values()))))] for f in fields}
+            owners = [(h, i) for h, cases in tests for i in range(len(next(iter(cases.values()))))]
+            n_cases = len(owners)
+            if n_cases == 0:
+                continue
+            try:
+                fired = target.fire(self._environment(target, merged, n_cases), n_cases)
+            except Unsupported as e:
+                unsupported.append({"table": rule_name, "reason": str(e)})
+                continue
+            except Exception as e:
+                unsupported.append({"table": rule_name, "reason": f"{type(e).__name__}: {e}"})
+                continue
+
+            for n, (test_header, i) in enumerate(owners):
+                actual = target.results[fired[n]] if fired[n] >= 0 else None
+                expected = {f: _clean(merged[f][n]) for f in ("_res_.status", "_res_.message", "_res_.ruleId", "_res_") if f in merged}
+                observed = {}
+                if actual is not None and len(actual) == 3:
+                    observed = {"_res_.ruleId": actual[0], "_res_.status": actual[1], "_res_.message": actual[2]}
+                elif actual is not None:
+                    observed = {"_res_": actual[0]}
+                mismatches = {f: {"expected": v, "actual": observed.get(f)} for f, v in expected.items() if v != "" and observed.get(f) != v}
+                report["cases"] += 1
+                if mismatches:
+                    case_id = _clean(merged.get("_id_", [""] * n_cases)[n]) or f"#{i + 1}"
+                    report["failed"].append({
+                        "test": test_header, "case": case_id,
+                        "fired_row": int(fired[n]) + 1 if fired[n] >= 0 else None,
+                        "mismatches": mismatches,
+                    })
+                else:
+                    report["passed"] += 1
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+
+
+def evaluate_structure(structure: Dict[str, Any], datatypes: List[Datatype]) -> Dict[str, Any]:
+    """Quality report for a generated workbook structure (Rules sheet vs Tests sheet)."""
+    sheets = {s.get("name"): s.get("tables", []) for s in structure.get("sheets", []) if isinstance(s, dict)}
+    return RuleEvaluator(datatypes).evaluate(sheets.get("Rules", []), sheets.get("Tests", []))
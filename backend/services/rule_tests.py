@@ -0,0 +1,467 @@
+import re
+import datetime
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import Datatype
+from services.vocabulary import normalize_type
+from services.workbook_writer import table_header
+
+# Local Phase D: OpenL Test tables are derived from the decision table rows themselves.
+# Every rule row becomes a case whose inputs satisfy that row's conditions, and every
+# condition column contributes a boundary case just across its threshold. Expectations
+# come from evaluating the table with first-match semantics, so data and results agree.
+
+MAX_CASES_PER_TABLE = 20
+
+_OPS = ("==", "!=", ">=", "<=", ">", "<")
+_NEGATE = {">=": "<", "<": ">=", ">": "<=", "<=": ">", "==": "!=", "!=": "=="}
+_FLIP = {">=": "<=", "<=": ">=", ">": "<", "<": ">", "==": "==", "!=": "!="}
+_IDENT = r'[A-Za-z_]\w*'
+_TERM = re.compile(rf'^({_IDENT}(?:\.{_IDENT})*)\s*(?:([+-])\s*(\d+(?:\.\d+)?))?$')
+_NUMBER = re.compile(r'^-?\d+(?:\.\d+)?$')
+_RULE_RESULT = re.compile(r'new\s+RuleResult\s*\(\s*"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\s*\)')
+_HEADER = re.compile(r'^\s*Rules\s+\S+\s+(\w+)\s*\((.*)\)\s*$')
+_DEFAULT_VALUES = {"Date": datetime.date(2024, 1, 1), "Integer": 100, "Double": 100.0, "Boolean": True, "String": "Sample"}
+
+_UNKNOWN = object()
+
+
+def _strip_parens(expr: str) -> str:
+    expr = expr.strip()
+    while expr.startswith("(") and expr.endswith(")"):
+        depth = 0
+        for i, ch in enumerate(expr):
+            depth += ch == "("
+            depth -= ch == ")"
+            if depth == 0 and i < len(expr) - 1:
+                return expr
+        expr = expr[1:-1].strip()
+    return expr
+
+
+def _split_comparison(expr: str) -> Optional[Tuple[str, str, str]]:
+    """Split on the first comparison operator outside parentheses and string literals."""
+    depth, quoted, i = 0, False, 0
+    while i < len(expr):
+        ch = expr[i]
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted:
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            elif depth == 0:
+                for op in _OPS:
+                    if expr.startswith(op, i):
+                        return expr[:i].strip(), op, expr[i + len(op):].strip()
+        i += 1
+    return None
+
+
+def _parse_value(text: Any, type_hint: Optional[str] = None) -> Any:
+    """Cell text -> typed value; None for blanks and anything that does not fit the type."""
+    if text is None:
+        return None
+    raw = str(text).strip()
+    if raw.startswith('"') and raw.endswith('"') and len(raw) >= 2:
+        raw = raw[1:-1]
+    if raw == "":
+        return None
+    lowered = raw.lower()
+    if type_hint == "Boolean" or (type_hint is None and lowered in ("true", "false")):
+        return {"true": True, "false": False}.get(lowered)
+    if type_hint == "Date" or (type_hint is None and re.match(r'^\d{4}-\d{2}-\d{2}$', raw)):
+        for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+            try:
+                return datetime.datetime.strptime(raw, fmt).date()
+            except ValueError:
+                continue
+        return None
+    if type_hint in ("Integer", "Double") or (type_hint is None and _NUMBER.match(raw)):
+        if not _NUMBER.match(raw):
+            return None
+        if type_hint == "Integer" or (type_hint is None and "." not in raw):
+            return int(float(raw))
+        return float(raw)
+    return raw
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _shift(value: Any, delta: float) -> Any:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, datetime.date):
+        return value + datetime.timedelta(days=delta)
+    if isinstance(value, (int, float)):
+        return value + (int(delta) if isinstance(value, int) and float(delta).is_integer() else delta)
+    return None
+
+
+def _different(value: Any) -> Any:
+    if isinstance(value, bool):
+        return not value
+    if isinstance(value, (int, float, datetime.date)):
+        return _shift(value, 1)
+    if isinstance(value, str):
+        return "Other" if value != "Other" else "Another"
+    return None
+
+
+@dataclass
+class Term:
+    kind: str  # "path", "param" or "literal"
+    value: Any
+    offset: float = 0
+
+
+@dataclass
+class Compare:
+    left: Term  # always a path
+    op: str
+    right: Term
+
+
+@dataclass
+class Condition:
+    compare: Compare
+    source: str  # "operand": the cell is the right-hand value; "bool": the cell is the expected truth
+    param_type: Optional[str]
+    negated: bool = False
+
+
+class DecisionTableModel:
+    """Parsed view of a generated `Rules` table: signature, condition columns, rule rows."""
+
+    def __init__(self, table: dict, field_types: Dict[str, Dict[str, str]]):
+        self.table = table
+        self.field_types = field_types
+        header = table_header(table)
+        match = _HEADER.match(header)
+        if not match:
+            raise ValueError(f"not a Rules table: {header}")
+        self.name = match.group(1)
+        self.signature: Dict[str, str] = {}
+        for param in [p.strip() for p in match.group(2).split(",") if p.strip()]:
+            parts = param.split()
+            if len(parts) == 2:
+                self.signature[parts[1]] = normalize_type(parts[0])
+
+        rows = [list(r) if isinstance(r, (list, tuple)) else [r] for r in (table.get("rows") or table.get("Rows") or [])]
+        if len(rows) < 5:
+            raise ValueError(f"{self.name}: no rule rows")
+        codes, expressions, declarations, titles = rows[0], rows[1], rows[2], rows[3]
+        self.rule_rows = rows[4:]
+
+        def cell(row, i):
+            return str(row[i]).strip() if i < len(row) and row[i] is not None else ""
+
+        self.conditions: List[Tuple[int, Optional[Condition], str]] = []
+        self.result_col: Optional[int] = None
+        for i, code in enumerate(codes):
+            code = str(code).strip().upper()
+            if re.match(r'^C\d+$', code):
+                decl = cell(declarations, i).split()
+                param_type = normalize_type(decl[0]) if len(decl) == 2 else None
+                param_name = decl[1] if len(decl) == 2 else None
+                self.conditions.append((i, self._parse_condition(cell(expressions, i), param_type, param_name), cell(titles, i)))
+            elif re.match(r'^RET\d*$', code) and self.result_col is None:
+                self.result_col = i
+        if self.result_col is None:
+            raise ValueError(f"{self.name}: no RET column")
+        self.cell = cell
+
+    # --- Expression parsing ----------------------------------------------------
+
+    def _parse_term(self, text: str, param_name: Optional[str]) -> Optional[Term]:
+        text = _strip_parens(text)
+        if text.startswith('"') and text.endswith('"'):
+            return Term("literal", text[1:-1])
+        if text.lower() in ("true", "false"):
+            return Term("literal", text.lower() == "true")
+        if _NUMBER.match(text):
+            return Term("literal", _parse_value(text))
+        match = _TERM.match(text)
+        if not match:
+            return None
+        name, sign, amount = match.groups()
+        offset = (float(amount) if "." in amount else int(amount)) * (-1 if sign == "-" else 1) if amount else 0
+        if name == param_name:
+            return Term("param", name, offset)
+        if name.split(".")[0] in self.signature:
+            return Term("path", name, offset)
+        return None
+
+    def _parse_compare(self, text: str, param_name: Optional[str]) -> Optional[Compare]:
+        text = _strip_parens(text)
+        if text.startswith("!") and not text.startswith("!="):
+            inner = self._parse_term(text[1:], None)
+            return Compare(inner, "==", Term("literal", False)) if inner and inner.kind == "path" else None
+        split = _split_comparison(text)
+        if not split:
+            term = self._parse_term(text, None)
+            return Compare(term, "==", Term("literal", True)) if term and term.kind == "path" else None
+        lhs, op, rhs = split
+        left, right = self._parse_term(lhs, param_name), self._parse_term(rhs, param_name)
+        if not left or not right:
+            return None
+        if left.kind != "path" and right.kind == "path":
+            left, right, op = right, left, _FLIP[op]
+        return Compare(left, op, right) if left.kind == "path" else None
+
+    def _parse_condition(self, expr: str, param_type: Optional[str], param_name: Optional[str]) -> Optional[Condition]:
+        if not expr:
+            return None
+        expr = _strip_parens(expr)
+        if param_type == "Boolean":
+            # `(<inner>) == checkX`, or a bare boolean expression matched implicitly
+            split = _split_comparison(expr)
+            inner, negated = expr, False
+            if split and split[1] in ("==", "!=") and param_name in (_strip_parens(split[0]), _strip_parens(split[2])):
+                inner = split[0] if _strip_parens(split[2]) == param_name else split[2]
+                negated = split[1] == "!="
+            compare = self._parse_compare(inner, None)
+            return Condition(compare, "bool", param_type, negated) if compare else None
+        compare = self._parse_compare(expr, param_name)
+        if compare and compare.right.kind == "param":
+            return Condition(compare, "operand", param_type)
+        return None
+
+    # --- Typing ----------------------------------------------------------------
+
+    def path_type(self, path: str) -> Optional[str]:
+        parts = path.split(".")
+        current = self.signature.get(parts[0])
+        for part in parts[1:]:
+            if current is None:
+                return None
+            current = self.field_types.get(current.rstrip("[]"), {}).get(part)
+        return current
+
+    # --- Evaluation / solving --------------------------------------------------
+
+    def _operand(self, cond: Condition, cell_text: str, inputs: Dict[str, Any]) -> Any:
+        right = cond.compare.right
+        if right.kind == "param":
+            hint = cond.param_type or self.path_type(cond.compare.left.value)
+            value = _parse_value(cell_text, hint)
+        elif right.kind == "literal":
+            value = right.value
+        else:
+            value = inputs.get(right.value, _UNKNOWN)
+            if value is _UNKNOWN:
+                return _UNKNOWN
+        if value is None:
+            return None
+        return _shift(value, right.offset) if right.offset else value
+
+    def _truth(self, cond: Condition, cell_text: str) -> Optional[bool]:
+        if cond.source == "operand":
+            return True
+        truth = _parse_value(cell_text, "Boolean")
+        return None if truth is None else truth != cond.negated
+
+    def holds(self, cond: Condition, cell_text: str, inputs: Dict[str, Any]) -> Any:
+        """True/False, or _UNKNOWN when an input is still unassigned or the values do not compare."""
+        truth = self._truth(cond, cell_text)
+        left = inputs.get(cond.compare.left.value, _UNKNOWN)
+        operand = self._operand(cond, cell_text, inputs)
+        if truth is None or left is _UNKNOWN or operand is _UNKNOWN or operand is None or left is None:
+            return _UNKNOWN
+        if cond.compare.left.offset:
+            left = _shift(left, cond.compare.left.offset)
+        try:
+            result = {
+                "==": left == operand, "!=": left != operand,
+                ">=": left >= operand, "<=": left <= operand,
+                ">": left > operand, "<": left < operand,
+            }[cond.compare.op]
+        except TypeError:
+            return _UNKNOWN
+        return result == truth
+
+    def assign(self, cond: Condition, cell_text: str, inputs: Dict[str, Any], want: bool = True) -> bool:
+        """Assign the condition's input path so that it evaluates to `want`."""
+        truth = self._truth(cond, cell_text)
+        if truth is None:
+            return False
+        compare = cond.compare
+        if compare.right.kind == "path" and compare.right.value not in inputs:
+            base = _DEFAULT_VALUES.get(self.path_type(compare.right.value) or self.path_type(compare.left.value) or "")
+            if base is None:
+                return False
+            inputs[compare.right.value] = base
+        operand = self._operand(cond, cell_text, inputs)
+        if operand is None or operand is _UNKNOWN:
+            return False
+        if compare.left.offset:
+            operand = _shift(operand, -compare.left.offset)
+            if operand is None:
+                return False
+        op = compare.op if truth == want else _NEGATE[compare.op]
+        value = {
+            "==": operand, ">=": operand, "<=": operand,
+            ">": _shift(operand, 1), "<": _shift(operand, -1), "!=": _different(operand),
+        }[op]
+        if value is None:
+            return False
+        inputs[compare.left.value] = value
+        return True
+
+    def first_match(self, inputs: Dict[str, Any]) -> Optional[int]:
+        """
+        Index of the rule row OpenL would fire for `inputs`. Inputs an earlier row needs but
+        the case leaves open are filled so that row does not fire. None when undecidable.
+        """
+        for _ in range(len(self.rule_rows) * max(len(self.conditions), 1) + 1):
+            retry = False
+            for index, row in enumerate(self.rule_rows):
+                outcome = True
+                for col, cond, _title in self.conditions:
+                    cell_text = self.cell(row, col)
+                    if not cell_text:
+                        continue
+                    if cond is None:
+                        return None
+                    held = self.holds(cond, cell_text, inputs)
+                    if held is _UNKNOWN:
+                        if cond.compare.left.value in inputs or not self.assign(cond, cell_text, inputs, want=False):
+                            return None
+                        retry = True
+                        break
+                    if not held:
+                        outcome = False
+                        break
+                if retry:
+                    break
+                if outcome:
+                    return index
+            if not retry:
+                return None
+        return None
+
+    def solve_row(self, index: int) -> Optional[Dict[str, Any]]:
+        """Inputs satisfying every non-blank condition of rule row `index`."""
+        inputs: Dict[str, Any] = {}
+        row = self.rule_rows[index]
+        for col, cond, _title in self.conditions:
+            cell_text = self.cell(row, col)
+            if not cell_text:
+                continue
+            if cond is None:
+                return None
+            if self.holds(cond, cell_text, inputs) is True:
+                continue
+            if not self.assign(cond, cell_text, inputs):
+                return None
+        for col, cond, _title in self.conditions:
+            cell_text = self.cell(row, col)
+            if cell_text and self.holds(cond, cell_text, inputs) is not True:
+                return None
+        return inputs
+
+    def expected(self, index: int) -> Optional[Tuple[str, ...]]:
+        ret = self.cell(self.rule_rows[index], self.result_col)
+        match = _RULE_RESULT.search(ret)
+        if match:
+            return match.group(2), match.group(3)
+        if ret and not ret.startswith("="):
+            return (_format_value(_parse_value(ret)),)
+        return None
+
+
+class RuleTestSynthesizer:
+    """Builds `Test <Rule> <Rule>Test` tables for generated decision tables without an LLM (datatypes from `openl_datatypes`)."""
+
+    def __init__(self, datatypes: List[Datatype], max_cases: int = MAX_CASES_PER_TABLE):
+        self.max_cases = max_cases
+        self.field_types = {
+            d.name: {f.name: f.type for f in d.fields}
+            for d in datatypes
+        }
+
+    def cases(self, model: DecisionTableModel) -> List[Tuple[str, Dict[str, Any], int]]:
+        """(description, inputs, fired row) per case: every rule row, then boundary flips per condition."""
+        found: List[Tuple[str, Dict[str, Any], int]] = []
+        seen = set()
+
+        def add(description, inputs):
+            fired = model.first_match(inputs)
+            if fired is None or model.expected(fired) is None:
+                return
+            signature = tuple(sorted((k, _format_value(v)) for k, v in inputs.items()))
+            if signature in seen:
+                return
+            seen.add(signature)
+            found.append((description, inputs, fired))
+
+        solved = []
+        for index in range(len(model.rule_rows)):
+            inputs = model.solve_row(index)
+            if inputs is not None:
+                solved.append((index, inputs))
+                add(f"Rule row {index + 1}", dict(inputs))
+        for index, inputs in solved:
+            row = model.rule_rows[index]
+            for col, cond, title in model.conditions:
+                cell_text = model.cell(row, col)
+                if not cell_text or cond is None:
+                    continue
+                flipped = dict(inputs)
+                if model.assign(cond, cell_text, flipped, want=False):
+                    add(f"Rule row {index + 1}, {title or cond.compare.left.value} not met", flipped)
+        return found[:self.max_cases]
+
+    def synthesize_table(self, table: dict) -> Optional[dict]:
+        try:
+            model = DecisionTableModel(table, self.field_types)
+        except ValueError:
+            return None
+        cases = self.cases(model)
+        if not cases:
+            return None
+
+        titles = {}
+        for _col, cond, title in model.conditions:
+            if cond is not None:
+                titles.setdefault(cond.compare.left.value, title)
+                if cond.compare.right.kind == "path":
+                    titles.setdefault(cond.compare.right.value, "")
+        paths = [p for p in titles if any(p in inputs for _d, inputs, _f in cases)]
+
+        rows = [["_id_", "ID"] + [f"T{i + 1}" for i in range(len(cases))]]
+        rows.append(["_description_", "Description"] + [d for d, _i, _f in cases])
+        for path in paths:
+            rows.append([path, titles[path] or path] + [_format_value(inputs.get(path)) for _d, inputs, _f in cases])
+        expectations = [model.expected(fired) for _d, _i, fired in cases]
+        if all(len(e) == 2 for e in expectations):
+            rows.append(["_res_.status", "Expected Status"] + [e[0] for e in expectations])
+            rows.append(["_res_.message", "Expected Message"] + [e[1] for e in expectations])
+        else:
+            rows.append(["_res_", "Expected Result"] + [e[0] for e in expectations])
+        return {"header": f"Test {model.name} {model.name}Test", "rows": rows}
+
+    def synthesize(self, tables: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """Returns (test tables, decision tables no test could be derived for)."""
+        tests, unsupported = [], []
+        for table in tables:
+            if not isinstance(table, dict):
+                continue
+            test = self.synthesize_table(table)
+            if test is None:
+                unsupported.append(table)
+            else:
+                tests.append(test)
+        return tests, unsupported
@@ -0,0 +1,201 @@
+import os
+import sys
+import copy
+import json
+import uuid
+import queue
+import atexit
+import random
+import logging
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from services.tracing import current_root, metrics
+
+# Application logging goes through one bounded in-memory queue; a background listener thread
+# formats and writes the records, so a request thread never waits on stdout. Every record
+# carries the request ID (X-Request-ID, echoed back on the response).
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" for humans, "json" (one object per line) for log shippers
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Prompts, LLM results and other payloads are cut to this many characters...
+LOG_PAYLOAD_CHARS = int(os.getenv("LOG_PAYLOAD_CHARS", "500"))
+# ...except in this fraction of requests, which log them in full (0 = never, 1 = always)
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.0"))
+# Records beyond this backlog are dropped (and counted) rather than blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+LOG_DROPPED = metrics.counter("openl_log_records_dropped_total", "Log records dropped because the log queue was full")
+
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("openl_request_id", default="")
+# Whether the current request logs payloads in full; None outside a request (decided per payload)
+_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("openl_log_sampled", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and goes into JSON output
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def request_id() -> str:
+    return _request_id.get()
+
+
+def bind_request_id(value: str, sampled: Optional[bool] = None):
+    """Set the request ID (and payload sampling decision) for the current context; returns reset tokens."""
+    return _request_id.set(value), _sampled.set(sampled)
+
+
+def reset_request_id(tokens):
+    _request_id.reset(tokens[0])
+    _sampled.reset(tokens[1])
+
+
+def _full_payload() -> bool:
+    sampled = _sampled.get()
+    if sampled is None:
+        return LOG_PAYLOAD_SAMPLE_RATE > 0 and random.random() < LOG_PAYLOAD_SAMPLE_RATE
+    return sampled
+
+
+def truncate(text: Any, limit: Optional[int] = None) -> str:
+    text = text if isinstance(text, str) else str(text)
+    limit = LOG_PAYLOAD_CHARS if limit is None else limit
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def log_payload(logger: logging.Logger, label: str, payload: Any, level: int = logging.DEBUG, **fields):
+    """
+    Log a large payload (prompt, LLM output, encoded input) truncated to LOG_PAYLOAD_CHARS,
+    or in full when the request is sampled. Nothing is formatted if `level` is disabled.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    text = payload if isinstance(payload, str) else str(payload)
+    shown = text if _full_payload() else truncate(text)
+    logger.log(level, "%s (%d chars): %s", label, len(text), shown,
+               extra={"payload_chars": len(text), "payload_truncated": len(shown) != len(text), **fields})
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request ID; runs on the calling thread, where the context is live."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = _request_id.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        data.update({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of raising or waiting.
+    Formatting is left to the listener thread; only the message text is resolved here."""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            # Tracebacks reference live frames; render them before the record changes threads
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def _formatter(fmt: str) -> logging.Formatter:
+    if fmt == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None, queue_size: int = LOG_QUEUE_SIZE) -> QueueListener:
+    """Route the root logger through the queue. Safe to call again (replaces the previous setup)."""
+    global _listener, _handler
+    shutdown_logging()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(_formatter(fmt))
+    _handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    _handler.addFilter(RequestContextFilter())
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level)
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Detach the queue and stop the listener once it has written everything already queued."""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def _valid_request_id(value: str) -> bool:
+    return 0 < len(value) <= 64 and all(c.isalnum() or c in "-_.:" for c in value)
+
+
+class RequestIdMiddleware:
+    """ASGI middleware: takes X-Request-ID from the caller (or generates one), binds it for
+    logging, tags the trace's root span with it and echoes it on the response."""
+
+    def __init__(self, app, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope.get("headers") or []).get(b"x-request-id", b"").decode("latin-1").strip()
+        rid = incoming if _valid_request_id(incoming) else uuid.uuid4().hex[:16]
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        root = current_root()
+        if root is not None:
+            root.set(request_id=rid)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-request-id", rid.encode())]}
+            await send(message)
+
+        tokens = bind_request_id(rid, sampled)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            reset_request_id(tokens)
@@ -0,0 +1,189 @@
+import os
+import json
+import re
+from typing import Any, List, Optional, Type
+
+from pydantic import BaseModel
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import Generation
+
+from services.tracing import span as trace_span
+
+# Pass a JSON schema to Ollama's `format` so the model can only emit valid JSON of that shape.
+# The tolerant parser below stays in place for models/servers that ignore the schema.
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "true").lower() == "true"
+
+TABLE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "header": {"type": "string"},
+        "rows": {"type": "array", "items": {"type": "array", "items": {"type": "string"}}},
+    },
+    "required": ["header", "rows"],
+}
+TABLES_SCHEMA = {
+    "type": "object",
+    "properties": {"tables": {"type": "array", "items": TABLE_SCHEMA}},
+    "required": ["tables"],
+}
+
+
+def nested_string_map_schema(key: str) -> dict:
+    """`{ key: { "<Name>": { "<field>": "<value>" } } }`, e.g. datatype defaults or test case names."""
+    return {
+        "type": "object",
+        "properties": {
+            key: {"type": "object", "additionalProperties": {"type": "object", "additionalProperties": {"type": "string"}}},
+        },
+        "required": [key],
+    }
+
+
+def model_schema(model: Type[BaseModel]) -> dict:
+    return model.model_json_schema()
+
+
+def structured(llm, schema: Optional[dict]):
+    """`llm` constrained to `schema` (Ollama structured outputs), or unchanged when disabled."""
+    if not STRUCTURED_OUTPUT or schema is None:
+        return llm
+    return llm.bind(format=schema)
+
+
+# --- Tolerant JSON parsing ----------------------------------------------------
+# Every step is a single forward pass over the text, so parsing stays linear in output size
+# (the previous greedy `\{.*\}|\[.*\]` regex backtracks and often grabs the wrong span).
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_OPEN = re.compile(r'[\[{]')
+_DECODER = json.JSONDecoder()
+# A string literal (no closing quote = cut off at the end of the text) or a bracket
+_SIGNIFICANT = re.compile(r'"(?:[^"\\]|\\.)*(?P<close>")?|[{}\[\]]', re.DOTALL)
+
+
+def _balanced_span(text: str, start: int):
+    """
+    Scan from the bracket at `start`. Returns (end, open_stack, in_string): `end` is the index
+    after the matching close bracket, or None when the text ends first (truncated output).
+    Strings are consumed whole by the regex, so only brackets are visited in Python.
+    """
+    stack: List[str] = []
+    for token in _SIGNIFICANT.finditer(text, start):
+        ch = token.group(0)[0]
+        if ch == '"':
+            if token.group("close") is None:
+                return None, stack, True
+            continue
+        if ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        else:
+            if not stack or stack[-1] != ch:
+                return token.start(), stack, False  # mismatched close; let the repair pass deal with it
+            stack.pop()
+            if not stack:
+                return token.end(), stack, False
+    return None, stack, False
+
+
+def _repair(span: str) -> str:
+    """Drop trailing commas and map Python literals (True/False/None) outside strings."""
+    out: List[str] = []
+    in_string = escaped = False
+    i = 0
+    while i < len(span):
+        ch = span[i]
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "}]":
+            # Remove a trailing comma (and whitespace) before the close bracket
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j:]
+            out.append(ch)
+        elif ch.isalpha():
+            j = i
+            while j < len(span) and (span[j].isalnum() or span[j] == "_"):
+                j += 1
+            word = span[i:j]
+            out.append(_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _close_truncated(span: str, stack: List[str], in_string: bool) -> str:
+    """Best effort for output cut off mid-document: close the string and open brackets."""
+    if in_string:
+        span += '"'
+    span = span.rstrip()
+    while span and span[-1] in ",:":
+        span = span[:-1].rstrip()
+    return span + "".join(reversed(stack))
+
+
+def parse_json(text: str) -> Any:
+    """
+    Parse LLM output as JSON: the whole text, else the first balanced {...} / [...] span
+    (markdown fences and prose around it are ignored), repaired if needed. Raises ValueError.
+    """
+    with trace_span("parse.json", chars=len(text)):
+        return _parse_json(text)
+
+
+def _parse_json(text: str) -> Any:
+    stripped = text.strip()
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        pass
+
+    pos = 0
+    while True:
+        match = _OPEN.search(text, pos)
+        if not match:
+            break
+        start = match.start()
+        try:
+            # C-speed path: a well-formed document followed by prose / a closing fence
+            return _DECODER.raw_decode(text, start)[0]
+        except ValueError:
+            pass
+        end, stack, in_string = _balanced_span(text, start)
+        span = text[start:end] if end is not None else _close_truncated(text[start:], stack, in_string)
+        for fix in (None, _repair):
+            try:
+                return json.loads(fix(span) if fix else span)
+            except ValueError:
+                continue
+        if end is None:
+            break
+        pos = end
+    raise ValueError(f"no JSON document found in LLM output ({len(text)} chars)")
+
+
+class TolerantJsonOutputParser(JsonOutputParser):
+    """JsonOutputParser that uses the linear-time tolerant parser instead of markdown/regex recovery."""
+
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> Any:
+        text = result[0].text
+        try:
+            return parse_json(text)
+        except ValueError as e:
+            if partial:
+                return None
+            raise OutputParserException(f"Invalid json output: {text[:200]}", llm_output=text) from e
@@ -0,0 +1,226 @@
+import re
+from typing import Dict, List, Optional, Set
+
+from models import Datatype
+from services.workbook_writer import table_header
+
+# Structural checks for generated OpenL tables. Cheap enough to run on every table, so
+# only the tables that fail are sent back to the LLM (with these errors attached).
+
+OPENL_BUILTIN_TYPES = {
+    "String", "Integer", "Double", "Boolean", "Date", "Long", "BigDecimal", "BigInteger",
+    "Float", "Short", "Object", "int", "double", "boolean", "long", "float", "RuleResult",
+}
+FORBIDDEN_CALLS = ("Dates.diff", "Dates.add", "dateAdd", "addDays")
+WILDCARD_WORDS = {"any", "*", "-", "null"}
+RULE_STATUSES = {"Eligible", "Not-Eligible"}
+
+_IDENT = re.compile(r'^[A-Za-z_]\w*$')
+_RULES_HEADER = re.compile(r'^(Rules|SmartRules|SimpleRules)\s+(\S+)\s+(\w+)\s*\((.*)\)$')
+_SPREADSHEET_HEADER = re.compile(r'^Spreadsheet\s+(\S+)\s+(\w+)\s*\((.*)\)$')
+_DATATYPE_HEADER = re.compile(r'^Datatype\s+(\w+)$')
+_TEST_HEADER = re.compile(r'^Test\s+(\w+)\s+(\w+)$')
+_MARKER = re.compile(r'^(C|HC|MC|RET|CRET|A)\d*$')
+_PATH = re.compile(r'(?<![\w."])([A-Za-z_]\w*)((?:\.[A-Za-z_]\w*)+)')
+_RULE_RESULT = re.compile(r'new\s+RuleResult\s*\(\s*"[^"]*"\s*,\s*"([^"]*)"')
+
+
+def _strip_strings(text: str) -> str:
+    return re.sub(r'"[^"]*"', '""', text)
+
+
+class TableValidator:
+    """
+    Validates header grammar, row shape, column markers and datatype/field references.
+    `datatypes` are expected as `openl_datatypes` returns them (camelCase fields, OpenL types).
+    """
+
+    def __init__(self, datatypes: List[Datatype], known_rules: Optional[Set[str]] = None):
+        self.fields: Dict[str, Dict[str, str]] = {
+            d.name: {f.name: f.type for f in d.fields}
+            for d in datatypes
+        }
+        self.fields.setdefault("RuleResult", {"ruleId": "String", "status": "String", "message": "String"})
+        self.known_rules = known_rules
+
+    def _type_error(self, type_name: str) -> Optional[str]:
+        base = type_name[:-2] if type_name.endswith("[]") else type_name
+        if base in OPENL_BUILTIN_TYPES or base in self.fields:
+            return None
+        if re.match(r'^(List|Array)\s*<', base):
+            return f"use `Type[]` instead of `{type_name}`"
+        return f"unknown type `{type_name}`"
+
+    def _signature(self, params: str, errors: List[str]) -> Dict[str, str]:
+        signature: Dict[str, str] = {}
+        for param in [p.strip() for p in params.split(",") if p.strip()]:
+            parts = param.split()
+            if len(parts) != 2 or not _IDENT.match(parts[1]):
+                errors.append(f"header parameter `{param}` must be `<Type> <name>`")
+                continue
+            type_error = self._type_error(parts[0])
+            if type_error:
+                errors.append(f"header parameter `{param}`: {type_error}")
+            if parts[1] in signature:
+                errors.append(f"header parameter `{parts[1]}` is declared twice")
+            signature[parts[1]] = parts[0]
+        return signature
+
+    def _reference_errors(self, expression: str, signature: Dict[str, str]) -> List[str]:
+        errors = []
+        for root, tail in _PATH.findall(_strip_strings(expression)):
+            if root not in signature:
+                continue
+            current = signature[root].rstrip("[]")
+            for part in tail.strip(".").split("."):
+                known = self.fields.get(current)
+                if known is None:
+                    break
+                if part not in known:
+                    errors.append(f"`{root}{tail}`: `{current}` has no field `{part}`")
+                    break
+                current = known[part].rstrip("[]")
+        return errors
+
+    @staticmethod
+    def _rows(table: dict, errors: List[str]) -> List[list]:
+        rows = table.get("rows") or table.get("Rows")
+        if not isinstance(rows, list) or not rows:
+            errors.append("table has no rows")
+            return []
+        if not all(isinstance(r, list) for r in rows):
+            errors.append("every row must be a JSON list of strings")
+            return []
+        return rows
+
+    def _validate_rules(self, match, rows: List[list], errors: List[str]):
+        kind, return_type, _name, params = match.groups()
+        type_error = self._type_error(return_type)
+        if type_error:
+            errors.append(f"return type: {type_error}")
+        signature = self._signature(params, errors)
+        if not rows:
+            return
+        width = len(rows[0])
+        for i, row in enumerate(rows):
+            if len(row) != width:
+                errors.append(f"row {i + 1} has {len(row)} cells, expected {width}")
+        if kind == "SmartRules":
+            return
+        if len(rows) < 5:
+            errors.append("a Rules table needs marker, expression, parameter, title rows and at least one rule row")
+            return
+
+        markers = [str(m).strip() for m in rows[0]]
+        bad = [m for m in markers if not _MARKER.match(m)]
+        if bad:
+            errors.append(f"row 1 has invalid column markers {bad} (use C1.., RET1)")
+        conditions = [i for i, m in enumerate(markers) if re.match(r'^(C|HC|MC)\d*$', m)]
+        returns = [i for i, m in enumerate(markers) if re.match(r'^C?RET\d*$', m)]
+        if not conditions:
+            errors.append("no condition column (C1)")
+        if not returns:
+            errors.append("no return column (RET1)")
+
+        declared = set()
+        for i in conditions:
+            expression = str(rows[1][i]) if i < len(rows[1]) else ""
+            declaration = str(rows[2][i]).split() if i < len(rows[2]) else []
+            label = markers[i]
+            if not expression.strip():
+                errors.append(f"{label}: empty condition expression")
+            # Text inside string literals is data, not syntax
+            code = _strip_strings(expression)
+            if "'" in code:
+                errors.append(f"{label}: use double quotes, not single quotes")
+            if re.search(r'\b(OR|AND)\b', code):
+                errors.append(f"{label}: use `||` / split `&&` into columns instead of OR/AND")
+            for call in FORBIDDEN_CALLS:
+                if call in code:
+                    errors.append(f"{label}: `{call}` does not exist in OpenL (use dateDif / date + days)")
+            errors.extend(f"{label}: {e}" for e in self._reference_errors(expression, signature))
+            if len(declaration) != 2 or not _IDENT.match(declaration[1]):
+                errors.append(f"{label}: row 3 must declare `<Type> <name>`")
+                continue
+            type_error = self._type_error(declaration[0])
+            if type_error:
+                errors.append(f"{label}: {type_error}")
+            if declaration[1] in signature:
+                errors.append(f"{label}: parameter `{declaration[1]}` collides with a header parameter")
+            if declaration[1] in declared:
+                errors.append(f"{label}: parameter `{declaration[1]}` declared twice")
+            declared.add(declaration[1])
+
+        for r, row in enumerate(rows[4:], start=5):
+            for i in conditions:
+                if i < len(row) and str(row[i]).strip().lower() in WILDCARD_WORDS:
+                    errors.append(f"row {r} {markers[i]}: use an empty cell for 'any', not `{row[i]}`")
+            if return_type == "RuleResult":
+                for i in returns:
+                    cell = str(row[i]).strip() if i < len(row) else ""
+                    if not cell.startswith("=") or "new RuleResult" not in cell:
+                        errors.append(f"row {r} {markers[i]}: must be `= new RuleResult(\"<id>\", \"<status>\", \"<message>\")`")
+                        continue
+                    status = _RULE_RESULT.search(cell)
+                    if status and status.group(1) not in RULE_STATUSES:
+                        errors.append(f"row {r} {markers[i]}: status `{status.group(1)}` must be Eligible or Not-Eligible")
+
+    def _validate_datatype(self, rows: List[list], errors: List[str]):
+        seen = set()
+        for i, row in enumerate(rows):
+            if len(row) not in (2, 3):
+                errors.append(f"row {i + 1} must be `[Type, fieldName]` (optionally a default)")
+                continue
+            type_error = self._type_error(str(row[0]).strip())
+            if type_error:
+                errors.append(f"row {i + 1}: {type_error}")
+            name = str(row[1]).strip()
+            if not re.match(r'^[a-z]\w*$', name):
+                errors.append(f"row {i + 1}: field name `{name}` must be camelCase")
+            if name in seen:
+                errors.append(f"row {i + 1}: duplicate field `{name}`")
+            seen.add(name)
+
+    def validate(self, table: dict) -> List[str]:
+        """Returns the list of problems with a generated table; empty when it is well-formed."""
+        if not isinstance(table, dict):
+            return ["table is not a JSON object"]
+        errors: List[str] = []
+        header = table_header(table).strip()
+        rows = self._rows(table, errors)
+
+        if header.startswith(("Rules ", "SmartRules ", "SimpleRules ")):
+            match = _RULES_HEADER.match(header)
+            if not match:
+                return errors + [f"header `{header}` must be `Rules <ReturnType> <Name>(<Type> <param>, ...)`"]
+            self._validate_rules(match, rows, errors)
+        elif header.startswith("Datatype"):
+            if not _DATATYPE_HEADER.match(header):
+                errors.append(f"header `{header}` must be `Datatype <Name>` (no return type)")
+            self._validate_datatype(rows, errors)
+        elif header.startswith("Spreadsheet"):
+            match = _SPREADSHEET_HEADER.match(header)
+            if not match:
+                errors.append(f"header `{header}` must be `Spreadsheet <ReturnType> <Name>(<params>)`")
+            else:
+                self._signature(match.group(3), errors)
+        elif header.startswith("Test"):
+            match = _TEST_HEADER.match(header)
+            if not match:
+                errors.append(f"header `{header}` must be `Test <RuleName> <RuleName>Test`")
+            elif self.known_rules is not None and match.group(1) not in self.known_rules:
+                errors.append(f"test targets unknown rule `{match.group(1)}`")
+            if rows and "_id_" not in [str(c).strip() for c in rows[0]] and not any(r and str(r[0]).strip() == "_id_" for r in rows):
+                errors.append("test table has no `_id_` row/column")
+        else:
+            errors.append(f"unrecognised table header `{header}`")
+        return errors
+
+    def invalid(self, tables: List[dict]) -> Dict[int, List[str]]:
+        """Index -> errors for every table that fails validation."""
+        report = {}
+        for i, table in enumerate(tables):
+            errors = self.validate(table)
+            if errors:
+                report[i] = errors
+        return report
@@ -0,0 +1,144 @@
+import os
+import math
+import hashlib
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Per-call context sizing. Ollama's default context window silently drops the *front* of a
+# prompt that does not fit, so every call gets an explicit num_ctx / num_predict, and the
+# low-priority prompt segments (RAG context, source text) are trimmed when over budget.
+
+# Upper bound of the context window the served models / GPU memory allow
+OLLAMA_MAX_CTX = int(os.getenv("OLLAMA_MAX_CTX", "32768"))
+# num_ctx is rounded up to a power of two starting here: Ollama reloads the model whenever
+# num_ctx changes, so a handful of buckets keeps reloads rare while memory tracks the prompt
+OLLAMA_MIN_CTX = int(os.getenv("OLLAMA_MIN_CTX", "4096"))
+# Conservative chars-per-token estimate for English policy text mixed with JSON/code
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", "3.2"))
+BUDGET_MARGIN_TOKENS = int(os.getenv("BUDGET_MARGIN_TOKENS", "256"))
+
+# Output caps per phase (override with NUM_PREDICT_<PHASE>, e.g. NUM_PREDICT_DECISION=6144)
+DEFAULT_NUM_PREDICT = {
+    "extraction": 4096,
+    "candidates": 4096,
+    "enrichment": 6144,
+    "vocabulary": 2048,
+    "defaults": 1024,
+    "decision": 4096,
+    "repair": 2048,
+    "tests": 4096,
+    "names": 1024,
+    "kraken": 4096,
+}
+NUM_PREDICT = {
+    phase: int(os.getenv(f"NUM_PREDICT_{phase.upper()}", str(default)))
+    for phase, default in DEFAULT_NUM_PREDICT.items()
+}
+
+TRUNCATION_MARKER = "\n[... truncated to fit the context window ...]"
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Keep the head of `text` within `max_tokens`, cutting at a paragraph/line boundary when close."""
+    if max_tokens <= 0:
+        return ""
+    max_chars = int(max_tokens * CHARS_PER_TOKEN) - len(TRUNCATION_MARKER)
+    if len(text) <= max_chars + len(TRUNCATION_MARKER):
+        return text
+    if max_chars <= 0:
+        return ""
+    head = text[:max_chars]
+    for boundary in ("\n\n", "\n"):
+        cut = head.rfind(boundary)
+        if cut >= max_chars * 0.8:
+            head = head[:cut]
+            break
+    return head + TRUNCATION_MARKER
+
+
+def _ctx_bucket(tokens: int, max_ctx: int) -> int:
+    size = OLLAMA_MIN_CTX
+    while size < tokens and size < max_ctx:
+        size *= 2
+    return min(size, max_ctx)
+
+
+@dataclass
+class BudgetPlan:
+    inputs: Dict[str, str]
+    num_ctx: int
+    num_predict: int
+    prompt_tokens: int
+    segments: Dict[str, int] = field(default_factory=dict)
+    trimmed: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    phase: str = ""
+    template_id: str = ""
+
+    def bind(self, llm):
+        """The runnable with this call's context size and output cap (plus phase/template labels for tracing)."""
+        return llm.bind(num_ctx=self.num_ctx, num_predict=self.num_predict, phase=self.phase, template=self.template_id)
+
+
+class TokenBudget:
+    """Sizes num_ctx/num_predict for a prompt and trims low-priority segments to fit."""
+
+    def __init__(self, max_ctx: int = OLLAMA_MAX_CTX, margin: int = BUDGET_MARGIN_TOKENS):
+        self.max_ctx = max_ctx
+        self.margin = margin
+
+    def plan(self, phase: str, template: str, inputs: Dict[str, str], priorities: Optional[Dict[str, int]] = None) -> BudgetPlan:
+        """
+        `priorities` maps trimmable input names to a priority (lower is trimmed first);
+        inputs not listed are required and never trimmed.
+        """
+        priorities = priorities or {}
+        num_predict = NUM_PREDICT.get(phase, 4096)
+        texts = {k: "" if v is None else str(v) for k, v in inputs.items()}
+        tokens = {k: estimate_tokens(v) for k, v in texts.items()}
+        # Placeholders are replaced by the inputs; what remains is the fixed instruction text
+        fixed = estimate_tokens(re.sub(r'\{(\w+)\}', "", template))
+        required = fixed + sum(t for k, t in tokens.items() if k not in priorities)
+
+        trimmed: Dict[str, Tuple[int, int]] = {}
+        available = self.max_ctx - num_predict - self.margin - required
+        if available < 0:
+            # Even the required segments do not fit: shrink the output cap before giving up
+            capped = max(512, num_predict + available)
+            logger.warning(f"[BUDGET] {phase}: required prompt ~{required} tok leaves no room for "
+                           f"num_predict={num_predict} in OLLAMA_MAX_CTX={self.max_ctx}; output capped at {capped}")
+            num_predict = capped
+            available = self.max_ctx - num_predict - self.margin - required
+            if available < 0:
+                logger.warning(f"[BUDGET] {phase}: required prompt ~{required} tok does not fit OLLAMA_MAX_CTX={self.max_ctx}; "
+                               f"Ollama will drop the start of the prompt")
+        for name in sorted(priorities, key=lambda n: -priorities[n]):
+            if name not in texts:
+                continue
+            if tokens[name] > max(available, 0):
+                texts[name] = _truncate(texts[name], max(available, 0))
+                trimmed[name] = (tokens[name], estimate_tokens(texts[name]))
+                tokens[name] = trimmed[name][1]
+            available -= tokens[name]
+
+        prompt_tokens = fixed + sum(tokens.values())
+        num_ctx = _ctx_bucket(prompt_tokens + num_predict + self.margin, self.max_ctx)
+        template_id = hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+        plan = BudgetPlan(texts, num_ctx, num_predict, prompt_tokens, tokens, trimmed, phase, template_id)
+        note = f", trimmed {', '.join(f'{k} {a}->{b}' for k, (a, b) in trimmed.items())}" if trimmed else ""
+        logger.info(f"[BUDGET] {phase}: prompt~{prompt_tokens} tok, num_ctx={num_ctx}, num_predict={num_predict}{note}")
+        return plan
+
+
+_budget = TokenBudget()
+
+
+def plan_call(phase: str, template: str, inputs: Dict[str, str], priorities: Optional[Dict[str, int]] = None) -> BudgetPlan:
+    return _budget.plan(phase, template, inputs, priorities)
@@ -0,0 +1,319 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Spans for every LLM call, embedding, pgvector query, parse, pipeline phase and Git step.
+# Durations feed Prometheus-style histograms (GET /metrics); finished traces can also be
+# appended to TRACE_FILE as one JSON object per line.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+# Traces kept for /traces when no file is configured
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "50"))
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+SIZE_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{self._label_text(key)} {value:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def count(self, **labels) -> int:
+        counts = self._values.get(self._key(labels))
+        return int(counts[-2]) if counts else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, counts in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    labels = self._label_text(key, 'le="%g"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {count:g}")
+                labels = self._label_text(key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {counts[-2]:g}")
+                lines.append(f"{self.name}_sum{self._label_text(key)} {counts[-1]:.6f}")
+                lines.append(f"{self.name}_count{self._label_text(key)} {counts[-2]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+HTTP_SECONDS = metrics.histogram("openl_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+SPAN_SECONDS = metrics.histogram("openl_span_duration_seconds", "Duration of traced operations", ("span", "phase", "status"))
+LLM_PROMPT_CHARS = metrics.histogram("openl_llm_prompt_chars", "Prompt size per LLM call", ("phase",), SIZE_BUCKETS)
+LLM_COMPLETION_CHARS = metrics.histogram("openl_llm_completion_chars", "Completion size per LLM call", ("phase",), SIZE_BUCKETS)
+CACHE_LOOKUPS = metrics.counter("openl_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result"))
+
+
+# --- Spans -----------------------------------------------------------------------
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("openl_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.trace = parent.trace if parent else _Trace()
+        self.span_id = uuid.uuid4().hex[:16]
+        # The pipeline phase is inherited, so an LLM call inside Phase C is labelled with it
+        self.attrs = {"phase": parent.attrs.get("phase", "") if parent else "", **attrs}
+        self.status = "ok"
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.trace.open += 1
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, name: str, amount: float = 1):
+        self.attrs[name] = self.attrs.get(name, 0) + amount
+
+    def fail(self, error: BaseException):
+        self.status = "error"
+        self.attrs["error"] = f"{type(error).__name__}: {error}"[:300]
+
+    def end(self):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        SPAN_SECONDS.observe(self.duration, span=self.name, phase=self.attrs.get("phase", ""), status=self.status)
+        self.trace.finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "start": self.start,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class _Trace:
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def finish(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+            self.open -= 1
+            complete = self.open == 0
+        if complete:
+            _exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        root = next((s for s in self.spans if s.parent is None), self.spans[-1])
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "duration_ms": round((root.duration or 0.0) * 1000, 3),
+            "spans": [s.to_dict() for s in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+
+class _Exporter:
+    """Finished traces: appended to TRACE_FILE (JSON lines) and kept in a short history."""
+
+    def __init__(self, path: str = TRACE_FILE, history: int = TRACE_HISTORY):
+        self.path = path
+        self.history = history
+        self.recent: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def export(self, trace: _Trace):
+        record = trace.to_dict()
+        with self._lock:
+            self.recent = (self.recent + [record])[-self.history:]
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                except OSError as e:
+                    logger.warning(f"[TRACE] Export to {self.path} failed: {e}")
+
+
+_exporter = _Exporter()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_root() -> Optional[Span]:
+    """The root span of the current trace (the HTTP request, when there is one)."""
+    current = _current.get()
+    while current is not None and current.parent is not None:
+        current = current.parent
+    return current
+
+
+def start_span(name: str, **attrs) -> Optional[Span]:
+    """A child of the current span that is *not* made current; call `.end()` yourself.
+    For generators, where a context variable set across `yield` would leak to the caller."""
+    if not TRACING_ENABLED:
+        return None
+    return Span(name, _current.get(), attrs)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """Trace the block as a child of the current span (or as a new trace's root)."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    current = Span(name, _current.get(), attrs)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup and tally it on the current span."""
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+    current = _current.get()
+    if current is not None:
+        current.add(f"cache_{cache}_{'hits' if hit else 'misses'}")
+
+
+def recent_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    return list(reversed(_exporter.recent[-limit:]))
+
+
+def render_metrics() -> str:
+    return metrics.render()
+
+
+class TracingMiddleware:
+    """ASGI middleware: one root span per HTTP request plus the request latency histogram."""
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        with span("http.request", method=scope["method"], path=scope["path"]) as root:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # The route template (`/versions/{filename}`), not the raw path, keeps label cardinality low
+                route = getattr(scope.get("route"), "path", "unmatched")
+                if root is not None:
+                    root.set(route=route, status_code=status["code"])
+                HTTP_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route, status=status["code"])
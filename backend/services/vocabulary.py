@@ -0,0 +1,103 @@
+import re
+from typing import Dict, List, Optional
+
+from models import Datatype, DatatypeField, Rule
+
+TYPE_ALIASES = {
+    "string": "String", "str": "String", "text": "String", "char": "String",
+    "integer": "Integer", "int": "Integer", "long": "Integer", "short": "Integer",
+    "number": "Double", "numeric": "Double", "double": "Double", "float": "Double",
+    "decimal": "Double", "bigdecimal": "Double", "money": "Double", "currency": "Double",
+    "boolean": "Boolean", "bool": "Boolean",
+    "date": "Date", "datetime": "Date", "localdate": "Date", "timestamp": "Date",
+}
+
+RULE_RESULT = Datatype(
+    name="RuleResult",
+    fields=[
+        {"name": "ruleId", "type": "String"},
+        {"name": "status", "type": "String"},
+        {"name": "message", "type": "String"},
+    ],
+)
+
+
+def normalize_type(raw: str) -> str:
+    """Map extracted type spellings onto the OpenL types Phase C expects; lists become `Type[]`."""
+    t = (raw or "String").strip()
+    list_match = re.match(r'^(?:List|Array|Set|Collection)\s*<\s*(.+?)\s*>$', t, re.IGNORECASE)
+    if list_match:
+        return f"{normalize_type(list_match.group(1))}[]"
+    if t.endswith("[]"):
+        return f"{normalize_type(t[:-2])}[]"
+    alias = TYPE_ALIASES.get(t.lower())
+    if alias:
+        return alias
+    # Custom datatype reference: keep the name, PascalCase it
+    return t[0].upper() + t[1:] if t else "String"
+
+
+def camel_case(name: str) -> str:
+    """`Hire Date`, `hire_date` and `HireDate` all become `hireDate`."""
+    parts = [p for p in re.split(r'[\s_\-]+', name.strip()) if p]
+    if not parts:
+        return name
+    head = parts[0]
+    # Leave acronym-only heads (e.g. `ID`) readable: `ID` -> `id`
+    head = head.lower() if head.isupper() else head[0].lower() + head[1:]
+    return head + "".join(p[0].upper() + p[1:] for p in parts[1:])
+
+
+def build_datatype_table(datatype: Datatype, defaults: Optional[Dict[str, str]] = None) -> dict:
+    """OpenL Datatype table: header `Datatype <Name>`, one `[Type, fieldName(, default)]` row per field."""
+    rows = []
+    for f in openl_datatypes([datatype])[0].fields:
+        row = [f.type, f.name]
+        if defaults is not None:
+            row.append(str(defaults.get(f.name, "")))
+        rows.append(row)
+    return {"header": f"Datatype {datatype.name}", "rows": rows}
+
+
+def with_current_date(datatypes: List[Datatype], rules: List[Rule]) -> List[Datatype]:
+    """Rules referencing `currentDate` need it as an input field, never as a global."""
+    uses_current_date = any("currentDate" in f"{r.condition or ''} {r.result or ''}" for r in rules)
+    has_field = any(f.name == "currentDate" for d in datatypes for f in d.fields)
+    if not uses_current_date or has_field or not datatypes:
+        return datatypes
+    target = next((d for d in datatypes if d.name.lower() == "policy"), datatypes[0])
+    patched = target.model_copy(deep=True)
+    patched.fields.append(DatatypeField(name="currentDate", type="Date"))
+    return [patched if d is target else d for d in datatypes]
+
+
+def openl_datatypes(datatypes: List[Datatype], rules: Optional[List[Rule]] = None) -> List[Datatype]:
+    """
+    The datatypes as the Vocabulary sheet defines them: camelCase field names, OpenL types and
+    `currentDate` when rules use it. Prompts, scoping, validation and tests all work on these,
+    so a field the prompt lists is the field the validator accepts.
+    """
+    result = []
+    for d in with_current_date(list(datatypes), rules or []):
+        fields = []
+        seen = set()
+        for f in d.fields:
+            field_name = camel_case(f.name)
+            if field_name in seen:
+                continue
+            seen.add(field_name)
+            fields.append(DatatypeField(name=field_name, type=normalize_type(f.type)))
+        result.append(d.model_copy(update={"fields": fields}))
+    return result
+
+
+def build_vocabulary_tables(datatypes: List[Datatype], rules: Optional[List[Rule]] = None, defaults: Optional[Dict[str, Dict[str, str]]] = None) -> List[dict]:
+    """
+    Phase A without the LLM: the Vocabulary sheet straight from the request models,
+    plus the mandatory RuleResult datatype every decision table returns.
+    """
+    datatypes = openl_datatypes(datatypes, rules)
+    tables = [build_datatype_table(d, None if defaults is None else defaults.get(d.name, {})) for d in datatypes]
+    if not any(d.name == "RuleResult" for d in datatypes):
+        tables.append(build_datatype_table(RULE_RESULT, {} if defaults is not None else None))
+    return tables
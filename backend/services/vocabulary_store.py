@@ -0,0 +1,287 @@
+import os
+import re
+import copy
+import json
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl  # advisory cross-process lock (several uvicorn workers share the directory)
+except ImportError:  # pragma: no cover - Windows dev machines: in-process locking only
+    fcntl = None
+
+from services.prompt_encoding import encode_datatypes
+
+logger = logging.getLogger(__name__)
+
+# Per-document vocabulary (datatypes + intermediate variables) produced by enrichment.
+# Same on-disk layout as the old enrich_cache/<file>.json, so existing entries keep working.
+VOCAB_STORE_DIR = os.getenv("VOCAB_STORE_DIR", "enrich_cache")
+VOCAB_STORE_MAX_BYTES = int(os.getenv("VOCAB_STORE_MAX_BYTES", str(50 * 1024 * 1024)))
+# Documents not enriched or looked up for this long are dropped (0 = keep forever)
+VOCAB_STORE_TTL_DAYS = float(os.getenv("VOCAB_STORE_TTL_DAYS", "90"))
+
+
+def document_id(filename: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_\-\.]', '_', filename)
+
+
+class _Record:
+    """In-memory view of one document, indexed by datatype / field / variable name."""
+
+    def __init__(self, data: Dict[str, Any], mtime_ns: int, size: int):
+        self.datatypes: Dict[str, dict] = {d["name"]: d for d in data.get("datatypes", []) if d.get("name")}
+        self.fields: Dict[str, Dict[str, dict]] = {
+            name: {f["name"]: f for f in d.get("fields", []) if f.get("name")} for name, d in self.datatypes.items()
+        }
+        self.variables: Dict[str, dict] = {v["name"]: v for v in data.get("intermediate_variables", []) if v.get("name")}
+        self.version = int(data.get("version", 0))
+        self.updated_at = float(data.get("updated_at", mtime_ns / 1e9))
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.accessed = time.time()
+        self._context: Optional[str] = None
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "updated_at": self.updated_at,
+            "datatypes": list(self.datatypes.values()),
+            "intermediate_variables": list(self.variables.values()),
+        }
+
+    def absorb(self, datatypes: List[dict], variables: List[dict]) -> List[str]:
+        """
+        Datatypes gain the fields they don't have yet; an existing field keeps its type and a
+        differing type is reported as a conflict. Variables are overwritten by name.
+        """
+        conflicts = []
+        for new_dt in datatypes:
+            name = new_dt.get("name")
+            if not name:
+                continue
+            if name not in self.datatypes:
+                self.datatypes[name] = {**new_dt, "fields": []}
+                self.fields[name] = {}
+            existing = self.fields[name]
+            for new_f in new_dt.get("fields", []):
+                field_name = new_f.get("name")
+                if not field_name:
+                    continue
+                if field_name in existing:
+                    if new_f.get("type") != existing[field_name].get("type"):
+                        conflicts.append(f"{name}.{field_name}: {existing[field_name].get('type')} kept over {new_f.get('type')}")
+                    continue
+                existing[field_name] = new_f
+                self.datatypes[name]["fields"].append(new_f)
+        for new_v in variables:
+            if new_v.get("name"):
+                self.variables[new_v["name"]] = new_v
+        self._context = None
+        return conflicts
+
+    def context(self) -> str:
+        """The enrichment prompt's `existing_context`, built once per version."""
+        if self._context is None:
+            var_str = "\n".join(f"- Variable {v['name']} ({v.get('logic', '')})" for v in self.variables.values())
+            self._context = (
+                f"**EXISTING DATATYPES**:\n{encode_datatypes(self.datatypes.values())}\n\n"
+                f"**EXISTING VARIABLES**:\n{var_str}"
+            )
+        return self._context
+
+
+def merge_vocabulary(results: List[Dict[str, Any]]) -> Tuple[List[dict], List[dict], List[str]]:
+    """Combine several enrichment results in order (earlier results win type conflicts)."""
+    record = _Record({}, 0, 0)
+    conflicts = []
+    for result in results:
+        conflicts += record.absorb(result.get("datatypes", []), result.get("intermediate_variables", []))
+    return list(record.datatypes.values()), list(record.variables.values()), conflicts
+
+
+class VocabularyStore:
+    """
+    Durable per-document vocabulary records.
+    - `merge` is an atomic read-modify-write: per-document thread lock plus an flock on a
+      sidecar lock file, re-reading the record if another process wrote it meanwhile, then
+      temp file + replace. Concurrent enrichments of the same document never lose fields.
+    - Records are cached in memory and revalidated by mtime, so lookups don't parse JSON.
+    - Every write bumps the record's version; sizes are tracked and the least recently used
+      documents are evicted past VOCAB_STORE_MAX_BYTES or after VOCAB_STORE_TTL_DAYS.
+    """
+
+    def __init__(self, store_dir: str = VOCAB_STORE_DIR, max_bytes: int = VOCAB_STORE_MAX_BYTES, ttl_days: float = VOCAB_STORE_TTL_DAYS):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl_days * 86400
+        self._records: Dict[str, _Record] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "merges": 0, "conflicts": 0, "evictions": 0}
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, doc: str) -> str:
+        return os.path.join(self.store_dir, f"{doc}.json")
+
+    def _doc_lock(self, doc: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(doc, threading.Lock())
+
+    @contextmanager
+    def _exclusive(self, doc: str) -> Iterator[None]:
+        with self._doc_lock(doc):
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self._path(doc)}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self, doc: str) -> Optional[_Record]:
+        """Cached record, re-read only when the file changed on disk."""
+        path = self._path(doc)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._records.pop(doc, None)
+            return None
+        with self._lock:
+            record = self._records.get(doc)
+        if record is not None and record.mtime_ns == stat.st_mtime_ns and record.size == stat.st_size:
+            return record
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = _Record(json.load(f), stat.st_mtime_ns, stat.st_size)
+        except Exception as e:
+            logger.warning(f"[VOCAB STORE] Read Error {path}: {e}")
+            return None
+        with self._lock:
+            self._records[doc] = record
+        return record
+
+    def _count(self, **deltas: int):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def _expired(self, record: _Record, now: float) -> bool:
+        return self.ttl > 0 and now - max(record.updated_at, record.accessed) > self.ttl
+
+    # --- Lookups ---------------------------------------------------------------
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        doc = document_id(filename)
+        record = self._load(doc)
+        if record is None or self._expired(record, time.time()):
+            self._count(misses=1)
+            return None
+        self._count(hits=1)
+        record.accessed = time.time()
+        return record.payload()
+
+    def existing_context(self, filename: str) -> str:
+        """Prompt summary of a document's vocabulary ("" when nothing is stored yet)."""
+        doc = document_id(filename)
+        record = self._load(doc)
+        if record is None or self._expired(record, time.time()):
+            self._count(misses=1)
+            return ""
+        self._count(hits=1)
+        record.accessed = time.time()
+        return record.context()
+
+    def version(self, filename: str) -> int:
+        record = self._load(document_id(filename))
+        return record.version if record else 0
+
+    # --- Writes ----------------------------------------------------------------
+
+    def merge(self, filename: str, datatypes: List[dict], variables: List[dict]) -> Dict[str, Any]:
+        """
+        Merge an enrichment result into the document's vocabulary (see `_Record.absorb`).
+        Returns the merged record.
+        """
+        doc = document_id(filename)
+        with self._exclusive(doc):
+            current = self._load(doc)
+            # Copy-on-write: lookups keep reading the cached record while this one is built
+            record = _Record(copy.deepcopy(current.payload()) if current else {}, 0, 0)
+            conflicts = record.absorb(datatypes, variables)
+            record.version += 1
+            record.updated_at = time.time()
+            self._write(doc, record)
+        self._count(merges=1, conflicts=len(conflicts))
+        for conflict in conflicts:
+            logger.warning(f"[VOCAB STORE] Type conflict in {filename}: {conflict}")
+        self.evict()
+        return record.payload()
+
+    def _write(self, doc: str, record: _Record):
+        path = self._path(doc)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record.payload(), f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        stat = os.stat(path)
+        record.mtime_ns, record.size = stat.st_mtime_ns, stat.st_size
+        record.accessed = time.time()
+        with self._lock:
+            self._records[doc] = record
+
+    def delete(self, filename: str):
+        doc = document_id(filename)
+        with self._exclusive(doc):
+            # The .lock sidecar stays: another process may be blocked in flock on it, and
+            # unlinking it would let that process and a later one lock different files
+            try:
+                os.remove(self._path(doc))
+            except FileNotFoundError:
+                pass
+            with self._lock:
+                self._records.pop(doc, None)
+
+    # --- Size accounting / eviction ---------------------------------------------
+
+    def usage(self) -> Dict[str, Any]:
+        documents = {}
+        for entry in os.scandir(self.store_dir):
+            if entry.name.endswith(".json"):
+                documents[entry.name[:-5]] = entry.stat().st_size
+        with self._lock:
+            stats = dict(self.stats)
+        return {"documents": len(documents), "bytes": sum(documents.values()), "max_bytes": self.max_bytes, **stats}
+
+    def evict(self) -> List[str]:
+        """Drop expired documents, then least recently used ones until under the size limit."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.store_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            doc = entry.name[:-5]
+            stat = entry.stat()
+            with self._lock:
+                record = self._records.get(doc)
+            last_used = max(stat.st_mtime, record.accessed if record else 0.0)
+            entries.append((last_used, doc, stat.st_size))
+        entries.sort()
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for last_used, doc, size in entries:
+            if not ((self.ttl > 0 and now - last_used > self.ttl) or total > self.max_bytes):
+                continue
+            self.delete(doc)
+            total -= size
+            evicted.append(doc)
+        if evicted:
+            self._count(evictions=len(evicted))
+            logger.info(f"[VOCAB STORE] Evicted {len(evicted)} documents ({', '.join(evicted)})")
+        return evicted
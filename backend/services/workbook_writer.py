@@ -0,0 +1,120 @@
+import os
+import tempfile
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple, Union
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import TYPE_STRING
+from openpyxl.worksheet.cell_range import CellRange
+
+# "streaming" uses openpyxl's write-only mode (bounded memory), "standard" the in-memory Workbook
+WORKBOOK_WRITER = os.getenv("WORKBOOK_WRITER", "streaming")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def table_header(table: Dict[str, Any]) -> str:
+    """Resolve the OpenL header line of a generated table, constructing it when the LLM left it out."""
+    header_raw = table.get("header") or table.get("Header")
+
+    if header_raw:
+        if isinstance(header_raw, list):
+            return " ".join(str(h) for h in header_raw)
+        return str(header_raw)
+    if "type" in table and isinstance(table["type"], str) and ("Rules " in table["type"] or "Spreadsheet " in table["type"]):
+        return table["type"]
+    if "Spreadsheet" in table:
+        return f"Spreadsheet {table['Spreadsheet']}" if not table['Spreadsheet'].startswith("Spreadsheet") else table['Spreadsheet']
+
+    name = table.get("name") or table.get("Name", "")
+    ret_type = table.get("returnType", table.get("type", "Object"))
+    params = table.get("params") or table.get("Params", "")
+
+    rows = table.get("rows") or table.get("Rows", [])
+    if rows and len(rows) > 0:
+         first_row = rows[0]
+         if isinstance(first_row, list) and len(first_row) > 0 and "Step" in str(first_row[0]):
+             table_type = "Spreadsheet"
+         else:
+             table_type = "Rules"
+    else:
+        table_type = "Rules"
+
+    return f"{table_type} {ret_type} {name}({params})"
+
+
+def iter_tables(sheet_data: Dict[str, Any]) -> Iterator[Tuple[str, List[list], int]]:
+    """Yields (header, rows, width) for every writable table of a sheet."""
+    for table in sheet_data.get("tables", []):
+        # Ensure table is a dictionary
+        if not isinstance(table, dict): continue
+        header = table_header(table)
+        rows = table.get("rows") or table.get("Rows", [])
+        if not header and not rows: continue
+        rows = [r if isinstance(r, (list, tuple)) else [r] for r in rows]
+        width = max([len(r) for r in rows]) if rows else 1
+        yield header, rows, width
+
+
+class StreamingWorkbookWriter:
+    """
+    Writes the generated structure with openpyxl's write-only worksheets: rows are
+    appended in bulk and flushed to the zip as they are written, so memory stays
+    bounded by one row instead of the whole workbook.
+    """
+
+    def __init__(self):
+        self.wb = Workbook(write_only=True)
+
+    def _formula_safe_row(self, ws, row: List[Any]) -> List[Any]:
+        # OpenL formulas starting with '=' cause Excel errors if not treated as text
+        if not any(isinstance(v, str) and v.startswith("=") for v in row):
+            return list(row)
+        out = []
+        for val in row:
+            if isinstance(val, str) and val.startswith("="):
+                cell = WriteOnlyCell(ws, value=val)
+                cell.data_type = TYPE_STRING
+                cell.quotePrefix = True
+                out.append(cell)
+            else:
+                out.append(val)
+        return out
+
+    def write(self, structure: Dict[str, Any], dest: Union[str, BinaryIO]):
+        for sheet_data in structure.get("sheets", []):
+            ws = self.wb.create_sheet(sheet_data["name"])
+            current_row = 1
+            for header, rows, width in iter_tables(sheet_data):
+                ws.append([header])
+                if width > 1:
+                    ws.merged_cells.add(CellRange(min_col=1, min_row=current_row, max_col=width, max_row=current_row))
+                for row in rows:
+                    ws.append(self._formula_safe_row(ws, row))
+                # Spacing
+                ws.append([])
+                ws.append([])
+                current_row += len(rows) + 3
+        self.wb.save(dest)
+
+
+def write_workbook(structure: Dict[str, Any], dest: Union[str, BinaryIO], standard_builder=None):
+    """Write with the configured backend. `standard_builder` builds an in-memory Workbook."""
+    if WORKBOOK_WRITER == "standard" and standard_builder is not None:
+        standard_builder(structure).save(dest)
+    else:
+        StreamingWorkbookWriter().write(structure, dest)
+
+
+def stream_workbook(structure: Dict[str, Any], standard_builder=None, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yields the .xlsx bytes for an HTTP response. The zip is spooled (memory up to
+    a few MB, then a temp file) because the xlsx container needs a seekable target.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as buffer:
+        write_workbook(structure, buffer, standard_builder)
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,144 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Each publish job gets its own `git worktree` on its own local branch, so concurrent jobs never
+# share a working tree. Worktrees reuse REPO_DIR's object database (no clone) and are sparse:
+# only the rules directory (plus top-level files) is checked out of the large openl-claim repo.
+GIT_WORKTREES = os.getenv("GIT_WORKTREES", "true").lower() == "true"
+WORKTREE_ROOT = os.getenv("WORKTREE_ROOT", "publish_worktrees")
+# Jobs starting within this many seconds of the last fetch reuse it instead of fetching again
+WORKTREE_FETCH_TTL = float(os.getenv("WORKTREE_FETCH_TTL", "10"))
+WORKTREE_PUSH_RETRIES = int(os.getenv("WORKTREE_PUSH_RETRIES", "3"))
+
+RunGit = Callable[[List[str], Optional[str]], Awaitable[str]]
+
+
+class Worktree:
+    def __init__(self, path: str, local_branch: str, remote_branch: str):
+        self.path = path
+        self.local_branch = local_branch
+        self.remote_branch = remote_branch
+
+
+class WorktreeManager:
+    """
+    Creates, pushes from and reclaims per-job worktrees of `repo_dir`.
+    Fetches (which write shared refs) are serialized and throttled by WORKTREE_FETCH_TTL, and
+    so are worktree add/remove (which write the shared .git/config); commits run in parallel.
+    A push rejected because another job pushed first is rebased and retried.
+    """
+
+    def __init__(self, repo_dir: str, sparse_dir: str, run_git: RunGit, root: str = WORKTREE_ROOT):
+        self.repo_dir = repo_dir
+        # Path of the rules directory inside the repository, e.g. "DESIGN/rules/Openl AI Demo/rules"
+        self.sparse_dir = sparse_dir.replace(os.sep, "/")
+        # One directory per process: several uvicorn workers may share WORKTREE_ROOT
+        self.base = os.path.abspath(root)
+        self.root = os.path.join(self.base, str(os.getpid()))
+        self._git = run_git
+        self._fetch_lock = asyncio.Lock()
+        self._admin_lock = asyncio.Lock()
+        self._fetched_at = {}
+        self._reclaimed = False
+
+    async def fetch(self, branch: str, force: bool = False):
+        async with self._fetch_lock:
+            if not force and time.monotonic() - self._fetched_at.get(branch, float("-inf")) < WORKTREE_FETCH_TTL:
+                return
+            try:
+                await self._git(["fetch", "origin", branch], self.repo_dir)
+            except Exception:
+                logger.warning(f"Fetching origin/{branch} failed, continuing (might be new branch)")
+            self._fetched_at[branch] = time.monotonic()
+
+    async def _start_point(self, branch: str) -> str:
+        for ref in (f"origin/{branch}", branch):
+            try:
+                await self._git(["rev-parse", "--verify", "--quiet", ref], self.repo_dir)
+                return ref
+            except Exception:
+                continue
+        return "HEAD"
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True  # exists, owned by someone else
+        return True
+
+    async def reclaim(self):
+        """Remove worktrees left behind by processes that are gone (crash, restart)."""
+        if os.path.isdir(self.base):
+            for owner in os.listdir(self.base):
+                owner_dir = os.path.join(self.base, owner)
+                if owner.isdigit() and int(owner) != os.getpid() and self._alive(int(owner)):
+                    continue
+                for name in os.listdir(owner_dir) if os.path.isdir(owner_dir) else []:
+                    await self._remove(os.path.join(owner_dir, name), f"publish/{name}")
+                shutil.rmtree(owner_dir, ignore_errors=True)
+        try:
+            await self._git(["worktree", "prune"], self.repo_dir)
+        except Exception as e:
+            logger.warning(f"git worktree prune failed: {e}")
+
+    async def _remove(self, path: str, local_branch: str):
+        async with self._admin_lock:
+            for args in (["worktree", "remove", "--force", path], ["branch", "-D", local_branch]):
+                try:
+                    await self._git(args, self.repo_dir)
+                except Exception:
+                    pass  # already gone
+        shutil.rmtree(path, ignore_errors=True)
+
+    @asynccontextmanager
+    async def checkout(self, branch: str) -> AsyncIterator[Worktree]:
+        """A fresh sparse worktree on `publish/<id>`, based on origin/<branch>; reclaimed on exit."""
+        if not self._reclaimed:
+            self._reclaimed = True
+            await self.reclaim()
+        await self.fetch(branch)
+        job_id = uuid.uuid4().hex[:12]
+        worktree = Worktree(os.path.join(self.root, job_id), f"publish/{job_id}", branch)
+        os.makedirs(self.root, exist_ok=True)
+        start = await self._start_point(branch)
+        try:
+            async with self._admin_lock:
+                await self._git(["worktree", "add", "--no-checkout", "--no-track", "-b", worktree.local_branch, worktree.path, start], self.repo_dir)
+                # Sparse-checkout settings are per worktree; read-tree then populates only the cone
+                await self._git(["sparse-checkout", "set", "--cone", self.sparse_dir], worktree.path)
+            await self._git(["read-tree", "-mu", "HEAD"], worktree.path)
+            yield worktree
+        finally:
+            await self._remove(worktree.path, worktree.local_branch)
+
+    async def push(self, worktree: Worktree):
+        """Push the job's commits to origin/<branch>, rebasing onto jobs that pushed meanwhile."""
+        for attempt in range(WORKTREE_PUSH_RETRIES + 1):
+            try:
+                await self._git(["push", "origin", f"HEAD:refs/heads/{worktree.remote_branch}"], worktree.path)
+                return
+            except Exception as e:
+                if attempt == WORKTREE_PUSH_RETRIES or not any(
+                    word in str(e).lower() for word in ("rejected", "non-fast-forward", "fetch first", "cannot lock ref")
+                ):
+                    raise
+                logger.info(f"Push of {worktree.local_branch} rejected, rebasing on origin/{worktree.remote_branch}")
+                await self.fetch(worktree.remote_branch, force=True)
+                # A workbook both jobs wrote: this job's (newer) copy wins
+                try:
+                    await self._git(["rebase", "-X", "theirs", f"origin/{worktree.remote_branch}"], worktree.path)
+                except Exception:
+                    await self._git(["rebase", "--abort"], worktree.path)
+                    raise
@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import httpx
+
+from benchmarks import workload
+from benchmarks.fakes import LatencyModel, OfflineRegistry, Recordings, install
+from benchmarks.stats import latency_summary
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend')
+
+# Endpoint -> request builder for a given input size. Every request of a run is built up front,
+# so request construction is not part of the measured latency.
+Builder = Callable[[int, int], Tuple[str, str, Dict[str, Any]]]
+
+
+def _json(request) -> Any:
+    return request.model_dump() if hasattr(request, "model_dump") else request
+
+
+ENDPOINTS: Dict[str, Builder] = {
+    "extract-candidates": lambda size, i: ("POST", "/extract-candidates", {"json": {"text": workload.policy_text(size)}}),
+    "enrich-rules": lambda size, i: ("POST", "/enrich-rules", {"json": {
+        "rules": [_json(r) for r in workload.rules(size)], "text": workload.policy_text(size), "filename": f"bench_{i}.docx"}}),
+    "generate-excel": lambda size, i: ("POST", "/generate-excel", {"json": {
+        **_json(workload.generation_request(size)), "original_filename": f"Bench_{i}.docx"}}),
+    "generate-kraken-rules": lambda size, i: ("POST", "/generate-kraken-rules", {"json": {"excel_data": workload.kraken_items(size)}}),
+    "diff": lambda size, i: ("GET", f"/diff/Bench_Diff_{size}.docx/1/2", {}),
+}
+
+
+class Workdir:
+    """Scratch working directory for the app (it writes generated/, data_storage/, caches and
+    temp files relative to the CWD)."""
+
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix="openl-bench-")
+        self._previous = os.getcwd()
+
+    def __enter__(self) -> str:
+        shutil.copy(os.path.join(BACKEND_DIR, "kraken_rule_prompt.md"), self.path)
+        os.chdir(self.path)
+        return self.path
+
+    def __exit__(self, *exc):
+        os.chdir(self._previous)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def prepare_app(registry: OfflineRegistry, artifact_cache: bool = False):
+    """Point the app at the offline registry and a fresh document store in the CWD."""
+    main = install(registry)
+    from services import generation_service, tracing
+    from version_control import DocumentManager
+
+    # Cold pipeline by default: cached tables would turn every repeated request into a cache hit
+    generation_service.ARTIFACT_CACHE_ENABLED = artifact_cache
+    main.doc_manager = DocumentManager(os.path.join(os.getcwd(), "data_storage"))
+    tracing._exporter.history = 100_000
+    return main
+
+
+async def _seed_versions(client: httpx.AsyncClient, size: int):
+    """Two saved versions of one document, for /diff."""
+    filename = f"Bench_Diff_{size}.docx"
+    first = workload.rules(size)
+    for version, rules in enumerate((first, workload.changed_rules(first))):
+        response = await client.post("/save-version", params={"filename": filename},
+                                     json={"rules": [_json(r) for r in rules], "text_content": f"version {version}"})
+        response.raise_for_status()
+
+
+async def drive(client: httpx.AsyncClient, requests: List[Tuple[str, str, Dict[str, Any]]], concurrency: int) -> Dict[str, Any]:
+    """Send the requests with at most `concurrency` in flight; returns latencies and error count."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def worker():
+        while not queue.empty():
+            method, url, kwargs = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code >= 400:
+                    errors.append(f"{response.status_code}: {response.text[:200]}")
+                    continue
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors, "elapsed": time.perf_counter() - started}
+
+
+def phase_costs(traces: List[Dict[str, Any]], requests: int) -> Dict[str, Dict[str, float]]:
+    """Mean milliseconds and count per request of every span name below the HTTP request."""
+    totals: Dict[str, List[float]] = {}
+    for trace in traces:
+        for span in trace["spans"]:
+            if span["name"] == "http.request":
+                continue
+            entry = totals.setdefault(span["name"], [0.0, 0])
+            entry[0] += span["duration_ms"]
+            entry[1] += 1
+    per = max(requests, 1)
+    ordered = sorted(totals.items(), key=lambda item: -item[1][0])
+    return {name: {"ms_per_request": round(ms / per, 2), "calls_per_request": round(n / per, 2)} for name, (ms, n) in ordered}
+
+
+async def _run(main, endpoints: Sequence[str], sizes: Sequence[int], requests: int, concurrency: int) -> List[Dict[str, Any]]:
+    from services import tracing
+    from services.metering import meter
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for size in sizes:
+            if "diff" in endpoints:
+                await _seed_versions(client, size)
+            for name in endpoints:
+                batch = [ENDPOINTS[name](size, i) for i in range(requests)]
+                # One unmeasured request first: lazy clients, vector store, prompt files
+                await drive(client, batch[:1], 1)
+                meter.reset()
+                tracing._exporter.recent = []
+                run = await drive(client, batch, concurrency)
+                llm = meter.summary(group_by=("phase",))
+                results.append({
+                    "name": name,
+                    "size": size,
+                    "concurrency": concurrency,
+                    **latency_summary(run["latencies"], run["elapsed"], len(run["errors"])),
+                    "first_error": run["errors"][0] if run["errors"] else None,
+                    "phases": phase_costs(tracing.recent_traces(len(tracing._exporter.recent)), requests),
+                    "llm": {row["phase"] or "-": {k: row[k] for k in ("calls", "prompt_tokens", "completion_tokens", "prefill_seconds", "decode_seconds")} for row in llm},
+                })
+    return results
+
+
+def run_endpoints(endpoints: Sequence[str] = tuple(ENDPOINTS), sizes: Sequence[int] = (5, 20), requests: int = 20,
+                  concurrency: int = 4, latency: Optional[LatencyModel] = None, recordings: Optional[str] = None,
+                  hosts: int = 1, artifact_cache: bool = False) -> List[Dict[str, Any]]:
+    """
+    Runs every endpoint against the real app with the offline registry: `requests` requests per
+    endpoint and input size, `concurrency` in flight. Returns one result row per (endpoint, size).
+    """
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise ValueError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    registry = OfflineRegistry(Recordings(recordings) if recordings else None, latency, hosts=hosts)
+    with Workdir():
+        main = prepare_app(registry, artifact_cache)
+        return asyncio.run(_run(main, endpoints, sizes, requests, concurrency))
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import tempfile
+from typing import Any, Callable, Dict, List, Sequence
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from benchmarks import workload
+from benchmarks.fakes import OfflineRegistry
+from benchmarks.stats import percentile
+
+# CPU-bound building blocks of the pipeline, timed at growing input sizes so that
+# super-linear behaviour shows up as a per-item cost that rises with the size.
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, min_seconds: float = 0.05) -> Dict[str, float]:
+    """Median / min seconds per call; calls are batched until a batch takes `min_seconds`."""
+    fn()  # warm-up: imports, caches
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        took = time.perf_counter() - start
+        if took >= min_seconds or number >= 1000:
+            break
+        number *= 2
+    samples = [took / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {"median": percentile(samples, 50), "min": min(samples)}
+
+
+def cases(size: int, workdir: str) -> Dict[str, Callable[[], Any]]:
+    """Benchmark name -> zero-argument callable processing `size` items."""
+    from services.generation_service import GenerationService
+    from services.structured_output import parse_json
+    from services.workbook_writer import write_workbook
+    from version_control import RuleDiffer
+    from utils import parse_docx, parse_excel, parse_pdf
+    import json
+
+    structure = workload.workbook_structure(size)
+    old_rules = workload.rules(size)
+    new_rules = workload.changed_rules(old_rules)
+    tables_json = json.dumps({"tables": structure["sheets"][1]["tables"]})
+    # Typical model output: prose around a fenced JSON block
+    llm_output = f"Here are the tables:\n```json\n{tables_json}\n```\nLet me know if you need changes."
+    pdf = workload.write_pdf(os.path.join(workdir, f"policy_{size}.pdf"), max(1, size // 10))
+    docx = workload.write_docx(os.path.join(workdir, f"policy_{size}.docx"), size)
+    xlsx = workload.write_xlsx(os.path.join(workdir, f"kraken_{size}.xlsx"), size)
+    xlsx_out = os.path.join(workdir, f"out_{size}.xlsx")
+    # Clients are lazy: building the service against the fakes never reaches a model
+    service = GenerationService(OfflineRegistry())
+
+    return {
+        "create_workbook": lambda: service.create_workbook(structure),
+        "write_workbook": lambda: write_workbook(structure, xlsx_out),
+        "rule_differ.diff": lambda: RuleDiffer.diff(old_rules, new_rules),
+        "parse_json": lambda: parse_json(llm_output),
+        "parse_pdf": lambda: parse_pdf(pdf),
+        "parse_docx": lambda: parse_docx(docx),
+        "parse_excel": lambda: parse_excel(xlsx),
+    }
+
+
+def run_micro(sizes: Sequence[int] = (10, 100, 1000), repeat: int = 5, only: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="openl-bench-") as workdir:
+        for size in sizes:
+            for name, fn in cases(size, workdir).items():
+                if only and name not in only:
+                    continue
+                timing = measure(fn, repeat=repeat)
+                results.append({
+                    "name": name,
+                    "size": size,
+                    "median_ms": round(timing["median"] * 1000, 3),
+                    "min_ms": round(timing["min"] * 1000, 3),
+                    "per_item_us": round(timing["median"] * 1e6 / size, 2),
+                })
+    return results
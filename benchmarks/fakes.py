@@ -0,0 +1,341 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from services.client_registry import ClientRegistry
+from services.llm_router import OllamaBackend
+from services.token_budget import estimate_tokens
+
+# Offline stand-ins for Ollama and pgvector. The fakes sit *behind* the real RoutedOllamaLLM /
+# RoutedOllamaEmbeddings (in place of the ollama Client), so routing, token budgets, tracing
+# and metering run exactly as in production; only the model and the database are replayed.
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+DEFAULT_RECORDINGS = os.path.join(RECORDINGS_DIR, "default.json")
+RAG_DIR = os.path.join(os.path.dirname(__file__), "..", "rag")
+
+_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class Recordings:
+    """
+    Recorded model responses: exact ones keyed by prompt hash (captured with RecordingClient)
+    and canned ones matched by a substring of the prompt, tried in file order.
+    """
+
+    def __init__(self, path: str = DEFAULT_RECORDINGS):
+        self.path = path
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)["responses"]
+        self.exact: Dict[str, str] = {}
+        self.matches: List[tuple] = []
+        for entry in entries:
+            response = entry["response"]
+            text = response if isinstance(response, str) else json.dumps(response)
+            if entry.get("prompt_sha256"):
+                self.exact[entry["prompt_sha256"]] = text
+            else:
+                self.matches.append((entry["match"], text))
+
+    def respond(self, prompt: str) -> str:
+        exact = self.exact.get(prompt_hash(prompt))
+        if exact is not None:
+            return exact
+        for marker, text in self.matches:
+            if marker in prompt:
+                return text
+        raise LookupError(f"No recorded response for prompt starting {prompt[:80]!r}")
+
+
+class LatencyModel:
+    """
+    Simulated Ollama timing: a fixed per-call overhead, prefill at `prefill_tps` prompt tokens/s
+    and decode at `decode_tps` completion tokens/s. `time_scale` shrinks or stretches all of it
+    (0 = no sleeping at all); the reported durations are the scaled ones.
+    """
+
+    def __init__(self, overhead: float = 0.05, prefill_tps: float = 2000.0, decode_tps: float = 60.0,
+                 embed_seconds: float = 0.01, time_scale: float = 1.0):
+        self.overhead = overhead
+        self.prefill_tps = prefill_tps
+        self.decode_tps = decode_tps
+        self.embed_seconds = embed_seconds
+        self.time_scale = time_scale
+
+    def prefill(self, prompt_tokens: int) -> float:
+        return (self.overhead + prompt_tokens / self.prefill_tps) * self.time_scale
+
+    def decode(self, tokens: int = 1) -> float:
+        return tokens / self.decode_tps * self.time_scale
+
+    def embed(self, texts: int) -> float:
+        return self.embed_seconds * texts * self.time_scale
+
+
+class _Pacer:
+    """Accumulates simulated time and sleeps in slices of at least 2 ms (per-token sleeps would
+    measure the OS timer instead of the model)."""
+
+    SLICE = 0.002
+
+    def __init__(self):
+        self.owed = 0.0
+
+    def add(self, seconds: float) -> float:
+        self.owed += seconds
+        if self.owed < self.SLICE:
+            return 0.0
+        owed, self.owed = self.owed, 0.0
+        return owed
+
+
+def hashed_embedding(text: str, dimensions: int = 256) -> List[float]:
+    """Deterministic bag-of-words vector (feature hashing): similar texts get similar vectors."""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class HashedEmbeddings(Embeddings):
+    """The fake embedding function without a client or latency (for seeding stores)."""
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [hashed_embedding(t, self.dimensions) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return hashed_embedding(text, self.dimensions)
+
+
+class _FakeOllama:
+    def __init__(self, recordings: Optional[Recordings] = None, latency: Optional[LatencyModel] = None, dimensions: int = 256):
+        self.recordings = recordings or Recordings()
+        self.latency = latency or LatencyModel()
+        self.dimensions = dimensions
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _plan(self, model: str, prompt: str):
+        with self._lock:
+            self.calls += 1
+        text = self.recordings.respond(prompt)
+        return text, _TOKEN.findall(text), estimate_tokens(prompt)
+
+    def _final(self, model: str, prompt_tokens: int, completion_tokens: int, prefill: float, decode: float) -> Dict[str, Any]:
+        return {
+            "model": model, "response": "", "done": True, "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens, "eval_count": completion_tokens,
+            "prompt_eval_duration": int(prefill * 1e9), "eval_duration": int(decode * 1e9),
+            "load_duration": 0, "total_duration": int((prefill + decode) * 1e9),
+        }
+
+    def _embed_response(self, model: str, input: Any) -> Dict[str, Any]:
+        texts = [input] if isinstance(input, str) else list(input)
+        return {"model": model, "embeddings": [hashed_embedding(t, self.dimensions) for t in texts]}
+
+
+class FakeOllamaClient(_FakeOllama):
+    """Drop-in for `ollama.Client` (generate / embed) that replays recordings with simulated latency."""
+
+    def generate(self, model: str = "", prompt: str = "", stream: bool = False, **kwargs: Any):
+        text, tokens, prompt_tokens = self._plan(model, prompt)
+        if not stream:
+            prefill, decode = self.latency.prefill(prompt_tokens), self.latency.decode(len(tokens))
+            time.sleep(prefill + decode)
+            return {**self._final(model, prompt_tokens, len(tokens), prefill, decode), "response": text}
+        return self._stream(model, tokens, prompt_tokens)
+
+    def _stream(self, model: str, tokens: List[str], prompt_tokens: int) -> Iterator[Dict[str, Any]]:
+        prefill = self.latency.prefill(prompt_tokens)
+        time.sleep(prefill)
+        pacer = _Pacer()
+        for token in tokens:
+            delay = pacer.add(self.latency.decode())
+            if delay:
+                time.sleep(delay)
+            yield {"model": model, "response": token, "done": False}
+        time.sleep(pacer.owed)
+        yield self._final(model, prompt_tokens, len(tokens), prefill, self.latency.decode(len(tokens)))
+
+    def embed(self, model: str = "", input: Any = "", **kwargs: Any) -> Dict[str, Any]:
+        texts = 1 if isinstance(input, str) else len(input)
+        time.sleep(self.latency.embed(texts))
+        return self._embed_response(model, input)
+
+
+class FakeAsyncOllamaClient(_FakeOllama):
+    """Drop-in for `ollama.AsyncClient`; waits with asyncio.sleep, so the event loop stays free."""
+
+    async def generate(self, model: str = "", prompt: str = "", stream: bool = False, **kwargs: Any):
+        text, tokens, prompt_tokens = self._plan(model, prompt)
+        if not stream:
+            prefill, decode = self.latency.prefill(prompt_tokens), self.latency.decode(len(tokens))
+            await asyncio.sleep(prefill + decode)
+            return {**self._final(model, prompt_tokens, len(tokens), prefill, decode), "response": text}
+        return self._stream(model, tokens, prompt_tokens)
+
+    async def _stream(self, model: str, tokens: List[str], prompt_tokens: int) -> AsyncIterator[Dict[str, Any]]:
+        prefill = self.latency.prefill(prompt_tokens)
+        await asyncio.sleep(prefill)
+        pacer = _Pacer()
+        for token in tokens:
+            await asyncio.sleep(pacer.add(self.latency.decode()))
+            yield {"model": model, "response": token, "done": False}
+        await asyncio.sleep(pacer.owed)
+        yield self._final(model, prompt_tokens, len(tokens), prefill, self.latency.decode(len(tokens)))
+
+    async def embed(self, model: str = "", input: Any = "", **kwargs: Any) -> Dict[str, Any]:
+        texts = 1 if isinstance(input, str) else len(input)
+        await asyncio.sleep(self.latency.embed(texts))
+        return self._embed_response(model, input)
+
+
+class RecordingClient:
+    """Wraps a real `ollama.Client` and appends every generate() prompt/response pair to a
+    recordings file, so a live run can be replayed offline exactly (by prompt hash)."""
+
+    def __init__(self, client: Any, path: str):
+        self.client = client
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _save(self, prompt: str, response: str):
+        with self._lock:
+            document = {"responses": []}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    document = json.load(f)
+            document["responses"].insert(0, {"prompt_sha256": prompt_hash(prompt), "prompt_head": prompt[:120], "response": response})
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(document, f, indent=2)
+
+    def generate(self, model: str = "", prompt: str = "", stream: bool = False, **kwargs: Any):
+        result = self.client.generate(model=model, prompt=prompt, stream=stream, **kwargs)
+        if not stream:
+            self._save(prompt, result.get("response", ""))
+            return result
+        return self._tee(prompt, result)
+
+    def _tee(self, prompt: str, parts: Iterator[Any]) -> Iterator[Any]:
+        text = []
+        for part in parts:
+            text.append(part.get("response") or "")
+            yield part
+        self._save(prompt, "".join(text))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+def guide_documents(rag_dir: str = RAG_DIR, chunk_chars: int = 1500) -> List[Document]:
+    """The OpenL guide from rag/ split into fixed-size chunks (what /ingest-guide stores in pgvector)."""
+    documents = []
+    for root, _, files in os.walk(rag_dir):
+        for name in sorted(files):
+            if not name.endswith(".md"):
+                continue
+            with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                text = f.read()
+            for start in range(0, len(text), chunk_chars):
+                documents.append(Document(page_content=text[start:start + chunk_chars], metadata={"source": name}))
+    return documents
+
+
+class InMemoryVectors:
+    """
+    ClientRegistry mixin: an InMemoryVectorStore in place of pgvector, seeded with the OpenL
+    guide (or `_documents`) and queried through the registry's routed embeddings.
+    """
+
+    _documents: Optional[List[Document]] = None
+
+    def vector_store(self) -> InMemoryVectorStore:
+        with self._lock:
+            store = self._vector_store
+        if store is None:
+            # Seeded without simulated latency (the guide is ingested once, offline); queries
+            # then embed through the routed client like production
+            store = InMemoryVectorStore(HashedEmbeddings())
+            documents = guide_documents() if self._documents is None else self._documents
+            if documents:
+                store.add_documents(documents)
+            store.embedding = self.embeddings()
+            with self._lock:
+                self._vector_store = self._vector_store or store
+        return self._vector_store
+
+
+class OfflineRegistry(InMemoryVectors, ClientRegistry):
+    """
+    ClientRegistry whose Ollama hosts are FakeOllamaClients and whose vector store is an
+    InMemoryVectorStore (embedded with the fake embeddings), seeded with the OpenL guide.
+    """
+
+    def __init__(self, recordings: Optional[Recordings] = None, latency: Optional[LatencyModel] = None,
+                 hosts: int = 1, documents: Optional[List[Document]] = None):
+        super().__init__(base_urls=[f"http://fake-ollama-{i}:11434" for i in range(hosts)])
+        recordings = recordings or Recordings()
+        self.latency = latency or LatencyModel()
+        self.router.backends = [
+            OllamaBackend(b.url, FakeOllamaClient(recordings, self.latency), FakeAsyncOllamaClient(recordings, self.latency))
+            for b in self.router.backends
+        ]
+        self._documents = documents
+        self.warmup_status = {"state": "done", "components": {}}
+
+    def llm_calls(self) -> int:
+        return sum(b.client.calls + b.async_client.calls for b in self.router.backends)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {"ollama": {"backends": self.router.stats(), "fake": True}, "database": {"initialized": False, "fake": True}}
+
+    def readiness(self) -> Dict[str, Any]:
+        return {"ready": True, "warmup": self.warmup_status, "checks": {}, "pools": self.pool_stats()}
+
+    def warm_up(self) -> Dict[str, Any]:
+        return self.warmup_status
+
+    def close(self):
+        pass
+
+
+def install(registry: ClientRegistry):
+    """
+    Make the app use `registry`: sets the process-wide registry and rebinds the clients
+    main.py created at import time. Returns the main module.
+    """
+    from services import client_registry
+    from services.generation_service import GenerationService
+
+    client_registry._registry = registry
+    import main
+    main.registry = registry
+    main.gen_service = GenerationService(registry)
+    main.extraction_llm = registry.llm("extraction")
+    main.kraken_llm = registry.llm("kraken")
+    main.embeddings = registry.embeddings()
+    return main
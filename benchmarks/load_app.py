@@ -0,0 +1,47 @@
+import os
+import sys
+import argparse
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+# The real app for load tests, served by uvicorn from a scratch working directory with
+# OLLAMA_BASE_URLS pointing at --ollama-url (usually benchmarks.mock_ollama). Without --pgvector
+# the vector store is in memory, so no Postgres is needed.
+#   python -m benchmarks.load_app --port 8100 --ollama-url http://127.0.0.1:11500
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the OpenL AI App backend against a (mock) Ollama for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ollama-url", default="http://127.0.0.1:11500", help="comma-separated Ollama hosts")
+    parser.add_argument("--pgvector", action="store_true", help="use the configured Postgres instead of an in-memory vector store")
+    parser.add_argument("--artifact-cache", action="store_true", help="keep the artifact cache on (repeated workflows become cache hits)")
+    args = parser.parse_args(argv)
+
+    # Read at import time by the services
+    os.environ["OLLAMA_BASE_URLS"] = args.ollama_url
+    os.environ["ARTIFACT_CACHE"] = "true" if args.artifact_cache else "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from benchmarks.bench_endpoints import Workdir
+    from benchmarks.fakes import InMemoryVectors, install
+    from services.client_registry import ClientRegistry
+
+    class MockOllamaRegistry(InMemoryVectors, ClientRegistry):
+        """Real pooled Ollama clients with the in-memory vector store."""
+
+    with Workdir() as workdir:
+        if args.pgvector:
+            import main as app_module
+        else:
+            app_module = install(MockOllamaRegistry())
+        print(f"Serving on http://{args.host}:{args.port} (Ollama: {args.ollama_url}, workdir: {workdir})", flush=True)
+        uvicorn.run(app_module.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+import os
+import re
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional, Sequence
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import httpx
+
+from benchmarks import workload
+from benchmarks.stats import format_table, latency_summary
+
+# Load test of the running app over real HTTP: virtual users replay the document workflow a
+# reviewer goes through, each step feeding the next:
+#   upload -> extract-candidates -> enrich-rules -> save-version -> generate-excel -> save-version (edited) -> diff
+# By default the mock Ollama (benchmarks.mock_ollama) and the app (benchmarks.load_app) are
+# started as subprocesses on free ports:
+#   python -m benchmarks.load_test --users 8 --workflows 40 --decode-tps 40
+#   python -m benchmarks.load_test --app-url http://localhost:8000 --users 4 --duration 120   # existing deployment
+# Reports throughput and tail latency per step, event-loop blocking in the app (from its
+# /metrics) and how many LLM calls the mock saw at once.
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STEPS = ("upload", "extract-candidates", "enrich-rules", "save-version", "generate-excel", "diff")
+STEP_COLUMNS = ["name", "requests", "errors", "throughput_rps", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"]
+
+
+class StepFailed(Exception):
+    pass
+
+
+class LoadResults:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in STEPS + ("workflow",)}
+        self.errors: Dict[str, List[str]] = {name: [] for name in STEPS + ("workflow",)}
+
+    def record(self, name: str, seconds: Optional[float], error: Optional[str] = None):
+        if error is None:
+            self.latencies[name].append(seconds)
+        else:
+            self.errors[name].append(error)
+
+    def rows(self, elapsed: float) -> List[Dict[str, Any]]:
+        return [
+            {"name": name, **latency_summary(self.latencies[name], elapsed, len(self.errors[name])),
+             "first_error": self.errors[name][0] if self.errors[name] else None}
+            for name in self.latencies if self.latencies[name] or self.errors[name]
+        ]
+
+
+async def run_workflow(client: httpx.AsyncClient, results: LoadResults, filename: str, document: bytes):
+    """One pass through the workflow; stops at the first failing step (later steps need its output)."""
+
+    async def step(name: str, method: str, url: str, **kwargs) -> Any:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception as e:
+            results.record(name, None, f"{type(e).__name__}: {e}")
+            raise StepFailed(name)
+        if response.status_code >= 400:
+            results.record(name, None, f"{response.status_code}: {response.text[:200]}")
+            raise StepFailed(name)
+        results.record(name, time.perf_counter() - started)
+        return response.json()
+
+    mime = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    upload = await step("upload", "POST", "/upload", files={"file": (filename, document, mime)})
+    candidates = await step("extract-candidates", "POST", "/extract-candidates", json={"text": upload["extracted_text"]})
+    enriched = await step("enrich-rules", "POST", "/enrich-rules",
+                          json={"rules": candidates, "text": upload["extracted_text"], "filename": filename})
+    rules = enriched["rules"]
+    await step("save-version", "POST", "/save-version", params={"filename": filename, "temp_path": upload["temp_path"]},
+               json={"rules": rules})
+    await step("generate-excel", "POST", "/generate-excel", json={
+        "rules": rules, "datatypes": enriched["datatypes"],
+        "intermediate_variables": enriched.get("intermediate_variables", []), "original_filename": filename})
+    # The reviewer edits a rule and saves again, then compares the versions
+    edited = [dict(rules[0], condition=f"({rules[0].get('condition') or 'true'}) AND reviewed")] + rules[1:]
+    await step("save-version", "POST", "/save-version", params={"filename": filename, "temp_path": upload["temp_path"]},
+               json={"rules": edited, "comments": "reviewed"})
+    await step("diff", "GET", f"/diff/{filename}/1/2")
+
+
+async def run_load(client: httpx.AsyncClient, users: int = 4, workflows: Optional[int] = 20, duration: Optional[float] = None,
+                   paragraphs: int = 20, ramp_up: float = 0.0) -> Dict[str, Any]:
+    """
+    `users` virtual users run workflows back to back until `workflows` have been started in total
+    or `duration` seconds have passed (whichever is set / first). Returns per-step rows.
+    """
+    with tempfile.TemporaryDirectory(prefix="openl-load-") as workdir:
+        with open(workload.write_docx(os.path.join(workdir, "policy.docx"), paragraphs), "rb") as f:
+            document = f.read()
+    results = LoadResults()
+    started_count = 0
+    run_id = int(time.time())
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def user(index: int):
+        nonlocal started_count
+        await asyncio.sleep(ramp_up * index / max(users, 1))
+        while (workflows is None or started_count < workflows) and (deadline is None or time.perf_counter() < deadline):
+            started_count += 1
+            filename = f"LoadTest_{run_id}_u{index:02d}_{started_count:05d}.docx"
+            started = time.perf_counter()
+            try:
+                await run_workflow(client, results, filename, document)
+                results.record("workflow", time.perf_counter() - started)
+            except StepFailed as e:
+                results.record("workflow", None, f"failed at {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    return {"elapsed_s": round(elapsed, 3), "users": users, "steps": results.rows(elapsed)}
+
+
+# --- Event-loop lag (from the app's /metrics) -------------------------------------------
+
+_SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][\w:]*)(?:\{(?P<labels>[^}]*)\})?\s+(?P<value>\S+)$')
+
+
+def parse_metrics(text: str, prefix: str) -> Dict[str, float]:
+    """Samples of the metrics starting with `prefix`, keyed 'name{labels}' as exposed."""
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match and match["name"].startswith(prefix):
+            key = match["name"] + ("{" + match["labels"] + "}" if match["labels"] else "")
+            samples[key] = float(match["value"])
+    return samples
+
+
+async def loop_metrics(client: httpx.AsyncClient) -> Dict[str, float]:
+    try:
+        response = await client.get("/metrics")
+        return parse_metrics(response.text, "openl_event_loop_")
+    except Exception:
+        return {}
+
+
+def loop_lag(before: Dict[str, float], after: Dict[str, float], elapsed: float) -> Dict[str, Any]:
+    """Blocked time and lag percentiles over the run (percentiles are histogram bucket bounds)."""
+    delta = {key: after[key] - before.get(key, 0.0) for key in after}
+    ticks = delta.get("openl_event_loop_lag_seconds_count", 0.0)
+    if not ticks:
+        return {"available": False}
+    buckets = sorted(
+        (float(key.split('le="')[1].split('"')[0]), count)
+        for key, count in delta.items() if key.startswith("openl_event_loop_lag_seconds_bucket") and "+Inf" not in key
+    )
+
+    def bound_ms(p: float) -> Optional[float]:
+        for le, count in buckets:
+            if count >= ticks * p / 100:
+                return round(le * 1000, 3)
+        return None  # beyond the largest bucket
+
+    blocked = delta.get("openl_event_loop_blocked_seconds_total", 0.0)
+    return {
+        "available": True,
+        "probes": int(ticks),
+        "blocked_seconds": round(blocked, 3),
+        "blocked_fraction": round(blocked / elapsed, 3) if elapsed else None,
+        "mean_lag_ms": round(delta.get("openl_event_loop_lag_seconds_sum", 0.0) / ticks * 1000, 2),
+        "p50_lag_le_ms": bound_ms(50),
+        "p99_lag_le_ms": bound_ms(99),
+    }
+
+
+# --- Processes -----------------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Service:
+    """A `python -m <module>` subprocess that is up once `health_url` answers."""
+
+    def __init__(self, module: str, args: Sequence[str], health_url: str, env: Optional[Dict[str, str]] = None):
+        self.module = module
+        self.args = list(args)
+        self.health_url = health_url
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "Service":
+        self.process = subprocess.Popen([sys.executable, "-m", self.module, *self.args], cwd=REPO_ROOT,
+                                        env={**os.environ, **(self.env or {})})
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.module} exited with code {self.process.returncode}")
+            try:
+                if httpx.get(self.health_url, timeout=1.0).status_code < 500:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f"{self.module} did not come up at {self.health_url}")
+
+    def __exit__(self, *exc):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+async def _measure(app_url: str, ollama_url: Optional[str], args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=app_url, timeout=args.timeout, limits=limits) as client, \
+            httpx.AsyncClient(base_url=ollama_url or "http://unused", timeout=10) as ollama:
+        if args.warm_up:
+            await run_load(client, users=1, workflows=1, paragraphs=args.paragraphs)
+        if ollama_url:
+            await ollama.get("/mock/stats", params={"reset": True})
+        before = await loop_metrics(client)
+        result = await run_load(client, args.users, args.workflows, args.duration, args.paragraphs, args.ramp_up)
+        result["event_loop"] = loop_lag(before, await loop_metrics(client), result["elapsed_s"])
+        try:
+            result["event_loop"]["max_lag_ms_since_start"] = round((await client.get("/health")).json()["event_loop"]["max_lag_seconds"] * 1000, 1)
+        except Exception:
+            pass
+        if ollama_url:
+            try:
+                result["ollama"] = (await ollama.get("/mock/stats")).json()
+            except httpx.HTTPError:
+                result["ollama"] = None
+        return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent-user load test of the OpenL AI App backend")
+    parser.add_argument("--users", type=int, default=4, help="concurrent virtual users")
+    parser.add_argument("--workflows", type=int, default=20, help="workflows in total (0 = until --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="stop starting workflows after this many seconds")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which the users start")
+    parser.add_argument("--paragraphs", type=int, default=20, help="paragraphs in the uploaded policy")
+    parser.add_argument("--timeout", type=float, default=600.0, help="per-request timeout (seconds)")
+    parser.add_argument("--no-warm-up", dest="warm_up", action="store_false", help="skip the unmeasured first workflow")
+    parser.add_argument("--app-url", default=None, help="test this running app instead of starting one")
+    parser.add_argument("--ollama-url", default=None, help="mock Ollama to use / query for stats instead of starting one")
+    # Mock Ollama settings (when started here)
+    parser.add_argument("--decode-tps", type=float, default=60.0)
+    parser.add_argument("--prefill-tps", type=float, default=2000.0)
+    parser.add_argument("--time-scale", type=float, default=0.1, help="multiplier on the simulated model latency")
+    parser.add_argument("--parallel", type=int, default=4, help="generations the mock serves at once (0 = unlimited)")
+    parser.add_argument("--recordings", default=None)
+    parser.add_argument("--pgvector", action="store_true", help="started app uses the configured Postgres")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args(argv)
+    args.workflows = args.workflows or None
+    if args.workflows is None and args.duration is None:
+        parser.error("--workflows 0 needs --duration")
+
+    services = []
+    ollama_url, app_url = args.ollama_url, args.app_url
+    if not app_url:
+        if not ollama_url:
+            port = free_port()
+            ollama_url = f"http://127.0.0.1:{port}"
+            mock_args = ["--port", str(port), "--decode-tps", str(args.decode_tps), "--prefill-tps", str(args.prefill_tps),
+                         "--time-scale", str(args.time_scale), "--parallel", str(args.parallel)]
+            if args.recordings:
+                mock_args += ["--recordings", args.recordings]
+            services.append(Service("benchmarks.mock_ollama", mock_args, f"{ollama_url}/api/version"))
+        port = free_port()
+        app_url = f"http://127.0.0.1:{port}"
+        app_args = ["--port", str(port), "--ollama-url", ollama_url] + (["--pgvector"] if args.pgvector else [])
+        services.append(Service("benchmarks.load_app", app_args, f"{app_url}/health"))
+
+    started = []
+    try:
+        for service in services:
+            started.append(service.__enter__())
+        result = asyncio.run(_measure(app_url, ollama_url, args))
+    finally:
+        for service in reversed(started):
+            service.__exit__()
+
+    result["meta"] = {"timestamp": time.time(), "python": platform.python_version(), "args": vars(args)}
+    print(format_table(result["steps"], STEP_COLUMNS))
+    for row in result["steps"]:
+        if row["first_error"]:
+            print(f"  {row['name']} first error: {row['first_error']}")
+    lag = result["event_loop"]
+    if lag.get("available"):
+        print(f"\nEvent loop: blocked {lag['blocked_seconds']}s of {result['elapsed_s']}s ({lag['blocked_fraction']:.0%}), "
+              f"mean lag {lag['mean_lag_ms']}ms, p99 <= {lag['p99_lag_le_ms']}ms, max since start {lag.get('max_lag_ms_since_start')}ms")
+    else:
+        print("\nEvent loop: no lag metrics (LOOP_MONITOR_ENABLED off?)")
+    if result.get("ollama"):
+        o = result["ollama"]
+        print(f"Ollama: {o['generate_calls']} generations, at most {o['max_in_flight']} in flight, {o['queue_seconds']}s queued for a slot")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    failed = sum(row["errors"] for row in result["steps"] if row["name"] == "workflow")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.fakes import FakeAsyncOllamaClient, LatencyModel, Recordings
+
+# A local HTTP stand-in for Ollama for load tests: /api/generate (NDJSON streaming or a single
+# JSON object) and /api/embed, answering from the recordings at the LatencyModel's token rates.
+#   python -m benchmarks.mock_ollama --port 11500 --decode-tps 40 --parallel 4
+# The app then runs unchanged with OLLAMA_BASE_URLS=http://127.0.0.1:11500.
+
+
+class MockStats:
+    """Request concurrency as the model server sees it. `max_in_flight` stuck at 1 under a
+    concurrent load means the app serializes its LLM calls."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.generate_calls = 0
+        self.embed_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queue_seconds = 0.0
+        self.started = time.time()
+
+    def enter(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self):
+        self.in_flight -= 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "generate_calls": self.generate_calls,
+            "embed_calls": self.embed_calls,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_seconds": round(self.queue_seconds, 3),
+            "since": self.started,
+        }
+
+
+def create_app(recordings: Optional[Recordings] = None, latency: Optional[LatencyModel] = None, parallel: int = 4) -> FastAPI:
+    """
+    `parallel` is the number of generations served at once (OLLAMA_NUM_PARALLEL); further
+    requests wait for a slot. 0 = unlimited.
+    """
+    fake = FakeAsyncOllamaClient(recordings, latency)
+    stats = MockStats()
+    models = set()
+    slots: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Created inside the server's event loop
+        if parallel > 0:
+            slots["generate"] = asyncio.Semaphore(parallel)
+        yield
+
+    app = FastAPI(title="Mock Ollama", lifespan=lifespan)
+    app.state.stats = stats
+
+    async def acquire():
+        slot = slots.get("generate")
+        if slot is not None:
+            started = time.perf_counter()
+            await slot.acquire()
+            stats.queue_seconds += time.perf_counter() - started
+        return slot
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        model, prompt = body.get("model", ""), body.get("prompt", "")
+        models.add(model)
+        if not prompt:
+            # An empty prompt only loads the model (the app's warm-up)
+            return {"model": model, "response": "", "done": True, "done_reason": "load"}
+        stats.generate_calls += 1
+        stats.enter()
+        try:
+            slot = await acquire()
+        except BaseException:
+            stats.leave()
+            raise
+
+        def release():
+            stats.leave()
+            if slot is not None:
+                slot.release()
+
+        stream = body.get("stream", True)
+        try:
+            result = await fake.generate(model=model, prompt=prompt, stream=stream)
+        except LookupError as e:
+            release()
+            return JSONResponse(status_code=404, content={"error": str(e)})
+        except BaseException:
+            release()
+            raise
+        if not stream:
+            release()
+            return result
+
+        async def ndjson():
+            try:
+                async for part in result:
+                    yield json.dumps(part) + "\n"
+            finally:
+                release()
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        stats.embed_calls += 1
+        models.add(body.get("model", ""))
+        return await fake.embed(model=body.get("model", ""), input=body.get("input", ""))
+
+    @app.get("/api/ps")
+    @app.get("/api/tags")
+    async def loaded_models():
+        return {"models": [{"model": m, "name": m} for m in sorted(models) if m]}
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-mock"}
+
+    @app.get("/mock/stats")
+    async def get_stats(reset: bool = False):
+        snapshot = stats.to_dict()
+        if reset:
+            stats.reset()
+        return snapshot
+
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Ollama server replaying recorded responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--recordings", default=None, help="recorded responses (default: benchmarks/recordings/default.json)")
+    parser.add_argument("--prefill-tps", type=float, default=2000.0)
+    parser.add_argument("--decode-tps", type=float, default=60.0)
+    parser.add_argument("--overhead", type=float, default=0.05, help="fixed seconds per generation")
+    parser.add_argument("--time-scale", type=float, default=1.0)
+    parser.add_argument("--parallel", type=int, default=4, help="generations served at once (0 = unlimited)")
+    args = parser.parse_args(argv)
+
+    latency = LatencyModel(overhead=args.overhead, prefill_tps=args.prefill_tps, decode_tps=args.decode_tps, time_scale=args.time_scale)
+    recordings = Recordings(args.recordings) if args.recordings else None
+    uvicorn.run(create_app(recordings, latency, args.parallel), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from benchmarks.stats import compare, format_table
+
+# Offline benchmark suite (no Ollama, no Postgres, no network):
+#   python -m benchmarks.run                       # everything, printed as tables
+#   python -m benchmarks.run --suite micro --sizes 10,100,1000
+#   python -m benchmarks.run --output bench.json   # save; later runs compare with --baseline bench.json
+
+ENDPOINT_COLUMNS = ["name", "size", "concurrency", "requests", "errors", "throughput_rps", "p50_ms", "p90_ms", "p99_ms", "max_ms"]
+MICRO_COLUMNS = ["name", "size", "median_ms", "min_ms", "per_item_us"]
+
+
+def _sizes(text: str):
+    return [int(s) for s in text.split(",") if s.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline OpenL AI App benchmarks")
+    parser.add_argument("--suite", choices=["endpoints", "micro", "all"], default="all")
+    parser.add_argument("--endpoints", default="", help="comma-separated subset of endpoints")
+    parser.add_argument("--endpoint-sizes", default="5,20", help="rules / paragraphs per request")
+    parser.add_argument("--sizes", default="10,100,1000", help="input sizes for the micro-benchmarks")
+    parser.add_argument("--requests", type=int, default=20, help="requests per endpoint and size")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hosts", type=int, default=1, help="simulated Ollama hosts behind the router")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="multiplier on the simulated model latency (0 = instant)")
+    parser.add_argument("--decode-tps", type=float, default=60.0)
+    parser.add_argument("--prefill-tps", type=float, default=2000.0)
+    parser.add_argument("--recordings", default=None, help="recorded responses (default: benchmarks/recordings/default.json)")
+    parser.add_argument("--artifact-cache", action="store_true", help="keep the artifact cache on (warm pipeline)")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression is reported")
+    args = parser.parse_args(argv)
+
+    # Read when the app is imported; per-request INFO lines would dominate the output
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from services.structured_logging import configure_logging
+    configure_logging()
+    results = {"meta": {"timestamp": time.time(), "python": platform.python_version(), "machine": platform.machine(),
+                        "args": vars(args)}}
+
+    if args.suite in ("micro", "all"):
+        from benchmarks.bench_micro import run_micro
+        results["micro"] = run_micro(_sizes(args.sizes))
+        print(format_table(results["micro"], MICRO_COLUMNS), end="\n\n")
+
+    if args.suite in ("endpoints", "all"):
+        from benchmarks.bench_endpoints import ENDPOINTS, run_endpoints
+        from benchmarks.fakes import LatencyModel
+        latency = LatencyModel(prefill_tps=args.prefill_tps, decode_tps=args.decode_tps, time_scale=args.time_scale)
+        endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()] or list(ENDPOINTS)
+        results["endpoints"] = run_endpoints(endpoints, _sizes(args.endpoint_sizes), args.requests, args.concurrency,
+                                             latency, args.recordings, args.hosts, args.artifact_cache)
+        print(format_table(results["endpoints"], ENDPOINT_COLUMNS))
+        for row in results["endpoints"]:
+            top = ", ".join(f"{name} {cost['ms_per_request']}ms" for name, cost in list(row["phases"].items())[:5])
+            print(f"  {row['name']} [{row['size']}]: {top}")
+            if row["first_error"]:
+                print(f"  {row['name']} [{row['size']}] first error: {row['first_error']}")
+        print()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results.get("micro", []), baseline.get("micro", []), "median_ms", args.tolerance)
+        regressions += compare(results.get("endpoints", []), baseline.get("endpoints", []), "p50_ms", args.tolerance)
+        if regressions:
+            print(format_table(regressions, ["name", "size", "metric", "baseline", "current", "change"]))
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (p in 0..100) of unsorted values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(latencies: Sequence[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Throughput and latency percentiles (milliseconds) of one measured run."""
+    ms = [v * 1000 for v in latencies]
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else None,
+        **{f"p{p}_ms": round(percentile(ms, p), 2) if ms else None for p in (50, 90, 95, 99)},
+        "max_ms": round(max(ms), 2) if ms else None,
+    }
+
+
+def format_table(rows: List[Dict[str, Any]], columns: Sequence[str]) -> str:
+    widths = {c: max(len(c), *(len(_cell(r.get(c))) for r in rows)) for c in columns} if rows else {c: len(c) for c in columns}
+    lines = ["  ".join(c.ljust(widths[c]) for c in columns)]
+    lines += ["  ".join(_cell(r.get(c)).ljust(widths[c]) for c in columns) for r in rows]
+    return "\n".join(lines)
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def compare(current: List[Dict[str, Any]], baseline: List[Dict[str, Any]], metric: str, tolerance: float) -> List[Dict[str, Any]]:
+    """Rows (matched on name + size) whose `metric` grew by more than `tolerance` (0.25 = 25%)."""
+    previous = {(row["name"], row.get("size")): row for row in baseline}
+    regressions = []
+    for row in current:
+        before = previous.get((row["name"], row.get("size")), {}).get(metric)
+        now = row.get(metric)
+        if before and now is not None and now > before * (1 + tolerance):
+            regressions.append({"name": row["name"], "size": row.get("size"), "metric": metric,
+                                "baseline": before, "current": now, "change": round(now / before - 1, 3)})
+    return regressions
@@ -0,0 +1,165 @@
+import os
+import sys
+import random
+from typing import Any, Dict, List
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from docx import Document as DocxDocument
+from openpyxl import Workbook
+
+from models import Datatype, DatatypeField, GenerationRequest, Rule
+
+# Deterministic synthetic inputs at a requested scale: rule sets, policy text, generated
+# workbook structures and the upload formats parse_document understands.
+
+_FIELDS = {
+    "Member": [("age", "Integer"), ("status", "String"), ("hireDate", "Date"), ("isLateEntrant", "Boolean")],
+    "Claim": [("amount", "Double"), ("dateOfService", "Date"), ("cdtCode", "String")],
+    "Policy": [("annualMaximum", "Double"), ("effectiveDate", "Date"), ("waitingPeriodDays", "Integer")],
+}
+_CONDITIONS = [
+    ("Member.age < {n}", "Denied", "Members younger than {n} are not eligible"),
+    ("Member.status == 'Active'", "Approved", "Only active members are covered"),
+    ("Claim.amount > Policy.annualMaximum", "Reduced", "Claims above the annual maximum are reduced"),
+    ("Claim.dateOfService < Policy.effectiveDate + Policy.waitingPeriodDays", "Denied", "Services within the waiting period are denied"),
+    ("Member.isLateEntrant AND Claim.cdtCode == 'D8080'", "Denied", "Late entrants wait for orthodontic services"),
+]
+
+
+def datatypes() -> List[Datatype]:
+    return [Datatype(name=name, fields=[DatatypeField(name=f, type=t) for f, t in fields]) for name, fields in _FIELDS.items()]
+
+
+def rules(count: int, seed: int = 7) -> List[Rule]:
+    rng = random.Random(seed)
+    result = []
+    for i in range(count):
+        condition, outcome, summary = _CONDITIONS[i % len(_CONDITIONS)]
+        n = rng.randint(16, 70)
+        result.append(Rule(
+            id=f"Rule-{i + 1:04d}",
+            name=f"CheckRule{i + 1:04d}",
+            summary=summary.format(n=n),
+            condition=condition.format(n=n),
+            result=outcome,
+            source_text=f"Section {i + 1}. {summary.format(n=n)} as stated in the policy schedule.",
+            rule_type="DecisionTable",
+            category="Eligibility",
+            related_datatypes=sorted({part.split(".")[0] for part in condition.split() if "." in part and part[0].isupper()}),
+        ))
+    return result
+
+
+def changed_rules(original: List[Rule], fraction: float = 0.2, seed: int = 11) -> List[Rule]:
+    """A later version: some rules modified, a few removed and the same number added."""
+    rng = random.Random(seed)
+    result = []
+    for rule in original:
+        roll = rng.random()
+        if roll < fraction / 4:
+            continue
+        if roll < fraction:
+            rule = rule.model_copy(update={"condition": f"{rule.condition} AND Member.age > 1", "result": "Pended"})
+        result.append(rule)
+    added = rules(len(original) - len(result), seed=seed)
+    result.extend(r.model_copy(update={"id": f"New-{i + 1:04d}", "name": f"NewRule{i + 1:04d}"}) for i, r in enumerate(added))
+    return result
+
+
+def generation_request(count: int) -> GenerationRequest:
+    return GenerationRequest(rules=rules(count), datatypes=datatypes(), original_filename="Benchmark_Policy.docx")
+
+
+def policy_paragraphs(count: int) -> List[str]:
+    return [
+        f"{i + 1}. {_CONDITIONS[i % len(_CONDITIONS)][2].format(n=18 + i % 50)}. This provision applies to every "
+        f"claim submitted under the plan and is evaluated before benefits are calculated; see the schedule of benefits for limits."
+        for i in range(count)
+    ]
+
+
+def policy_text(paragraphs: int) -> str:
+    return "\n\n".join(policy_paragraphs(paragraphs))
+
+
+def kraken_items(count: int) -> List[Dict[str, str]]:
+    return [{"summary": f"Field {i} is mandatory", "source_text": f"CapDentalBaseClaimData.field{i} must be provided."} for i in range(count)]
+
+
+def rule_table(name: str, rows: int) -> Dict[str, Any]:
+    body = [[str(18 + i), f'= new RuleResult("{name}", "Not-Eligible", "Row {i}")'] for i in range(rows)]
+    return {
+        "header": f"Rules RuleResult {name}(Member m)",
+        "rows": [["C1", "RET1"], ["m.age >= minAge", "result"], ["Integer minAge", ""], ["Min Age", "Result"]] + body,
+    }
+
+
+def workbook_structure(tables: int, rows: int = 10) -> Dict[str, Any]:
+    """A generated structure like generate_excel_structure returns, with `tables` rule tables."""
+    vocabulary = [{"header": f"Datatype {name}", "rows": [[t, f] for f, t in fields]} for name, fields in _FIELDS.items()]
+    rule_tables = [rule_table(f"CheckRule{i:04d}", rows) for i in range(tables)]
+    tests = [
+        {"header": f"Test CheckRule{i:04d} CheckRule{i:04d}Test",
+         "rows": [["_id_", "_description_", "m.age", "_res_.status"]] + [[f"T{j}", f"Case {j}", str(18 + j), "Not-Eligible"] for j in range(rows)]}
+        for i in range(tables)
+    ]
+    return {"sheets": [{"name": "Vocabulary", "tables": vocabulary}, {"name": "Rules", "tables": rule_tables}, {"name": "Tests", "tables": tests}]}
+
+
+def write_docx(path: str, paragraphs: int) -> str:
+    document = DocxDocument()
+    for text in policy_paragraphs(paragraphs):
+        document.add_paragraph(text)
+    document.save(path)
+    return path
+
+
+def write_xlsx(path: str, rows: int) -> str:
+    """A Kraken upload sheet: summaries in column C, source text in column D."""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["#", "Entity", "Summary", "Source Text"])
+    for i, item in enumerate(kraken_items(rows)):
+        ws.append([i + 1, "CapDentalBaseClaimData", item["summary"], item["source_text"]])
+    wb.save(path)
+    return path
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40) -> str:
+    """A plain text PDF (Helvetica, one content stream per page) without a PDF library."""
+    lines = [p[:90] for p in policy_paragraphs(pages * lines_per_page)]
+    page_count = max(1, pages)
+    font_id, pages_id = 3, 2
+    objects: Dict[int, bytes] = {1: b"<< /Type /Catalog /Pages 2 0 R >>", font_id: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for page in range(page_count):
+        page_id, content_id = 4 + page * 2, 5 + page * 2
+        chunk = lines[page * lines_per_page:(page + 1) * lines_per_page]
+        stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in chunk) + " ET"
+        data = stream.encode("latin-1")
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+        objects[page_id] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (content_id, font_id))
+        kids.append(b"%d 0 R" % page_id)
+    objects[pages_id] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % page_count
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n"
+    xref = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for number in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+    return path
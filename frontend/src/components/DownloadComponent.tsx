@@ -2,7 +2,7 @@
 
 import React, { useState } from 'react';
 import { Download, FileSpreadsheet, CheckCircle, AlertCircle } from 'lucide-react';
-import { generateExcel, Rule, Datatype, api } from '@/lib/api';
+import { generateExcel, waitForPublishJob, Rule, Datatype, api } from '@/lib/api';
 
 interface DownloadComponentProps {
     selectedRules: Rule[];
@@ -40,7 +40,13 @@ export default function DownloadComponent({
         setAutoDownloaded(false);
 
         try {
-            const result = await generateExcel(selectedRules, selectedDatatypes, createPr, filename);
+            let result = await generateExcel(selectedRules, selectedDatatypes, createPr, filename);
+            if (createPr && result?.job_id) {
+                // The push and MR creation finish in the background
+                const job = await waitForPublishJob(result.job_id);
+                if (job.status === 'error') throw new Error(job.message);
+                result = { ...result, ...job };
+            }
 
             if (createPr) {
                 // Handle Git/PR success
@@ -85,6 +85,32 @@ export const generateExcel = async (rules: Rule[], datatypes: Datatype[], create
   return response.data;
 };
 
+export interface PublishJob {
+  job_id: string;
+  filename: string;
+  status: 'queued' | 'running' | 'success' | 'skipped' | 'error';
+  message: string;
+  mr_url: string;
+  source_branch: string;
+  target_branch: string;
+}
+
+export const getPublishJob = async (jobId: string): Promise<PublishJob> => {
+  const response = await api.get(`/publish-jobs/${jobId}`);
+  return response.data;
+};
+
+// Git publishing runs in the background on the server; poll until the push/MR finished
+export const waitForPublishJob = async (jobId: string, intervalMs: number = 2000, timeoutMs: number = 10 * 60 * 1000): Promise<PublishJob> => {
+  const deadline = Date.now() + timeoutMs;
+  while (true) {
+    const job = await getPublishJob(jobId);
+    if (job.status !== 'queued' && job.status !== 'running') return job;
+    if (Date.now() > deadline) throw new Error('Timed out waiting for the merge request');
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 export interface VersionMetadata {
   version: number;
   filename: string;
@@ -0,0 +1,84 @@
+import sys
+import os
+import asyncio
+
+# Add backend and the repository root (benchmarks package) to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fakes import LatencyModel, OfflineRegistry
+from models import Rule, Datatype, DatatypeField, GenerationRequest
+import services.generation_service as generation_service
+from services.artifact_cache import ArtifactCache, artifact_key
+from services.generation_service import GenerationService
+
+TABLES = [{"header": "Rules RuleResult CheckMinimumAge(Member m)", "rows": [["C1", "RET1"]]}]
+
+
+def test_miss_then_hit_from_memory_and_disk(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    key = artifact_key("decision", "CheckMinimumAge")
+    assert cache.get("decision", key) is None
+
+    cache.put("decision", key, TABLES)
+    assert cache.get("decision", key) == TABLES
+    # A new process only has the file
+    assert ArtifactCache(str(tmp_path)).get("decision", key) == TABLES
+
+
+def test_changed_inputs_miss():
+    assert artifact_key("decision", {"condition": "m.age < 18"}) != artifact_key("decision", {"condition": "m.age < 21"})
+
+
+def test_hits_are_copies(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    cache.put("test", "k", TABLES)
+    hit = cache.get("test", "k")
+    hit[0]["rows"].append(["mutated"])
+    hit.append({"header": "extra"})
+    assert cache.get("test", "k") == TABLES
+
+
+def test_memory_and_disk_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.artifact_cache.PRUNE_EVERY", 5)
+    cache = ArtifactCache(str(tmp_path), memory_items=3, max_files=4)
+    for i in range(10):
+        cache.put("decision", f"k{i}", TABLES)
+        os.utime(cache._path("decision", f"k{i}"), (i, i))
+
+    assert len(cache._memory) == 3
+    # Pruned after the 5th and 10th write, oldest files first
+    files = sorted(os.listdir(tmp_path / "decision"))
+    assert files == ["k6.json", "k7.json", "k8.json", "k9.json"]
+    assert cache.get("decision", "k0") is None
+
+
+def test_regeneration_only_sends_changed_rules_to_the_llm(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(generation_service, "ARTIFACT_CACHE_ENABLED", True)
+    service = GenerationService(OfflineRegistry(latency=LatencyModel(time_scale=0), documents=[]))
+    prompted = []
+    invoke = service._invoke_decision_tables
+
+    def recording(rules, *args):
+        prompted.append([r.name for r in rules])
+        return invoke(rules, *args)
+
+    service._invoke_decision_tables = recording
+    datatypes = [Datatype(name="Member", fields=[DatatypeField(name="age", type="Integer"), DatatypeField(name="status", type="String")])]
+    rules = [
+        Rule(id="Rule-01", name="CheckMinimumAge", summary="Minimum age", condition="Member.age < 18", result="Denied", rule_type="DecisionTable"),
+        Rule(id="Rule-02", name="CheckActiveStatus", summary="Active only", condition="Member.status == 'Active'", result="Approved", rule_type="DecisionTable"),
+    ]
+
+    asyncio.run(service.generate_excel_structure(GenerationRequest(rules=rules, datatypes=datatypes)))
+    assert prompted == [["CheckMinimumAge", "CheckActiveStatus"]]
+
+    # Unchanged: everything reused
+    asyncio.run(service.generate_excel_structure(GenerationRequest(rules=rules, datatypes=datatypes)))
+    assert len(prompted) == 1
+
+    # One rule edited: only that rule is regenerated
+    edited = [rules[0], rules[1].model_copy(update={"condition": "Member.status != 'Terminated'"})]
+    asyncio.run(service.generate_excel_structure(GenerationRequest(rules=edited, datatypes=datatypes)))
+    assert prompted[1:] == [["CheckActiveStatus"]]
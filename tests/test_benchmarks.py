@@ -0,0 +1,114 @@
+import sys
+import os
+import asyncio
+
+# Add backend and the repository root (benchmarks package) to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from benchmarks.bench_endpoints import run_endpoints
+from benchmarks.bench_micro import run_micro
+from benchmarks.fakes import FakeAsyncOllamaClient, FakeOllamaClient, LatencyModel, Recordings
+from benchmarks.stats import compare, latency_summary, percentile
+
+INSTANT = LatencyModel(time_scale=0)
+
+
+def test_fake_client_streams_recording_with_final_stats():
+    client = FakeOllamaClient(latency=INSTANT)
+    parts = list(client.generate(model="m", prompt="Please generate the following Kraken rule: x", stream=True))
+
+    assert parts[-1]["done"] and parts[-1]["eval_count"] == len(parts) - 1
+    assert parts[-1]["prompt_eval_count"] > 0
+    assert "".join(p["response"] for p in parts) == Recordings().respond("Please generate the following Kraken rule")
+
+
+def test_fake_async_client_and_unknown_prompt():
+    client = FakeAsyncOllamaClient(latency=INSTANT)
+
+    async def collect():
+        return [p async for p in await client.generate(model="m", prompt="Suggest **default values** now", stream=True)]
+
+    assert asyncio.run(collect())[-1]["done"]
+    with pytest.raises(LookupError):
+        asyncio.run(client.generate(model="m", prompt="unrelated"))
+
+
+def test_stats():
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile([], 99) is None
+    summary = latency_summary([0.1, 0.2], elapsed=1.0, errors=1)
+    assert summary["requests"] == 3 and summary["throughput_rps"] == 2.0 and summary["max_ms"] == 200.0
+    regressions = compare([{"name": "a", "size": 1, "p50_ms": 150}], [{"name": "a", "size": 1, "p50_ms": 100}], "p50_ms", 0.25)
+    assert regressions[0]["change"] == 0.5
+
+
+def test_micro_suite_runs():
+    rows = run_micro(sizes=(5,), repeat=1, only=("rule_differ.diff", "parse_json"))
+    assert {row["name"] for row in rows} == {"rule_differ.diff", "parse_json"}
+    assert all(row["median_ms"] >= 0 for row in rows)
+
+
+def test_endpoint_suite_runs():
+    rows = run_endpoints(["generate-excel", "diff"], sizes=(2,), requests=2, concurrency=2, latency=INSTANT)
+
+    assert [row["name"] for row in rows] == ["generate-excel", "diff"]
+    assert all(row["errors"] == 0 for row in rows), [row["first_error"] for row in rows]
+    # LLM calls go through the real routed client, so they are traced and metered per phase
+    assert "llm.generate" in rows[0]["phases"]
+    assert sum(phase["calls"] for phase in rows[0]["llm"].values()) > 0
+
+
+def test_mock_ollama_server_speaks_the_ollama_api():
+    import httpx
+    from ollama import AsyncClient
+    from benchmarks.mock_ollama import create_app
+
+    app = create_app(latency=INSTANT, parallel=1)
+
+    async def scenario():
+        async with app.router.lifespan_context(app):
+            client = AsyncClient(host="http://mock", transport=httpx.ASGITransport(app=app))
+            parts = [p async for p in await client.generate(model="m", prompt="Suggest **default values** x", stream=True)]
+            single = await client.generate(model="m", prompt="Please generate the following Kraken rule")
+            vectors = await client.embed(model="e", input=["a", "b"])
+            with pytest.raises(Exception):
+                await client.generate(model="m", prompt="unrelated")
+            return parts, single, vectors, [m.model for m in (await client.ps()).models]
+
+    parts, single, vectors, loaded = asyncio.run(scenario())
+
+    assert parts[-1].done and parts[-1].eval_count == len(parts) - 1
+    assert single.response.startswith("Rule ")
+    assert len(vectors.embeddings) == 2
+    assert loaded == ["e", "m"]
+    stats = app.state.stats.to_dict()
+    assert stats["generate_calls"] == 3 and stats["in_flight"] == 0 and stats["max_in_flight"] == 1
+
+
+def test_load_workflow_against_the_app(tmp_path, monkeypatch):
+    import httpx
+    from benchmarks.bench_endpoints import prepare_app
+    from benchmarks.fakes import OfflineRegistry
+    from benchmarks.load_test import loop_lag, parse_metrics, run_load
+
+    monkeypatch.chdir(tmp_path)
+    main = prepare_app(OfflineRegistry(latency=INSTANT, documents=[]))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://app") as client:
+            return await run_load(client, users=2, workflows=3, paragraphs=3)
+
+    result = asyncio.run(scenario())
+    rows = {row["name"]: row for row in result["steps"]}
+
+    assert all(row["errors"] == 0 for row in rows.values()), [row["first_error"] for row in rows.values()]
+    assert rows["workflow"]["requests"] == 3 and rows["save-version"]["requests"] == 6
+    assert set(rows) == {"upload", "extract-candidates", "enrich-rules", "save-version", "generate-excel", "diff", "workflow"}
+
+    text = 'openl_event_loop_lag_seconds_bucket{le="0.01"} 9\nopenl_event_loop_lag_seconds_bucket{le="0.5"} 10\n' \
+           'openl_event_loop_lag_seconds_count 10\nopenl_event_loop_lag_seconds_sum 0.4\nopenl_event_loop_blocked_seconds_total 0.3\n'
+    lag = loop_lag({}, parse_metrics(text, "openl_event_loop_"), elapsed=3.0)
+    assert lag["blocked_fraction"] == 0.1 and lag["p50_lag_le_ms"] == 10.0 and lag["p99_lag_le_ms"] == 500.0
@@ -0,0 +1,72 @@
+import sys
+import os
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services import client_registry
+from services.client_registry import ClientRegistry, LLM_MODEL
+
+
+def make_registry(monkeypatch, warmup_on_startup=True, loaded=(LLM_MODEL,)):
+    monkeypatch.setattr(client_registry, "WARMUP_ON_STARTUP", warmup_on_startup)
+    registry = ClientRegistry(base_urls=["http://ollama-a:11434"])
+    # SQLite stands in for Postgres (readiness only runs SELECT 1), pooled like the real engine
+    registry._engine = create_engine("sqlite://", poolclass=QueuePool)
+    models = SimpleNamespace(models=[SimpleNamespace(model=m) for m in loaded])
+    registry.router.backends[0].client.ps = lambda: models
+    return registry
+
+
+def test_clients_are_shared_per_route(monkeypatch):
+    registry = make_registry(monkeypatch)
+    assert registry.llm("kraken") is registry.llm("kraken")
+    assert registry.llm("kraken") is not registry.llm("extraction")
+    assert registry.embeddings() is registry.embeddings()
+
+
+def test_not_ready_until_warm_up_has_run(monkeypatch):
+    registry = make_registry(monkeypatch)
+    report = registry.readiness()
+    assert report["checks"]["ollama"]["ok"] and report["checks"]["database"]["ok"]
+    assert registry.warmup_status["state"] == "pending" and not report["ready"]
+
+
+def test_ready_when_warm_up_is_disabled(monkeypatch):
+    registry = make_registry(monkeypatch, warmup_on_startup=False)
+    assert registry.warmup_status["state"] == "skipped"
+    assert registry.readiness()["ready"]
+
+
+def test_failed_warm_up_step_degrades_but_stays_ready(monkeypatch):
+    registry = make_registry(monkeypatch)
+    client = registry.router.backends[0].client
+    client.generate = lambda **kwargs: None
+
+    def refuse(**kwargs):
+        raise ConnectionError("embed model missing")
+
+    client.embed = refuse
+    monkeypatch.setattr(registry, "vector_store", lambda: None)
+
+    status = registry.warm_up()
+
+    assert status["state"] == "degraded"
+    failed = [name for name, c in status["components"].items() if not c["ok"]]
+    assert failed == ["embeddings@http://ollama-a:11434"]
+    assert registry.readiness()["ready"]
+
+
+def test_unreachable_ollama_is_not_ready(monkeypatch):
+    registry = make_registry(monkeypatch, warmup_on_startup=False)
+
+    def down():
+        raise ConnectionError("refused")
+
+    registry.router.backends[0].client.ps = down
+    report = registry.readiness()
+    assert not report["checks"]["ollama"]["ok"] and not report["ready"]
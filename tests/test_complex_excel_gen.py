@@ -1,27 +1,29 @@
 import sys
 import os
 import asyncio
-from dotenv import load_dotenv
 
-# Add backend to path
+from fastapi import BackgroundTasks
+from openpyxl import load_workbook
+
+# Add backend and the repository root (benchmarks package) to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from main import Rule, generate_excel, Datatype, GenerationRequest
+from benchmarks.fakes import LatencyModel, OfflineRegistry, install
+from models import Rule, Datatype, GenerationRequest
 
 # Mock data
 mock_rules = [
     Rule(
         id="1",
         name="CalcProphyFreq",
-        summary="Prophylaxis is allowed twice per benefit period",
-        condition_text="Prophylaxis (D1110, D1120) is payable twice (2) per benefit period. Frequency is combined.",
-        condition="count(D1110, D1120) <= 2",
+        summary="Prophylaxis (D1110, D1120) is allowed twice per benefit period; frequency is combined",
+        condition="count(D1110, D1120) <= 2 within Benefit Period",
         result="true",
-        source_text="Prophylaxis (D1110, D1120) is payable twice (2) per benefit period.",
+        source_text="Prophylaxis (D1110, D1120) is payable twice (2) per benefit period. Frequency is combined.",
         rule_type="Spreadsheet",
-        related_codes=["D1110", "D1120"],
-        time_period="Benefit Period",
-        category="Frequency"
+        category="Frequency",
+        related_datatypes=["Claim", "History"]
     )
 ]
 
@@ -30,32 +32,17 @@ mock_datatypes = [
     Datatype(name="History", fields=[{"name": "procedures", "type": "Procedure[]"}])
 ]
 
-async def test_generation():
-    print("Starting test generation...")
-    try:
-        request = GenerationRequest(rules=mock_rules, datatypes=mock_datatypes)
-        
-        print(f"Sending request to generate_excel...")
-        
-        # Invoke generate_excel
-        # Note: generate_excel returns a dict with download_url
-        response = await generate_excel(request)
-        
-        print("\nResponse:")
-        print(response)
-        
-        if response and "download_url" in response:
-            print("\nSUCCESS: Generated Excel file.")
-            # We can't easily inspect the file content here without reading it back, 
-            # but success means the LLM generated valid JSON structure.
-        else:
-            print("\nFAILURE: Did not generate Excel file.")
-            
-    except Exception as e:
-        print(f"Error: {e}")
-        import traceback
-        traceback.print_exc()
-
-if __name__ == "__main__":
-    load_dotenv("backend/.env")
-    asyncio.run(test_generation())
+
+def test_generation(tmp_path, monkeypatch):
+    # Recorded model responses instead of a live Ollama; the app writes generated/ into the CWD
+    monkeypatch.chdir(tmp_path)
+    main = install(OfflineRegistry(latency=LatencyModel(time_scale=0), documents=[]))
+    request = GenerationRequest(rules=mock_rules, datatypes=mock_datatypes)
+
+    response = asyncio.run(main.generate_excel(request, BackgroundTasks()))
+
+    assert response["status"] == "success" and response["download_url"] == "/download/OpenL_Rules.xlsx"
+    workbook = load_workbook(os.path.join("generated", "OpenL_Rules.xlsx"))
+    assert workbook.sheetnames == ["Vocabulary", "Rules", "Tests"]
+    # A Spreadsheet-only rule set falls back to generating decision tables for every rule
+    assert any(str(cell.value).startswith("Rules RuleResult") for cell in workbook["Rules"]["A"])
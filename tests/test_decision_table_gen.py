@@ -1,12 +1,16 @@
 import sys
 import os
 import asyncio
-from dotenv import load_dotenv
 
-# Add backend to path
+from fastapi import BackgroundTasks
+from openpyxl import load_workbook
+
+# Add backend and the repository root (benchmarks package) to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from main import Rule, generate_excel, Datatype, GenerationRequest
+from benchmarks.fakes import LatencyModel, OfflineRegistry, install
+from models import Rule, Datatype, GenerationRequest
 
 # Mock data based on user's complex example
 mock_rules = [
@@ -38,30 +42,18 @@ mock_datatypes = [
     Datatype(name="Member", fields=[{"name": "hireDate", "type": "Date"}, {"name": "isLateEntrant", "type": "Boolean"}])
 ]
 
-async def test_generation():
-    print("Starting Decision Table generation test...")
-    try:
-        request = GenerationRequest(rules=mock_rules, datatypes=mock_datatypes)
-        
-        print(f"Sending request to generate_excel...")
-        
-        # Invoke generate_excel
-        response = await generate_excel(request)
-        
-        print("\nResponse:")
-        print(response)
-        
-        if response and "download_url" in response:
-            print("\nSUCCESS: Generated Excel file.")
-            # In a real test we would parse the Excel, but here we rely on the LLM output logs from the backend
-        else:
-            print("\nFAILURE: Did not generate Excel file.")
-            
-    except Exception as e:
-        print(f"Error: {e}")
-        import traceback
-        traceback.print_exc()
 
-if __name__ == "__main__":
-    load_dotenv("backend/.env")
-    asyncio.run(test_generation())
+
+def test_generation(tmp_path, monkeypatch):
+    # Recorded model responses instead of a live Ollama; the app writes generated/ into the CWD
+    monkeypatch.chdir(tmp_path)
+    main = install(OfflineRegistry(latency=LatencyModel(time_scale=0), documents=[]))
+    request = GenerationRequest(rules=mock_rules, datatypes=mock_datatypes)
+
+    response = asyncio.run(main.generate_excel(request, BackgroundTasks()))
+
+    assert response["status"] == "success"
+    workbook = load_workbook(os.path.join("generated", "OpenL_Rules.xlsx"))
+    rule_headers = [str(cell.value) for cell in workbook["Rules"]["A"] if str(cell.value).startswith("Rules ")]
+    assert rule_headers, "no decision tables written to the Rules sheet"
+    assert workbook["Tests"].max_row > 1
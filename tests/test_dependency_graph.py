@@ -0,0 +1,53 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models import Datatype, DatatypeField, IntermediateVariable, Rule
+from services.dependency_graph import DependencyGraph
+
+
+def _datatype(name, *fields):
+    return Datatype(name=name, fields=[DatatypeField(name=f, type=t) for f, t in fields])
+
+
+DATATYPES = [
+    _datatype("Member", ("age", "Integer"), ("hireDate", "Date"), ("salary", "Double")),
+    _datatype("Policy", ("status", "String"), ("effectiveDate", "Date")),
+    _datatype("Claim", ("amount", "Double"), ("diagnosisCode", "String")),
+]
+VARIABLES = [
+    IntermediateVariable(name="tenureYears", type="Integer", logic="dateDif(Member.hireDate, currentDate, 'Y')"),
+    IntermediateVariable(name="isSenior", type="Boolean", logic="tenureYears >= 10"),
+    IntermediateVariable(name="claimTotal", type="Double", logic="Claim.amount * 2"),
+]
+
+
+def test_scope_follows_fields_and_variable_closure():
+    rules = [
+        Rule(id="Rule-01", name="SeniorOnly", summary="s", condition="isSenior == true"),
+        Rule(id="Rule-02", name="ActivePolicy", summary="s", condition='m.status == "Active" && currentDate >= m.effectiveDate'),
+        Rule(id="Rule-03", name="ClaimLimit", summary="s", condition="claimTotal < 1000", related_datatypes=["Policy"]),
+    ]
+    graph = DependencyGraph.from_request(DATATYPES, VARIABLES, rules)
+
+    scope = graph.scope(rules[:1])
+    # isSenior -> tenureYears -> Member.hireDate and currentDate (added to Policy by the vocabulary)
+    assert [v.name for v in scope.variables] == ["tenureYears", "isSenior"]
+    assert scope.datatypes_input == "- Member(hireDate: Date)\n- Policy(currentDate: Date)"
+
+    # Alias paths resolve through the field name; quoted literals are ignored
+    assert graph.scope(rules[1:2]).datatypes_input == "- Policy(status: String, effectiveDate: Date, currentDate: Date)"
+    # A related datatype without referenced fields is included whole
+    scope = graph.scope(rules[2:])
+    assert [d.name for d in scope.datatypes] == ["Policy", "Claim"]
+    assert [f.name for f in scope.datatypes[0].fields] == ["status", "effectiveDate", "currentDate"]
+    assert [f.name for f in scope.datatypes[1].fields] == ["amount"]
+
+
+def test_unresolved_rule_falls_back_to_full_vocabulary():
+    rules = [Rule(id="Rule-01", name="Vague", summary="s", condition="Eligible when conditions are met")]
+    graph = DependencyGraph.from_request(DATATYPES, VARIABLES, rules)
+    scope = graph.scope(rules)
+    assert len(scope.datatypes) == 3 and len(scope.variables) == 3
@@ -0,0 +1,54 @@
+import sys
+import os
+import re
+import json
+import asyncio
+from typing import Any, List
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from langchain_core.language_models.llms import LLM
+
+from models import Rule
+import services.generation_service as generation_service
+from services.generation_service import GenerationService
+
+
+class BatchLLM(LLM):
+    """Echoes the batch's rule ids and a Member datatype with one field per rule."""
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "batch-echo"
+
+    def _call(self, prompt: str, stop: Any = None, **kwargs: Any) -> str:
+        self.prompts.append(prompt)
+        ids = re.findall(r"- id: (Rule-\d+)", prompt)
+        if ids[0] == "Rule-03" and sum(p.count("- id: Rule-03") for p in self.prompts) == 1:
+            return "not json"  # the second batch fails once and is retried on its own
+        return json.dumps({
+            "rules": [{"id": i, "summary": "s"} for i in ids],
+            "datatypes": [{"name": "Member", "fields": [{"name": f"f{i[-2:]}", "type": "Integer"} for i in ids]}],
+            "intermediate_variables": [],
+        })
+
+
+def test_batches_carry_only_their_snippets_and_merge(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(generation_service, "ENRICH_BATCH_SIZE", 2)
+    monkeypatch.setattr(GenerationService, "_get_rag_context", lambda self, query: "")
+    service = GenerationService()
+    service.extraction_llm = BatchLLM()
+
+    text = "\n\n".join(f"Clause {i}: the member clause {i} applies. " + "filler " * 50 for i in range(1, 6))
+    rules = [Rule(id=f"Rule-{i:02d}", name=f"R{i}", summary="s", source_text=f"the member clause {i} applies") for i in range(1, 6)]
+    result = asyncio.run(service.enrich_rules(rules, text, "policy.pdf"))
+
+    assert [r.id for r in result.rules] == [r.id for r in rules]
+    assert [f.name for f in result.datatypes[0].fields] == ["f01", "f02", "f03", "f04", "f05"]
+    assert len(service.extraction_llm.prompts) == 4
+    first = next(p for p in service.extraction_llm.prompts if "- id: Rule-01" in p).split("**Context Text**:")[1].split("**Reference")[0]
+    assert "clause 1 applies" in first and "clause 4 applies" not in first
+    assert service.vocabulary_store.version("policy.pdf") == 1
@@ -0,0 +1,132 @@
+import sys
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.git_service import GitService
+from services.gitlab_client import GitLabClient
+
+
+class FakeGitLab(BaseHTTPRequestHandler):
+    """Just enough of the GitLab v4 API: project lookup and merge requests."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        state = self.state
+        url = urlparse(self.path)
+        state["calls"].append((method, url.path))
+        state["connections"].add(self.client_address)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        if self.headers.get("PRIVATE-TOKEN") != "secret":
+            return self._reply(401, {"message": "401 Unauthorized"})
+        if state["fail_next"]:
+            state["fail_next"] -= 1
+            return self._reply(503, {"message": "busy"})
+        mrs = state["mrs"]
+        if method == "GET" and url.path == "/api/v4/projects/group%2Fopenl-claim":
+            return self._reply(200, {"id": 7})
+        if url.path == "/api/v4/projects/7/merge_requests":
+            if method == "POST":
+                if any(mr["state"] == "opened" and mr["source_branch"] == body["source_branch"] for mr in mrs):
+                    return self._reply(409, {"message": ["Another open merge request already exists"]})
+                mr = {**body, "iid": len(mrs) + 1, "state": "opened", "web_url": f"http://gitlab/mr/{len(mrs) + 1}"}
+                mrs.append(mr)
+                return self._reply(201, mr)
+            query = parse_qs(url.query)
+            return self._reply(200, [mr for mr in mrs if mr["state"] == query["state"][0] and mr["source_branch"] == query["source_branch"][0]])
+        if method == "PUT" and url.path.startswith("/api/v4/projects/7/merge_requests/"):
+            mr = mrs[int(url.path.rsplit("/", 1)[1]) - 1]
+            mr.update(body)
+            return self._reply(200, mr)
+        return self._reply(404, {"message": "404 Not found"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+
+def start_fake_gitlab():
+    state = {"calls": [], "connections": set(), "mrs": [], "fail_next": 0}
+    handler = type("Handler", (FakeGitLab,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def make_service(server, project_id=""):
+    service = GitService()
+    service.api_url = f"http://127.0.0.1:{server.server_address[1]}/api/v4"
+    service.token = "secret"
+    service.project_id = project_id
+    service.branch = "openl-ai-demo"
+    service._run_git = lambda args, cwdir=None: "git@gitlab.example.com:group/openl-claim.git"
+    service._gitlab = GitLabClient(service.api_url, service.token, backoff=0)
+    return service
+
+
+def test_project_and_open_mr_are_cached():
+    server, state = start_fake_gitlab()
+    try:
+        service = make_service(server)
+        assert service._create_merge_request(["A.xlsx"]) == "http://gitlab/mr/1"
+        assert state["calls"] == [("GET", "/api/v4/projects/group%2Fopenl-claim"), ("POST", "/api/v4/projects/7/merge_requests")]
+
+        # Known open MR: a new file is one PUT; republishing the same file costs nothing
+        state["calls"].clear()
+        assert service._create_merge_request(["B.xlsx"]) == "http://gitlab/mr/1"
+        assert service._create_merge_request(["A.xlsx"]) == "http://gitlab/mr/1"
+        assert state["calls"] == [("PUT", "/api/v4/projects/7/merge_requests/1")]
+        assert state["mrs"][0]["description"].splitlines()[-2:] == ["- A.xlsx", "- B.xlsx"]
+        # One pooled connection for everything
+        assert len(state["connections"]) == 1
+
+        # The MR got merged on GitLab: the stale cache entry is dropped and a new MR is opened
+        state["mrs"][0]["state"] = "merged"
+        state["calls"].clear()
+        assert service._create_merge_request(["C.xlsx"]) == "http://gitlab/mr/2"
+        assert state["calls"] == [("PUT", "/api/v4/projects/7/merge_requests/1"), ("POST", "/api/v4/projects/7/merge_requests")]
+    finally:
+        service.close()
+        server.shutdown()
+
+
+def test_existing_mr_and_transient_errors():
+    server, state = start_fake_gitlab()
+    try:
+        # An MR opened elsewhere: 409, then one listing, then the file list is extended
+        state["mrs"].append({"iid": 1, "state": "opened", "source_branch": "openl-ai-demo", "web_url": "http://gitlab/mr/1",
+                             "description": "Automated update from OpenL Assistant.\n\nFiles:\n- A.xlsx"})
+        state["fail_next"] = 2  # the project lookup is retried through two 503s
+        service = make_service(server)
+        assert service._create_merge_request(["B.xlsx"]) == "http://gitlab/mr/1"
+        assert [method for method, _ in state["calls"]] == ["GET", "GET", "GET", "POST", "GET", "PUT"]
+        assert state["mrs"][0]["description"].endswith("- A.xlsx\n- B.xlsx")
+
+        service.token = "wrong"
+        assert service._create_merge_request(["C.xlsx"]) == "Could not determine Project ID."
+    finally:
+        service.close()
+        server.shutdown()
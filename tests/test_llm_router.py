@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from ollama import Client
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.llm_router import LLMRouter, OllamaBackend, RoutedOllamaLLM, RoutedOllamaEmbeddings, NoBackendAvailable
+
+
+def start_stub_ollama(reply: str = "ok", status: int = 200, final: dict = None):
+    """Minimal local Ollama stand-in: /api/generate (NDJSON stream) and /api/embed."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+            calls.append((self.path, body))
+            if status != 200:
+                self.send_response(status)
+                self.end_headers()
+                self.wfile.write(json.dumps({"error": "boom"}).encode())
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            if self.path == "/api/embed":
+                self.wfile.write(json.dumps({"model": body["model"], "embeddings": [[0.1, 0.2]] * len(body["input"])}).encode())
+                return
+            for word in reply.split(" "):
+                self.wfile.write((json.dumps({"model": body["model"], "response": word + " ", "done": False}) + "\n").encode())
+            self.wfile.write((json.dumps({"model": body["model"], "response": "", "done": True, "eval_count": 3, **(final or {})}) + "\n").encode())
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", calls
+
+
+def make_backend(url):
+    return OllamaBackend(url, Client(host=url, timeout=5))
+
+
+def test_least_outstanding_selection():
+    a, b = make_backend("http://a"), make_backend("http://b")
+    router = LLMRouter([a, b])
+    first = router.acquire()
+    second = router.acquire()
+    assert {first.url, second.url} == {"http://a", "http://b"}
+    router.release(first)
+    assert router.acquire() is first
+
+
+def test_retry_on_other_host_and_circuit_opens():
+    bad_server, bad_url, bad_calls = start_stub_ollama(status=500)
+    good_server, good_url, good_calls = start_stub_ollama(reply="hello world")
+    try:
+        now = [0.0]
+        router = LLMRouter([make_backend(bad_url), make_backend(good_url)], failure_threshold=2, cooldown=10, clock=lambda: now[0])
+        llm = RoutedOllamaLLM(base_url=bad_url, model="m", router=router)
+
+        for _ in range(3):
+            # Force the failing host first by keeping the healthy one busy on paper
+            router.backends[1].outstanding += 1
+            assert llm.invoke("hi").strip() == "hello world"
+            router.backends[1].outstanding -= 1
+
+        stats = {s["url"]: s for s in router.stats()}
+        assert stats[bad_url]["state"] == "open"
+        # Two failures tripped the breaker; the third call skipped the bad host entirely
+        assert len(bad_calls) == 2
+        assert len(good_calls) == 3
+
+        now[0] = 11
+        assert router.stats()[0]["state"] == "half_open"
+    finally:
+        bad_server.shutdown()
+        good_server.shutdown()
+
+
+def test_routed_embeddings_and_no_backend():
+    server, url, calls = start_stub_ollama()
+    try:
+        router = LLMRouter([make_backend(url)])
+        emb = RoutedOllamaEmbeddings(base_url=url, model="e", router=router)
+        assert emb.embed_documents(["a", "b"]) == [[0.1, 0.2], [0.1, 0.2]]
+
+        router.backends[0].opened_at = router.clock()
+        try:
+            emb.embed_query("a")
+            assert False, "expected NoBackendAvailable"
+        except NoBackendAvailable:
+            pass
+    finally:
+        server.shutdown()
+
+
+def test_route_models():
+    router = LLMRouter([make_backend("http://a")], route_models={"default": "big", "kraken": "coder", "tests": ""})
+    assert router.model_for("kraken", "big") == "coder"
+    assert router.model_for("tests", "big") == "big"
+    assert router.model_for(None, "fallback") == "big"
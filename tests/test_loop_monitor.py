@@ -0,0 +1,41 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services import tracing
+from services.loop_monitor import LoopMonitor
+
+
+def test_blocking_call_shows_up_as_lag_and_blocked_time():
+    monitor = LoopMonitor(interval=0.01, threshold=0.02, warn_seconds=10)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # a sync call inside a coroutine: nothing else runs meanwhile
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    snapshot = monitor.snapshot()
+
+    assert not snapshot["running"]
+    assert snapshot["ticks"] >= 3
+    assert snapshot["stalls"] >= 1 and snapshot["max_lag_seconds"] >= 0.15
+    assert snapshot["blocked_seconds"] >= 0.15
+    rendered = tracing.render_metrics()
+    assert "openl_event_loop_lag_seconds_count" in rendered
+    assert "openl_event_loop_blocked_seconds_total" in rendered
+
+
+def test_small_lag_is_not_counted_as_blocked():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.observe(0.004)
+    monitor.observe(-0.001)  # timer woke early
+
+    assert monitor.snapshot()["stalls"] == 0 and monitor.blocked_seconds == 0
+    assert monitor.ticks == 2 and monitor.max_lag == 0.004
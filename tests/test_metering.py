@@ -0,0 +1,46 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from test_llm_router import start_stub_ollama, make_backend
+from services import tracing
+from services.llm_router import LLMRouter, RoutedOllamaLLM
+from services.metering import Meter
+from services.token_budget import TokenBudget
+
+
+def test_ollama_statistics_are_metered_per_endpoint_phase_and_template(monkeypatch):
+    meter = Meter()
+    monkeypatch.setattr("services.llm_router.meter", meter)
+    usage = {
+        "prompt_eval_count": 4000, "eval_count": 90, "done_reason": "stop",
+        "prompt_eval_duration": 3_000_000_000, "eval_duration": 1_000_000_000, "total_duration": 4_200_000_000,
+    }
+    server, url, _ = start_stub_ollama(reply="ok", final=usage)
+    try:
+        llm = RoutedOllamaLLM(base_url=url, model="m", router=LLMRouter([make_backend(url)]))
+        budget = TokenBudget()
+        with tracing.span("http.request", method="POST", path="/generate-excel"):
+            # 4000 + 90 tokens in a 4096 window: the prompt was (almost) cut
+            budget.plan("names", "{cases}", {"cases": "a => b"}).bind(llm).invoke("x")
+            with tracing.span("pipeline.decision_tables", phase="decision"):
+                budget.plan("decision", "{rules}", {"rules": "r" * 30000}).bind(llm).invoke("y")
+                llm.invoke("z")  # no budget plan: metered under the enclosing phase
+    finally:
+        server.shutdown()
+
+    by_phase = {row["phase"]: row for row in meter.summary(["endpoint", "phase"])}
+    assert set(by_phase) == {"names", "decision"}
+    assert by_phase["decision"]["endpoint"] == "/generate-excel"
+    assert by_phase["decision"]["calls"] == 2
+    assert by_phase["decision"]["prompt_tokens"] == 8000
+    assert by_phase["decision"]["prefill_share"] == 0.75
+    assert by_phase["decision"]["decode_tokens_per_second"] == 90.0
+    assert len(meter.summary(["template"])) == 3  # two templates plus the unplanned call
+
+    flagged = meter.calls(flagged=True)
+    assert [(c["phase"], c["num_ctx"], c["context_limit"]) for c in flagged] == [("names", 4096, True)]
+    assert meter.calls(limit=1)[0]["template"] == ""
+    assert tracing.metrics.render().count('openl_llm_limit_hits_total{phase="names",limit="context"}') == 1
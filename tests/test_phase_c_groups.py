@@ -0,0 +1,91 @@
+import sys
+import os
+import asyncio
+import threading
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models import Rule, Datatype, DatatypeField
+import services.generation_service as generation_service
+from services.dependency_graph import DependencyGraph
+from services.generation_service import GenerationService
+
+
+def table(rule: Rule, rows=True) -> dict:
+    return {"header": f"Rules RuleResult {rule.name}(Member m)", **({"rows": [["C1", "RET1"]]} if rows else {})}
+
+
+def make_service(monkeypatch, respond):
+    """Service whose Phase C call is `respond(rules, attempt)`; records every call."""
+    monkeypatch.setattr(generation_service, "PHASE_C_GROUP_SIZE", 2)
+    monkeypatch.setattr(generation_service, "PHASE_C_MAX_RETRIES", 2)
+    service = GenerationService.__new__(GenerationService)
+    calls = []
+    lock = threading.Lock()
+
+    def invoke(rules, datatypes_input, variables_text, context):
+        with lock:
+            attempt = sum(1 for c in calls if c == [r.id for r in rules])
+            calls.append([r.id for r in rules])
+        return respond(rules, attempt)
+
+    service._invoke_decision_tables = invoke
+    return service, calls
+
+
+def rules(count):
+    return [Rule(id=f"R{i}", name=f"Check{i}", summary="s", condition="m.age > 1", rule_type="DecisionTable") for i in range(1, count + 1)]
+
+
+def graph():
+    return DependencyGraph([Datatype(name="Member", fields=[DatatypeField(name="age", type="Integer")])], [])
+
+
+def test_groups_run_separately_and_merge_in_rule_order(monkeypatch):
+    service, calls = make_service(monkeypatch, lambda group, attempt: {"tables": [table(r) for r in group]})
+    result = asyncio.run(service._generate_decision_tables(rules(5), graph(), ""))
+
+    assert [[r.id for r in group] for group, _ in result] == [["R1", "R2"], ["R3", "R4"], ["R5"]]
+    assert [t["header"] for _, tables in result for t in tables] == [table(r)["header"] for r in rules(5)]
+    assert sorted(calls) == [["R1", "R2"], ["R3", "R4"], ["R5"]]
+
+
+def test_only_the_failed_group_is_retried_and_the_valid_retry_wins(monkeypatch):
+    def respond(group, attempt):
+        if group[0].id == "R3" and attempt == 0:
+            # Right number of tables, one unusable: the retry must replace all of them
+            return {"tables": [table(group[0]), table(group[1], rows=False)]}
+        return {"tables": [table(r) for r in group]}
+
+    service, calls = make_service(monkeypatch, respond)
+    result = asyncio.run(service._generate_decision_tables(rules(4), graph(), ""))
+
+    assert calls.count(["R3", "R4"]) == 2 and calls.count(["R1", "R2"]) == 1
+    assert all("rows" in t for _, tables in result for t in tables)
+
+
+def test_single_group_is_retried_too(monkeypatch):
+    responses = iter(["not json", {"tables": []}])
+
+    def respond(group, attempt):
+        answer = next(responses, None)
+        if answer == "not json":
+            raise ValueError("unparseable")
+        return answer or {"tables": [table(r) for r in group]}
+
+    service, calls = make_service(monkeypatch, respond)
+    result = asyncio.run(service._generate_decision_tables(rules(2), graph(), ""))
+
+    assert calls == [["R1", "R2"]] * 3
+    assert len(result) == 1 and len(result[0][1]) == 2
+
+
+def test_most_tables_kept_when_every_attempt_fails(monkeypatch):
+    def respond(group, attempt):
+        return {"tables": [table(group[0])] if attempt != 1 else [table(group[0]), table(group[1], rows=False)]}
+
+    service, calls = make_service(monkeypatch, respond)
+    result = asyncio.run(service._generate_decision_tables(rules(2), graph(), ""))
+
+    assert len(calls) == 3 and len(result[0][1]) == 2
@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import time
+import pstats
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.profiling import ProfileStore, ProfilingMiddleware
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(200))
+    return total
+
+
+def make_app(store):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=store)
+
+    @app.post("/generate-excel")
+    async def generate():
+        # Work handed to a thread must show up in the sampled profile
+        await asyncio.to_thread(busy_loop, 0.2)
+        return {"ok": True}
+
+    return app
+
+
+def test_profiles_only_flagged_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.profiling.PROFILING_ENABLED", True)
+    monkeypatch.setattr("services.profiling.PROFILING_TOKEN", "s3cret")
+    store = ProfileStore(str(tmp_path / "profiles"), max_files=2)
+    client = TestClient(make_app(store), headers={"X-Profile-Token": "s3cret"})
+
+    plain = client.post("/generate-excel")
+    assert plain.status_code == 200 and "x-profile-id" not in plain.headers
+    assert store.list() == []
+
+    sampled = client.post("/generate-excel", headers={"X-Profile": "sample"})
+    profile_id = sampled.headers["x-profile-id"]
+    meta = store.get(profile_id)
+    assert meta["mode"] == "sample" and meta["path"] == "/generate-excel" and meta["status"] == 200
+    assert meta["samples"] > 0
+    assert any(spot["function"] == "busy_loop" for spot in meta["hot_spots"])
+    with open(store.data_path(profile_id)) as f:
+        speedscope = json.load(f)
+    names = [frame["name"] for frame in speedscope["shared"]["frames"]]
+    assert "busy_loop" in names and speedscope["profiles"][0]["type"] == "sampled"
+
+    deterministic = client.post("/generate-excel?profile=cprofile")
+    stats = pstats.Stats(store.data_path(deterministic.headers["x-profile-id"]))
+    assert any(func[2] == "generate" for func in stats.stats)
+
+    # Oldest profiles are dropped past max_files
+    client.post("/generate-excel", headers={"X-Profile": "cprofile"})
+    assert len(store.list()) == 2 and store.get(profile_id) is None
+
+
+def test_token_is_required(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.profiling.PROFILING_ENABLED", True)
+    store = ProfileStore(str(tmp_path / "profiles"))
+    client = TestClient(make_app(store))
+    # Enabled without a configured token: nobody can profile
+    assert "x-profile-id" not in client.post("/generate-excel", headers={"X-Profile": "sample", "X-Profile-Token": ""}).headers
+
+    monkeypatch.setattr("services.profiling.PROFILING_TOKEN", "s3cret")
+    assert "x-profile-id" not in client.post("/generate-excel", headers={"X-Profile": "sample", "X-Profile-Token": "wrong"}).headers
+    assert "x-profile-id" not in client.post("/generate-excel", headers={"X-Profile": "sample"}).headers
+    assert "x-profile-id" in client.post("/generate-excel", headers={"X-Profile": "sample", "X-Profile-Token": "s3cret"}).headers
+
+    monkeypatch.setattr("services.profiling.PROFILING_ENABLED", False)
+    assert "x-profile-id" not in client.post("/generate-excel", headers={"X-Profile": "sample", "X-Profile-Token": "s3cret"}).headers
@@ -0,0 +1,39 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models import Datatype, DatatypeField, Rule
+from services.prompt_encoding import compact_json, encode_conditions, encode_datatypes, encode_rules, report_savings
+
+
+def test_rules_drop_defaults_and_nulls(caplog):
+    rules = [
+        Rule(id="Rule-01", name="CheckAge", summary="Member must be\n  under 65", condition="Member.age < 65"),
+        Rule(id="Rule-02", summary="Active policy only", rule_type="DecisionTable", related_datatypes=["Policy"]),
+    ]
+    assert encode_rules(rules).splitlines() == [
+        "- id: Rule-01 | name: CheckAge | summary: Member must be under 65 | condition: Member.age < 65",
+        "- id: Rule-02 | summary: Active policy only | rule_type: DecisionTable | related_datatypes: Policy",
+    ]
+    assert encode_rules(rules, ["id", "condition"]).splitlines()[1] == "- id: Rule-02"
+    assert encode_conditions(rules) == "- Rule-01 CheckAge: Member.age < 65\n- Rule-02: Active policy only"
+
+    with caplog.at_level("DEBUG", logger="services.prompt_encoding"):
+        saved = report_savings("enrichment", {"rules": (lambda: str([r.model_dump() for r in rules]), encode_rules(rules))})
+    assert saved["rules"] > 0
+
+    # Without DEBUG logging the verbose form is never built
+    def verbose():
+        raise AssertionError("verbose prompt built with DEBUG disabled")
+    with caplog.at_level("INFO", logger="services.prompt_encoding"):
+        assert report_savings("enrichment", {"rules": (verbose, encode_rules(rules))}) == {}
+
+
+def test_datatypes_and_tables_are_compact():
+    policy = Datatype(name="Policy", fields=[DatatypeField(name="effectiveDate", type="Date"), DatatypeField(name="status", type="String")])
+    assert encode_datatypes([policy]) == "- Policy(effectiveDate: Date, status: String)"
+    # Cached enrichment results are plain dicts
+    assert encode_datatypes([policy.model_dump()], types=False) == "- Policy(effectiveDate, status)"
+    assert compact_json({"tables": [{"header": "Rules X", "rows": [["", "a"]]}]}) == '{"tables":[{"header":"Rules X","rows":[["","a"]]}]}'
@@ -0,0 +1,109 @@
+import sys
+import os
+import asyncio
+import subprocess
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.git_service import GitService
+from services.publish_jobs import PublishQueue
+
+
+def git(*args, cwd):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def make_repo(tmp_path):
+    """A bare 'origin' and a clone on the publish branch, like the openl-claim checkout."""
+    origin = tmp_path / "origin.git"
+    clone = tmp_path / "clone"
+    git("init", "--bare", "-b", "main", str(origin), cwd=tmp_path)
+    git("clone", str(origin), str(clone), cwd=tmp_path)
+    for key, value in (("user.name", "test"), ("user.email", "test@example.com")):
+        git("config", key, value, cwd=clone)
+    (clone / "README.md").write_text("rules\n")
+    git("add", "README.md", cwd=clone)
+    git("commit", "-m", "init", cwd=clone)
+    git("push", "origin", "HEAD:main", cwd=clone)
+    git("checkout", "-b", "openl-ai-demo", cwd=clone)
+    git("push", "origin", "openl-ai-demo", cwd=clone)
+    return origin, clone
+
+
+def make_service(clone):
+    service = GitService()
+    service.repo_dir = str(clone)
+    service.target_dir = str(clone / "rules")
+    service.branch = "openl-ai-demo"
+    service.token = ""
+    service.worktree_root = str(clone.parent / "worktrees")
+    return service
+
+
+def test_jobs_publish_in_background(tmp_path):
+    origin, clone = make_repo(tmp_path)
+    workbooks = []
+    for name in ("A.xlsx", "B.xlsx"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        workbooks.append(path)
+
+    async def scenario():
+        queue = PublishQueue(make_service(clone), staging_dir=str(tmp_path / "staging"), coalesce_seconds=0)
+        jobs = [queue.submit(str(path), path.name) for path in workbooks]
+        # Submitting returns immediately; the caller may delete its file right away
+        assert all(job.status == "queued" for job in jobs)
+        for path in workbooks:
+            path.unlink()
+        await queue.join()
+        await queue.close()
+        return jobs
+
+    jobs = asyncio.run(scenario())
+    assert [job.status for job in jobs] == ["success", "success"]
+    assert jobs[0].to_dict()["mr_url"] == "No Git Token configured."
+    assert git("ls-tree", "--name-only", "openl-ai-demo", "rules/", cwd=origin).splitlines() == ["rules/A.xlsx", "rules/B.xlsx"]
+    assert os.listdir(tmp_path / "staging") == []
+
+
+def test_jobs_in_window_share_one_commit(tmp_path):
+    origin, clone = make_repo(tmp_path)
+    commits_before = int(git("rev-list", "--count", "openl-ai-demo", cwd=origin))
+    service = make_service(clone)
+    calls = []
+    publish_files = service.publish_files
+
+    async def spy(files, delete_after=True):
+        calls.append([name for _, name in files])
+        return await publish_files(files, delete_after=delete_after)
+
+    service.publish_files = spy
+
+    async def scenario():
+        queue = PublishQueue(service, staging_dir=str(tmp_path / "staging"), coalesce_seconds=0.5)
+        jobs = []
+        for name in ("A.xlsx", "B.xlsx", "A.xlsx", "C.xlsx"):
+            path = tmp_path / name
+            path.write_bytes(f"{name} {len(jobs)}".encode())
+            jobs.append(queue.submit(str(path), name))
+            await asyncio.sleep(0.05)
+        await queue.join()
+        await queue.close()
+        return jobs
+
+    jobs = asyncio.run(scenario())
+    assert calls == [["A.xlsx", "B.xlsx", "A.xlsx", "C.xlsx"]]
+    assert [job.status for job in jobs] == ["success"] * 4
+    assert jobs[0].to_dict()["batch_files"] == ["A.xlsx", "B.xlsx", "C.xlsx"]
+    assert int(git("rev-list", "--count", "openl-ai-demo", cwd=origin)) == commits_before + 1
+    assert git("log", "-1", "--format=%B", "openl-ai-demo", cwd=origin).splitlines() == [
+        "Update OpenL rules: 3 workbooks", "", "- A.xlsx", "- B.xlsx", "- C.xlsx"
+    ]
+    # The later copy of A.xlsx is the one committed
+    assert git("show", "openl-ai-demo:rules/A.xlsx", cwd=origin) == "A.xlsx 2"
+
+
+def test_mr_description_accumulates_files():
+    description = GitService._mr_description(["A.xlsx", "B.xlsx"])
+    assert GitService._mr_description(["B.xlsx", "C.xlsx"], description).splitlines()[-3:] == ["- A.xlsx", "- B.xlsx", "- C.xlsx"]
@@ -0,0 +1,107 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models import Datatype, DatatypeField
+from services.rule_evaluator import RuleEvaluator
+from services.rule_tests import RuleTestSynthesizer
+
+datatypes = [
+    Datatype(name="Member", fields=[
+        DatatypeField(name="age", type="Integer"),
+        DatatypeField(name="status", type="String"),
+        DatatypeField(name="hireDate", type="Date"),
+        DatatypeField(name="termDate", type="Date"),
+    ]),
+]
+
+tenure = {
+    "header": "Rules RuleResult CheckTenure(Member m)",
+    "rows": [
+        ["C1", "C2", "RET1"],
+        ['dateDif(m.hireDate, m.termDate, "M") >= minMonths', "m.age", "result"],
+        ["Integer minMonths", "IntRange ages", ""],
+        ["Min Months", "Ages", "Result"],
+        ["6", "18-65", '= new RuleResult("Rule-02", "Eligible", "Tenure met")'],
+        ["", "", '= new RuleResult("Rule-02", "Not-Eligible", "Tenure not met")'],
+    ],
+}
+
+smart = {
+    "header": "SmartRules RuleResult CheckStatus(Member m)",
+    "rows": [
+        ["Status", "Age", "Result"],
+        ["Active, Pending", ">= 18", '= new RuleResult("Rule-03", "Eligible", "Status ok")'],
+        ["", "", '= new RuleResult("Rule-03", "Not-Eligible", "Status not ok")'],
+    ],
+}
+
+
+def test_failing_cases_are_reported():
+    tests = [
+        {"header": "Test CheckTenure CheckTenureTest", "rows": [
+            ["_id_", "ID", "T1", "T2", "T3"],
+            ["m.hireDate", "Hire Date", "2024-01-31", "2024-01-31", "2024-01-31"],
+            ["m.termDate", "Term Date", "2024-07-31", "2024-07-30", "2024-07-31"],
+            ["m.age", "Age", "30", "30", "70"],
+            ["_res_.status", "Expected Status", "Eligible", "Not-Eligible", "Eligible"],
+        ]},
+        # Horizontal layout
+        {"header": "Test CheckStatus CheckStatusTest", "rows": [
+            ["_id_", "m.status", "m.age", "_res_.status"],
+            ["1", "Pending", "18", "Eligible"],
+            ["2", "Other", "40", "Not-Eligible"],
+        ]},
+        {"header": "Test Missing MissingTest", "rows": [["_id_", "ID", "T1"]]},
+    ]
+    report = RuleEvaluator(datatypes).evaluate([tenure, smart], tests)
+
+    assert report["cases"] == 5 and report["passed"] == 4
+    assert report["failed"] == [{
+        "test": "Test CheckTenure CheckTenureTest", "case": "T3", "fired_row": 2,
+        "mismatches": {"_res_.status": {"expected": "Eligible", "actual": "Not-Eligible"}},
+    }]
+    assert [u["table"] for u in report["unsupported"]] == ["Missing"]
+
+
+def test_synthesized_tests_pass():
+    table = {
+        "header": "Rules RuleResult CheckAge(Member m)",
+        "rows": [
+            ["C1", "C2", "RET1"],
+            ["m.age >= minAge", "m.status == s", "result"],
+            ["Integer minAge", "String s", ""],
+            ["Min Age", "Status", "Result"],
+            ["18", "Active", '= new RuleResult("Rule-01", "Eligible", "Adult")'],
+            ["", "Active", '= new RuleResult("Rule-01", "Not-Eligible", "Minor")'],
+        ],
+    }
+    tests, _ = RuleTestSynthesizer(datatypes).synthesize([table])
+    report = RuleEvaluator(datatypes).evaluate([table], tests)
+    assert report["cases"] == len(tests[0]["rows"][0]) - 2 and report["failed"] == []
+
+
+def test_evaluation_errors_mark_the_table_unsupported():
+    # "TBD" cannot be parsed as a date; the table is skipped instead of failing the report
+    hire = {
+        "header": "Rules RuleResult CheckHire(Member m)",
+        "rows": [
+            ["C1", "RET1"],
+            ['m.hireDate >= "TBD"', "result"],
+            ["Boolean started", ""],
+            ["Started", "Result"],
+            ["true", '= new RuleResult("Rule-04", "Eligible", "Started")'],
+            ["", '= new RuleResult("Rule-04", "Not-Eligible", "Not started")'],
+        ],
+    }
+    tests = [{"header": "Test CheckHire CheckHireTest", "rows": [
+        ["_id_", "m.hireDate", "_res_.status"],
+        ["1", "2024-01-31", "Eligible"],
+    ]}]
+    report = RuleEvaluator(datatypes).evaluate([hire, tenure], tests)
+
+    assert report["cases"] == 0
+    assert [u["table"] for u in report["unsupported"]] == ["CheckHire"]
+    assert "ValueError" in report["unsupported"][0]["reason"]
@@ -0,0 +1,108 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from langchain_core.language_models.fake import FakeListLLM
+
+from models import Datatype, DatatypeField, Rule
+import services.generation_service as generation_service
+from services.generation_service import GenerationService
+from services.rule_tests import RuleTestSynthesizer
+
+datatypes = [
+    Datatype(name="Member", fields=[
+        DatatypeField(name="age", type="Integer"),
+        DatatypeField(name="status", type="String"),
+        DatatypeField(name="hireDate", type="Date"),
+    ]),
+    Datatype(name="Policy", fields=[DatatypeField(name="effectiveDate", type="Date")]),
+]
+
+eligibility = {
+    "header": "Rules RuleResult CheckEligibility(Member m, Policy policy)",
+    "rows": [
+        ["C1", "C2", "C3", "RET1"],
+        ["m.age >= minAge", "m.status == s", "(m.hireDate > policy.effectiveDate + 30) == checkHire", "result"],
+        ["Integer minAge", "String s", "Boolean checkHire", ""],
+        ["Min Age", "Status", "Hired After Waiting", "Result"],
+        ["18", "Active", "TRUE", '= new RuleResult("Rule-01", "Eligible", "Adult active member")'],
+        ["", "", "", '= new RuleResult("Rule-01", "Not-Eligible", "Requirements not met")'],
+    ],
+}
+
+
+def as_cases(test):
+    rows = {r[0]: r[2:] for r in test["rows"]}
+    return [{k: v[i] for k, v in rows.items()} for i in range(len(rows["_id_"]))]
+
+
+def test_rows_and_boundaries_have_consistent_expectations():
+    tests, unsupported = RuleTestSynthesizer(datatypes).synthesize([eligibility])
+    assert unsupported == []
+    test = tests[0]
+    assert test["header"] == "Test CheckEligibility CheckEligibilityTest"
+    cases = as_cases(test)
+
+    eligible = [c for c in cases if c["_res_.status"] == "Eligible"]
+    assert len(eligible) == 1
+    assert eligible[0]["m.age"] == "18"
+    assert eligible[0]["m.status"] == "Active"
+    assert eligible[0]["m.hireDate"] == "2024-02-01"
+    assert eligible[0]["policy.effectiveDate"] == "2024-01-01"
+
+    # One boundary case per condition column falls through to the catch-all row
+    boundaries = {(c["m.age"], c["m.status"], c["m.hireDate"]) for c in cases if "not met" in c["_description_"]}
+    assert boundaries == {("17", "Active", "2024-02-01"), ("18", "Other", "2024-02-01"), ("18", "Active", "2024-01-31")}
+    assert all(c["_res_.message"] == "Requirements not met" for c in cases if c["_res_.status"] == "Not-Eligible")
+
+
+tenure = {
+    "header": "Rules RuleResult CheckTenure(Member m)",
+    "rows": [
+        ["C1", "RET1"],
+        ['dateDif(m.hireDate, m.termDate, "D") > minDays', "result"],
+        ["Integer minDays", ""],
+        ["Min Days", "Result"],
+        ["30", '= new RuleResult("Rule-02", "Eligible", "Tenure met")'],
+    ],
+}
+
+
+def test_unparseable_tables_are_reported():
+    tests, unsupported = RuleTestSynthesizer(datatypes).synthesize([tenure, "junk"])
+    assert tests == [] and unsupported == [tenure]
+
+
+def test_default_mode_sends_only_unparseable_tables_to_the_llm(monkeypatch):
+    monkeypatch.setattr(generation_service, "TEST_NARRATIVE_NAMES", False)
+    service = GenerationService.__new__(GenerationService)
+    sent = []
+
+    def llm_tests(rules, tables_by_rule, unattributed, datatypes_input, cache_stats):
+        sent.append(tables_by_rule)
+        return [{"header": "Test CheckTenure CheckTenureTest", "rows": [["_id_", "_description_", "T1"]]}]
+
+    service._generate_tests_llm = llm_tests
+    rules = [Rule(id="Rule-01", summary="s"), Rule(id="Rule-02", summary="s")]
+    tests = service._generate_tests(rules, {"Rule-01": [eligibility], "Rule-02": [tenure]}, [], datatypes, "", {})
+
+    assert generation_service.TEST_GENERATION_MODE == "hybrid"
+    assert sent == [{"Rule-02": [tenure]}]
+    assert [t["header"] for t in tests] == ["Test CheckEligibility CheckEligibilityTest", "Test CheckTenure CheckTenureTest"]
+
+
+def test_narrative_names_tolerate_ragged_llm_rows():
+    service = GenerationService.__new__(GenerationService)
+    service.tests_llm = FakeListLLM(responses=['{"names": {"CheckTenure": {"T1": "Long tenure", "T2": "Short"}}}'])
+    ragged = {"header": "Test CheckTenure CheckTenureTest", "rows": [
+        ["_id_", "_description_", "T1", "T2"],
+        ["_description_", "", "case 1"],
+        ["m.hireDate", "Member hire date", "2020-01-01", "2024-01-01"],
+        ["_res_.status", "Status"],
+    ]}
+
+    service._name_test_cases([ragged])
+
+    assert ragged["rows"][1] == ["_description_", "", "Long tenure"]
@@ -0,0 +1,81 @@
+import sys
+import os
+import io
+import json
+import queue
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services import structured_logging
+from services import tracing
+
+
+def test_requests_log_their_id_and_truncated_payloads(monkeypatch):
+    monkeypatch.setattr(structured_logging, "LOG_PAYLOAD_CHARS", 20)
+    stream = io.StringIO()
+    structured_logging.configure_logging(level="DEBUG", fmt="json", stream=stream)
+    logger = logging.getLogger("openl.test")
+    app = FastAPI()
+    app.add_middleware(structured_logging.RequestIdMiddleware, sample_rate=0)
+    app.add_middleware(tracing.TracingMiddleware)
+
+    @app.get("/kraken")
+    def kraken():
+        structured_logging.log_payload(logger, "[KRAKEN] Prompt", "x" * 1000)
+        return {"ok": True}
+
+    try:
+        client = TestClient(app)
+        response = client.get("/kraken", headers={"X-Request-ID": "req-42"})
+        generated = client.get("/kraken").headers["x-request-id"]
+    finally:
+        structured_logging.shutdown_logging()
+
+    assert response.headers["x-request-id"] == "req-42" and generated and generated != "req-42"
+    records = [r for r in map(json.loads, stream.getvalue().splitlines()) if r["logger"] == "openl.test"]
+    first = records[0]
+    assert first["request_id"] == "req-42" and first["logger"] == "openl.test"
+    assert first["payload_chars"] == 1000 and first["payload_truncated"] is True
+    assert first["message"] == "[KRAKEN] Prompt (1000 chars): " + "x" * 20 + "... [980 more chars]"
+    assert records[1]["request_id"] == generated
+    # The trace of the request carries the same ID
+    assert tracing.recent_traces(2)[1]["spans"][-1]["attrs"]["request_id"] == "req-42"
+
+
+def test_sampled_request_logs_full_payload_and_disabled_level_formats_nothing():
+    stream = io.StringIO()
+    structured_logging.configure_logging(level="INFO", fmt="text", stream=stream)
+    logger = logging.getLogger("openl.test")
+
+    class Loud:
+        def __str__(self):
+            raise AssertionError("payload formatted although DEBUG is off")
+
+    try:
+        structured_logging.log_payload(logger, "skipped", Loud())
+        tokens = structured_logging.bind_request_id("abc", sampled=True)
+        try:
+            structured_logging.log_payload(logger, "result", "y" * 2000, level=logging.INFO)
+        finally:
+            structured_logging.reset_request_id(tokens)
+    finally:
+        structured_logging.shutdown_logging()
+
+    line = stream.getvalue().strip()
+    assert "[abc] openl.test: result (2000 chars): " + "y" * 2000 in line
+    assert "more chars" not in line
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = structured_logging.NonBlockingQueueHandler(queue.Queue(1))
+    before = structured_logging.LOG_DROPPED.value()
+    record = logging.LogRecord("openl.test", logging.INFO, __file__, 1, "%s", ("hello",), None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.queue.qsize() == 1 and handler.queue.get_nowait().msg == "hello"
+    assert structured_logging.LOG_DROPPED.value() == before + 1
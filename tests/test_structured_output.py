@@ -0,0 +1,36 @@
+import sys
+import os
+import json
+
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from test_llm_router import start_stub_ollama, make_backend
+from services.llm_router import LLMRouter, RoutedOllamaLLM
+from services.structured_output import TABLES_SCHEMA, TolerantJsonOutputParser, parse_json, structured
+
+
+def test_tolerant_parser_recovers_common_llm_output():
+    fenced = 'Here you go:\n```json\n{"tables": [{"header": "X", "rows": [["a", "b"],],}]}\n```\nLet me know {if} needed.'
+    assert parse_json(fenced) == {"tables": [{"header": "X", "rows": [["a", "b"]]}]}
+    # Python literals and braces inside strings
+    assert parse_json('[{"a": True, "b": None, "c": "} ]"}]') == [{"a": True, "b": None, "c": "} ]"}]
+    # Skips an invalid span, then closes output truncated mid-string
+    assert parse_json('noise {bad} then {"tables": [{"header": "Y \\" q", "rows": [["1", "ab') == {
+        "tables": [{"header": 'Y " q', "rows": [["1", "ab"]]}]
+    }
+    with pytest.raises(ValueError):
+        parse_json("no json here")
+
+
+def test_schema_is_sent_as_ollama_format():
+    server, url, calls = start_stub_ollama(reply='{"tables": []}')
+    try:
+        llm = RoutedOllamaLLM(base_url=url, model="m", router=LLMRouter([make_backend(url)]))
+        chain = structured(llm, TABLES_SCHEMA) | TolerantJsonOutputParser()
+        assert chain.invoke("generate") == {"tables": []}
+        assert calls[0][1]["format"] == TABLES_SCHEMA
+    finally:
+        server.shutdown()
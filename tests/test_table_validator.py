@@ -0,0 +1,97 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models import Datatype, DatatypeField, Rule
+from services.dependency_graph import DependencyGraph
+from services.prompt_encoding import encode_datatypes
+from services.table_validator import TableValidator
+from services.vocabulary import openl_datatypes
+
+validator = TableValidator(
+    [Datatype(name="Member", fields=[DatatypeField(name="age", type="Integer"), DatatypeField(name="status", type="String")])],
+    known_rules={"CheckAge"},
+)
+
+valid_rule = {
+    "header": "Rules RuleResult CheckAge(Member m)",
+    "rows": [
+        ["C1", "C2", "RET1"],
+        ["m.age >= minAge", "m.status == s", "result"],
+        ["Integer minAge", "String s", ""],
+        ["Min Age", "Status", "Result"],
+        ["18", "", '= new RuleResult("Rule-01", "Eligible", "Adult")'],
+    ],
+}
+
+
+def test_well_formed_tables_pass():
+    assert validator.validate(valid_rule) == []
+    assert validator.validate({"header": "Datatype Member", "rows": [["Integer", "age"], ["String", "status"]]}) == []
+    assert validator.validate({"header": "Test CheckAge CheckAgeTest", "rows": [["_id_", "ID", "T1"], ["m.age", "Age", "18"]]}) == []
+
+
+def test_string_literals_are_not_checked_as_code():
+    def rule(expression):
+        return {**valid_rule, "rows": [valid_rule["rows"][0], [expression, "m.status == s", "result"], *valid_rule["rows"][2:]]}
+
+    assert validator.validate(rule('m.status == "member\'s plan" && m.age >= minAge')) == []
+    assert validator.validate(rule('m.status == "see dateAdd OR addDays" && m.age >= minAge')) == []
+    assert validator.validate(rule("m.status == 'A' && m.age >= minAge")) == ["C1: use double quotes, not single quotes"]
+
+
+def test_problems_are_reported_per_table():
+    broken = {
+        "header": "Rules RuleResult CheckAge(Member m)",
+        "rows": [
+            ["C1", "X2", "RET1"],
+            ["m.agee >= minAge", "m.status == 'A' OR m.age > 3", "result"],
+            ["Integer m", "String", ""],
+            ["Min Age", "Status", "Result"],
+            ["Any", "", "True"],
+            ["1", "2"],
+        ],
+    }
+    errors = validator.validate(broken)
+    expected_fragments = [
+        "row 6 has 2 cells",
+        "invalid column markers ['X2']",
+        "`Member` has no field `agee`",
+        "collides with a header parameter",
+        "must be `= new RuleResult",
+        "use an empty cell for 'any'",
+    ]
+    for fragment in expected_fragments:
+        assert any(fragment in e for e in errors), fragment
+
+    assert validator.validate({"header": "Datatype Member String", "rows": [["List<String>", "Tags"]]}) == [
+        "header `Datatype Member String` must be `Datatype <Name>` (no return type)",
+        "row 1: use `Type[]` instead of `List<String>`",
+        "row 1: field name `Tags` must be camelCase",
+    ]
+    assert validator.invalid([valid_rule, {"header": "Test Other OtherTest", "rows": [["_id_"]]}]) == {1: ["test targets unknown rule `Other`"]}
+
+
+def test_validator_accepts_what_the_prompt_lists():
+    raw = [
+        Datatype(name="Member", fields=[DatatypeField(name="member_id", type="string")]),
+        Datatype(name="Policy", fields=[DatatypeField(name="Effective Date", type="date")]),
+    ]
+    rules = [Rule(id="R1", summary="s", condition="dateDif(policy.effectiveDate, policy.currentDate, \"D\") > 30")]
+    datatypes = openl_datatypes(raw, rules)
+    graph = DependencyGraph(datatypes, [], rules)
+    table = {
+        "header": "Rules RuleResult CheckWaiting(Member m, Policy policy)",
+        "rows": [
+            ["C1", "C2", "RET1"],
+            ['dateDif(policy.effectiveDate, policy.currentDate, "D") > days', "m.memberId != id", "result"],
+            ["Integer days", "String id", ""],
+            ["Days", "Member", "Result"],
+            ["30", "", '= new RuleResult("R1", "Eligible", "Waited")'],
+        ],
+    }
+
+    assert encode_datatypes(datatypes) == "- Member(memberId: String)\n- Policy(effectiveDate: Date, currentDate: Date)"
+    assert TableValidator(graph.datatypes).validate(table) == []
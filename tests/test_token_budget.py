@@ -0,0 +1,62 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from test_llm_router import start_stub_ollama, make_backend
+from services.llm_router import LLMRouter, RoutedOllamaLLM
+from services.token_budget import TRUNCATION_MARKER, TokenBudget
+
+
+def test_low_priority_segments_are_trimmed_first():
+    budget = TokenBudget(max_ctx=16384, margin=0)
+    inputs = {
+        "rules": "rule line\n" * 200,
+        "context": "rag paragraph\n\n" * 5000,
+        "text": "source text\n" * 100,
+    }
+    plan = budget.plan("decision", "Rules:\n{rules}\nContext:\n{context}\nText:\n{text}", inputs, priorities={"context": 1, "text": 2})
+    assert plan.inputs["rules"] == inputs["rules"]
+    assert plan.inputs["text"] == inputs["text"]
+    assert plan.inputs["context"].endswith(TRUNCATION_MARKER)
+    assert set(plan.trimmed) == {"context"}
+    assert plan.prompt_tokens + plan.num_predict <= 16384
+
+    small = budget.plan("names", "{cases}", {"cases": "a => b"})
+    assert small.num_ctx == 4096 and not small.trimmed
+
+
+def test_num_ctx_and_num_predict_reach_ollama_options():
+    server, url, calls = start_stub_ollama(reply="ok")
+    try:
+        llm = RoutedOllamaLLM(base_url=url, model="m", temperature=0, router=LLMRouter([make_backend(url)]))
+        plan = TokenBudget(max_ctx=65536).plan("decision", "{rules}", {"rules": "x" * 30000})
+        assert plan.num_ctx == 16384
+        assert plan.bind(llm).invoke("generate").strip() == "ok"
+        options = calls[0][1]["options"]
+        assert options["num_ctx"] == 16384
+        assert options["num_predict"] == plan.num_predict
+        assert options["temperature"] == 0
+    finally:
+        server.shutdown()
+
+
+def test_oversized_required_prompt_is_logged(caplog):
+    budget = TokenBudget(max_ctx=8192, margin=0)
+    template = "{instructions}\n\nRules:\n{sheets}"
+    inputs = {"instructions": "instruction line\n" * 2000, "sheets": "sheet row\n" * 3000}
+    with caplog.at_level("WARNING", logger="services.token_budget"):
+        plan = budget.plan("kraken", template, inputs, priorities={"sheets": 1})
+    assert plan.num_predict == 512
+    assert plan.inputs["sheets"] == ""
+    assert any("does not fit OLLAMA_MAX_CTX=8192" in r.getMessage() for r in caplog.records)
+
+    # Instructions that fit: only the sheet content is cut, no warning
+    caplog.clear()
+    inputs["instructions"] = "instruction line\n" * 100
+    with caplog.at_level("WARNING", logger="services.token_budget"):
+        plan = budget.plan("kraken", template, inputs, priorities={"sheets": 1})
+    assert plan.inputs["instructions"] == inputs["instructions"]
+    assert plan.inputs["sheets"].endswith(TRUNCATION_MARKER)
+    assert not caplog.records
@@ -0,0 +1,71 @@
+import sys
+import os
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from test_llm_router import start_stub_ollama, make_backend
+from services import tracing
+from services.llm_router import LLMRouter, RoutedOllamaLLM
+from services.token_budget import TokenBudget
+
+
+def test_llm_spans_nest_under_the_request_and_feed_metrics(tmp_path, monkeypatch):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing._exporter, "path", str(trace_file))
+    server, url, _ = start_stub_ollama(reply="hello world")
+    llm = RoutedOllamaLLM(base_url=url, model="m", router=LLMRouter([make_backend(url)]))
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware)
+
+    @app.get("/generate/{name}")
+    def generate(name: str):
+        with tracing.span("pipeline.decision_tables", phase="decision"):
+            plan = TokenBudget().plan("repair", "{rules}", {"rules": name})
+            text = plan.bind(llm).invoke("generate " + name)
+            tracing.record_cache("artifact_decision", False)
+        return {"text": text}
+
+    @app.get("/metrics")
+    def metrics():
+        return tracing.render_metrics()
+
+    try:
+        client = TestClient(app)
+        assert client.get("/generate/rule-1").status_code == 200
+    finally:
+        server.shutdown()
+
+    trace = json.loads(trace_file.read_text().splitlines()[-1])
+    spans = {s["name"]: s for s in trace["spans"]}
+    assert trace["name"] == "http.request"
+    assert spans["http.request"]["attrs"]["route"] == "/generate/{name}"
+    assert spans["pipeline.decision_tables"]["parent_id"] == spans["http.request"]["span_id"]
+    assert spans["pipeline.decision_tables"]["attrs"]["cache_artifact_decision_misses"] == 1
+    call = spans["llm.generate"]
+    assert call["parent_id"] == spans["pipeline.decision_tables"]["span_id"]
+    # The budget plan's phase labels the call; the enclosing pipeline phase is overridden
+    assert call["attrs"]["phase"] == "repair" and len(call["attrs"]["template"]) == 12
+    assert call["attrs"]["prompt_chars"] == len("generate rule-1")
+    assert call["attrs"]["completion_chars"] == len("hello world ")
+    assert call["attrs"]["num_ctx"] == 4096
+
+    assert tracing.SPAN_SECONDS.count(span="llm.generate", phase="repair", status="ok") >= 1
+    assert tracing.HTTP_SECONDS.count(method="GET", route="/generate/{name}", status="200") >= 1
+    text = tracing.render_metrics()
+    assert 'openl_span_duration_seconds_bucket{span="llm.generate",phase="repair",status="ok",le="+Inf"}' in text
+    assert 'openl_cache_lookups_total{cache="artifact_decision",result="miss"}' in text
+
+
+def test_failed_span_is_marked_and_reraised():
+    try:
+        with tracing.span("parse.json") as failing:
+            raise ValueError("bad")
+    except ValueError:
+        pass
+    assert failing.status == "error" and failing.attrs["error"] == "ValueError: bad"
+    assert tracing.recent_traces(1)[0]["spans"][0]["status"] == "error"
@@ -0,0 +1,41 @@
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from models import Datatype, DatatypeField, Rule
+from services.vocabulary import build_vocabulary_tables, normalize_type, camel_case
+
+
+def test_type_and_name_normalization():
+    assert normalize_type("List<Diagnosis>") == "Diagnosis[]"
+    assert normalize_type("decimal") == "Double"
+    assert normalize_type("int[]") == "Integer[]"
+    assert normalize_type("coveredPerson") == "CoveredPerson"
+    assert camel_case("Hire Date") == "hireDate"
+    assert camel_case("member_id") == "memberId"
+    assert camel_case("ID") == "id"
+
+
+def test_vocabulary_tables_from_models():
+    datatypes = [
+        Datatype(name="Policy", fields=[DatatypeField(name="Effective Date", type="date"), DatatypeField(name="claims", type="List<Claim>")]),
+        Datatype(name="Claim", fields=[DatatypeField(name="amount", type="number")]),
+    ]
+    rules = [Rule(id="R1", summary="Waiting period", condition="policy.effectiveDate + 30 > currentDate")]
+
+    tables = build_vocabulary_tables(datatypes, rules)
+
+    assert [t["header"] for t in tables] == ["Datatype Policy", "Datatype Claim", "Datatype RuleResult"]
+    assert tables[0]["rows"] == [["Date", "effectiveDate"], ["Claim[]", "claims"], ["Date", "currentDate"]]
+    assert tables[2]["rows"] == [["String", "ruleId"], ["String", "status"], ["String", "message"]]
+    # The request models are not mutated
+    assert len(datatypes[0].fields) == 2
+
+
+def test_vocabulary_defaults_column():
+    datatypes = [Datatype(name="Member", fields=[DatatypeField(name="status", type="String"), DatatypeField(name="age", type="Integer")])]
+    tables = build_vocabulary_tables(datatypes, defaults={"Member": {"status": "Active"}})
+    assert tables[0]["rows"] == [["String", "status", "Active"], ["Integer", "age", ""]]
+    assert tables[1]["rows"][0] == ["String", "ruleId", ""]
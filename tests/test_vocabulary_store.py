@@ -0,0 +1,65 @@
+import sys
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services import vocabulary_store
+from services.vocabulary_store import VocabularyStore
+
+
+def _datatype(name, *fields):
+    return {"name": name, "fields": [{"name": f, "type": "String"} for f in fields]}
+
+
+def test_concurrent_merges_keep_every_field(tmp_path):
+    store = VocabularyStore(str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: store.merge("policy.pdf", [_datatype("Member", f"field{i}")], [{"name": f"var{i}", "logic": "x"}]), range(40)))
+
+    record = store.get("policy.pdf")
+    assert record["version"] == 40
+    assert {f["name"] for f in record["datatypes"][0]["fields"]} == {f"field{i}" for i in range(40)}
+    assert len(record["intermediate_variables"]) == 40
+    # A second store (another worker) sees the same record on disk
+    other = VocabularyStore(str(tmp_path))
+    assert other.version("policy.pdf") == 40
+    assert "- Member(" in other.existing_context("policy.pdf") and "- Variable var0 (x)" in other.existing_context("policy.pdf")
+
+
+def test_conflicts_keep_existing_type_and_legacy_files_load(tmp_path):
+    # Files written by the old enrich_cache code have no version stamp
+    (tmp_path / "old.pdf.json").write_text(json.dumps({"datatypes": [_datatype("Policy", "status")], "intermediate_variables": []}))
+    store = VocabularyStore(str(tmp_path))
+    assert store.version("old.pdf") == 0
+    merged = store.merge("old.pdf", [{"name": "Policy", "fields": [{"name": "status", "type": "Integer"}, {"name": "term", "type": "Integer"}]}], [])
+    assert merged["datatypes"][0]["fields"] == [{"name": "status", "type": "String"}, {"name": "term", "type": "Integer"}]
+    assert store.stats["conflicts"] == 1 and merged["version"] == 1
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    store = VocabularyStore(str(tmp_path), max_bytes=10 ** 6)
+    for i in range(3):
+        store.merge(f"doc{i}.pdf", [_datatype("Member", *[f"f{j}" for j in range(20)])], [])
+        time.sleep(0.01)
+    store.existing_context("doc0.pdf")  # doc0 was used most recently
+    store.max_bytes = store.usage()["bytes"] - 1
+    assert store.evict() == ["doc1.pdf"]
+    assert store.get("doc1.pdf") is None and store.get("doc0.pdf") is not None
+
+
+def test_delete_keeps_lock_file_and_stats_are_exact(tmp_path):
+    store = VocabularyStore(str(tmp_path))
+    store.merge("policy.pdf", [_datatype("Member", "age")], [])
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: store.get("policy.pdf" if i % 2 else "missing.pdf"), range(2000)))
+    assert store.usage()["hits"] == 1000 and store.usage()["misses"] == 1000
+
+    store.delete("policy.pdf")
+    assert store.get("policy.pdf") is None
+    # Other processes may hold or wait on the flock; only the record goes away
+    assert not (tmp_path / "policy.pdf.json").exists()
+    assert (tmp_path / "policy.pdf.json.lock").exists() or vocabulary_store.fcntl is None
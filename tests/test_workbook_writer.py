@@ -0,0 +1,64 @@
+import sys
+import os
+import io
+
+from openpyxl import load_workbook
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.workbook_writer import StreamingWorkbookWriter, stream_workbook
+
+structure = {
+    "sheets": [
+        {"name": "Vocabulary", "tables": [{"header": "Datatype Member", "rows": [["Integer", "age"], ["Date", "hireDate"]]}]},
+        {
+            "name": "Rules",
+            "tables": [
+                {
+                    "header": "Rules RuleResult CheckAge(Member m)",
+                    "rows": [
+                        ["C1", "RET1"],
+                        ["m.age >= minAge", "result"],
+                        ["Integer minAge", ""],
+                        ["Min Age", "Result"],
+                        ["18", '= new RuleResult("Rule-01", "Eligible", "Adult")'],
+                    ],
+                },
+                {"name": "CheckStatus", "returnType": "RuleResult", "params": "Member m", "rows": [["C1"]]},
+                "not a table",
+            ],
+        },
+    ]
+}
+
+
+def read(buffer):
+    wb = load_workbook(buffer)
+    return {
+        name: (
+            [[(c.value, c.quotePrefix) for c in row] for row in wb[name].iter_rows()],
+            sorted(str(r) for r in wb[name].merged_cells.ranges),
+        )
+        for name in wb.sheetnames
+    }
+
+
+def test_streaming_writer_layout():
+    buffer = io.BytesIO()
+    StreamingWorkbookWriter().write(structure, buffer)
+    sheets = read(buffer)
+
+    assert list(sheets) == ["Vocabulary", "Rules"]
+    rows, merges = sheets["Rules"]
+    assert rows[0][0][0] == "Rules RuleResult CheckAge(Member m)"
+    assert merges == ["A1:B1"]
+    # Formula-like OpenL expressions stay text with a quote prefix
+    assert rows[5][1] == ('= new RuleResult("Rule-01", "Eligible", "Adult")', True)
+    # Two blank spacer rows, then the header constructed from name/returnType/params
+    assert rows[8][0][0] == "Rules RuleResult CheckStatus(Member m)"
+
+
+def test_stream_workbook_yields_valid_xlsx():
+    data = b"".join(stream_workbook(structure, chunk_size=1024))
+    assert read(io.BytesIO(data))["Vocabulary"][0][2][:2] == [("Date", False), ("hireDate", False)]
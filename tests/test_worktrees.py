@@ -0,0 +1,75 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.publish_jobs import PublishQueue
+from test_publish_jobs import git, make_repo, make_service
+
+
+def test_concurrent_jobs_use_separate_sparse_worktrees(tmp_path):
+    origin, clone = make_repo(tmp_path)
+    # Content outside the rules directory must never be checked out for a publish
+    (clone / "other").mkdir()
+    (clone / "other" / "big.txt").write_text("not needed\n")
+    git("add", "other", cwd=clone)
+    git("commit", "-m", "other", cwd=clone)
+    git("push", "origin", "openl-ai-demo", cwd=clone)
+    head_before = git("rev-parse", "HEAD", cwd=clone)
+
+    workbooks = []
+    for name in ("A.xlsx", "B.xlsx", "C.xlsx", "D.xlsx"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        workbooks.append(path)
+
+    service = make_service(clone)
+    checked_out = []
+    run_git = service._arun_git
+
+    async def spy(args, cwdir=None):
+        output = await run_git(args, cwdir)
+        if args[:1] == ["commit"]:
+            checked_out.append(sorted(os.listdir(cwdir)))
+        return output
+
+    service._arun_git = spy
+
+    async def scenario():
+        queue = PublishQueue(service, staging_dir=str(tmp_path / "staging"), workers=4, batch_max=1)
+        jobs = [queue.submit(str(path), path.name) for path in workbooks]
+        await queue.join()
+        await queue.close()
+        return jobs
+
+    jobs = asyncio.run(scenario())
+    assert [job.status for job in jobs] == ["success"] * 4
+    # Every job landed on origin even though they raced (rejected pushes are rebased)
+    assert git("ls-tree", "--name-only", "openl-ai-demo", "rules/", cwd=origin).splitlines() == [
+        "rules/A.xlsx", "rules/B.xlsx", "rules/C.xlsx", "rules/D.xlsx"
+    ]
+    assert checked_out and all(entries == [".git", "README.md", "rules"] for entries in checked_out)
+    # The shared checkout was never touched, and finished worktrees were reclaimed
+    assert git("rev-parse", "HEAD", cwd=clone) == head_before
+    assert git("status", "--porcelain", cwd=clone) == ""
+    assert git("worktree", "list", "--porcelain", cwd=clone).count("worktree ") == 1
+    assert not [b for b in git("branch", "--list", "publish/*", cwd=clone).splitlines() if b.strip()]
+    assert all(not files for _, _, files in os.walk(tmp_path / "worktrees"))
+
+
+def test_leftover_worktrees_are_reclaimed(tmp_path):
+    origin, clone = make_repo(tmp_path)
+    service = make_service(clone)
+    stale = tmp_path / "worktrees" / "999999999" / "deadbeef"
+    git("worktree", "add", "-b", "publish/deadbeef", str(stale), cwd=clone)
+
+    async def scenario():
+        async with service.worktrees.checkout(service.branch) as worktree:
+            return worktree.path
+
+    path = asyncio.run(scenario())
+    assert not os.path.exists(path)
+    assert not stale.exists()
+    assert git("branch", "--list", "publish/*", cwd=clone) == ""